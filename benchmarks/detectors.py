@@ -0,0 +1,124 @@
+# benchmarks/detectors.py
+"""
+Measures per-frame latency and detection error of the landing pad detector
+backends on a labeled frame set.
+
+    python -m benchmarks.detectors --synthetic 200
+    python -m benchmarks.detectors --frames path/to/frames --backends hough contour
+
+A frame directory holds images plus labels.json mapping each file name to
+[x, y, radius] of the pad, or null when no pad is visible.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detectors import DETECTORS, create_detector  # noqa: E402
+from frame_sources import SyntheticPadSource  # noqa: E402
+
+
+def load_labeled_frames(directory):
+    with open(os.path.join(directory, 'labels.json')) as f:
+        labels = json.load(f)
+    for name, label in sorted(labels.items()):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is None:
+            raise FileNotFoundError(f"Cannot read {name} in {directory}")
+        yield image, tuple(label) if label else None
+
+
+def synthetic_frames(count, width=640, height=480, seed=0, marker=False, empty_fraction=0.1):
+    """
+    Generates noisy frames with a white disk pad, or an AprilTag on a white
+    square when marker is set, at random positions and sizes.
+    """
+    rng = np.random.default_rng(seed)
+    source = SyntheticPadSource(width, height, seed=seed, noise=8, background=95,
+                                marker='DICT_APRILTAG_36h11' if marker else None)
+    for _ in range(count):
+        if rng.random() < empty_fraction:
+            yield source.render(0.0, 0.0, 0), None
+            continue
+        radius = int(rng.integers(20, 90))
+        x = int(rng.integers(radius + 10, width - radius - 10))
+        y = int(rng.integers(radius + 10, height - radius - 10))
+        image = source.render(x / (width / 2) - 1, y / (height / 2) - 1, radius)
+        yield image, (x, y, radius)
+
+
+def evaluate(detector, frames, error_bar):
+    latencies = []
+    errors = []
+    labeled = 0
+    false_positives = 0
+    for image, label in frames:
+        started = time.perf_counter()
+        found = detector.detect(image)
+        latencies.append(time.perf_counter() - started)
+        if label is None:
+            if found is not None:
+                false_positives += 1
+            continue
+        labeled += 1
+        if found is not None:
+            errors.append(float(np.hypot(found[0] - label[0], found[1] - label[1])))
+    latencies_ms = np.array(latencies) * 1000
+    errors = np.array(errors)
+    return {
+        'frames': len(latencies),
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'detection_rate': len(errors) / labeled if labeled else 0.0,
+        'false_positives': false_positives,
+        'mean_error_px': float(errors.mean()) if len(errors) else float('nan'),
+        'p95_error_px': float(np.percentile(errors, 95)) if len(errors) else float('nan'),
+        # Share of labeled frames found within the error bar; misses count against it
+        'within_bar': float((errors <= error_bar).sum() / labeled) if labeled else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark landing pad detector backends.")
+    parser.add_argument('--frames', help="Directory with images and labels.json")
+    parser.add_argument('--synthetic', type=int, default=200, help="Generate this many labeled frames instead")
+    parser.add_argument('--marker', action='store_true', help="Synthetic frames show an AprilTag instead of a disk")
+    parser.add_argument('--backends', nargs='*', default=sorted(DETECTORS))
+    parser.add_argument('--options', default='{}', help="JSON {backend: constructor options}")
+    parser.add_argument('--error-bar', type=float, default=5.0, help="Centre error in pixels counted as accurate")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = list(load_labeled_frames(args.frames))
+    else:
+        frames = list(synthetic_frames(args.synthetic, marker=args.marker))
+    options = json.loads(args.options)
+
+    results = {}
+    for name in args.backends:
+        try:
+            detector = create_detector(name, options.get(name))
+        except ImportError as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+        detector.detect(frames[0][0])  # Warm up
+        results[name] = evaluate(detector, frames, args.error_bar)
+
+    print(f"{len(frames)} frames, accuracy bar {args.error_bar}px")
+    print(f"{'backend':<10} {'mean ms':>8} {'p95 ms':>8} {'detect':>7} {'FP':>4} {'err px':>7} {'p95 err':>8} {'<=bar':>6}")
+    for name, r in sorted(results.items(), key=lambda item: item[1]['mean_ms']):
+        print(f"{name:<10} {r['mean_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['detection_rate']:>7.1%} "
+              f"{r['false_positives']:>4} {r['mean_error_px']:>7.2f} {r['p95_error_px']:>8.2f} {r['within_bar']:>6.1%}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# benchmarks/ingest.py
+"""
+Measures the telemetry ingest path: synthetic MAVLink over UDP into
+MavlinkRouter, through the EventBus to MavlinkCallBack, SensorData,
+SafetyMonitor and a recorder.
+
+    python -m benchmarks.ingest
+    python -m benchmarks.ingest --ingest bulk --recorders tlog columnar --rates 5000 0 --json new.json
+    python -m benchmarks.ingest --duration 600 --rates 2000              # memory growth over a long run
+    python -m benchmarks.ingest --compare base.json new.json
+
+Traffic comes from a separate process, so the CPU time reported per message
+is the application's own. For every ingest mode, recorder and send rate
+(0 floods the link) it reports received messages per second, UDP loss,
+latency percentiles from the generator writing a frame to the last
+subscriber callback for it, CPU per message and resident memory growth.
+Latency uses RAW_IMU and GPS_RAW_INT, whose time_usec fields carry the
+send time on the shared monotonic clock.
+
+--json writes the results with the commit they were measured on; --compare
+prints the change between two such files, or between a file and the runs
+just made, and exits with status 1 when a metric regressed by more than
+--tolerance.
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymavlink import mavutil  # noqa: E402
+from callback import MavlinkCallBack  # noqa: E402
+from data_recorder import ColumnarRecorder, DataRecorder  # noqa: E402
+from flight_store import FlightStore  # noqa: E402
+from lib.event_bus import EventBus  # noqa: E402
+from router import MavlinkRouter  # noqa: E402
+from safety import SafetyMonitor  # noqa: E402
+from sensors import SensorData  # noqa: E402
+
+mavlink = mavutil.mavlink
+
+# Share of each message type in the generated traffic
+MIX = {
+    'RAW_IMU': 30,
+    'ATTITUDE': 25,
+    'GLOBAL_POSITION_INT': 15,
+    'GPS_RAW_INT': 10,
+    'VFR_HUD': 10,
+    'SYS_STATUS': 5,
+    'HEARTBEAT': 5,
+}
+STAMPED_TYPES = ('RAW_IMU', 'GPS_RAW_INT')  # time_usec holds the send time
+
+RECORDERS = ('tlog', 'csv', 'columnar', 'store', 'none')
+
+# Metric -> (higher is better, smallest change scale) for --compare; the
+# scale keeps near-zero baselines, such as memory growth, from reading as
+# large relative changes. Memory growth is only meaningful over long runs;
+# short ones mostly see allocator warm-up
+METRICS = {
+    'msgs_per_s': (True, 1.0),
+    'loss': (False, 0.01),
+    'latency_p50_us': (False, 10.0),
+    'latency_p99_us': (False, 10.0),
+    'cpu_us_per_msg': (False, 1.0),
+    'rss_growth_mb_per_min': (False, 5.0),
+}
+
+
+def encode(mav, msg_type, now_us, n):
+    if msg_type == 'RAW_IMU':
+        return mav.raw_imu_encode(now_us, 12, -8, -1003, 3, -2, 1, 220, -40, 410)
+    if msg_type == 'GPS_RAW_INT':
+        return mav.gps_raw_int_encode(now_us, 3, 473977420 + n % 100, 85455940, 498000, 80, 120, 50, 9000, 14)
+    if msg_type == 'ATTITUDE':
+        return mav.attitude_encode(now_us // 1000 & 0xFFFFFFFF, 0.01, -0.02, 1.57, 0.0, 0.0, 0.0)
+    if msg_type == 'GLOBAL_POSITION_INT':
+        return mav.global_position_int_encode(now_us // 1000 & 0xFFFFFFFF, 473977420, 85455940, 498000, 10000,
+                                              50, -20, 0, 9000)
+    if msg_type == 'VFR_HUD':
+        return mav.vfr_hud_encode(0.5, 0.5, 90, 45, 498.0, 0.0)
+    if msg_type == 'SYS_STATUS':
+        # Battery stays above the SafetyMonitor threshold
+        return mav.sys_status_encode(0, 0, 0, 200, 15800, 1500, 80, 0, 0, 0, 0, 0, 0)
+    return mav.heartbeat_encode(mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                                mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, 4, mavlink.MAV_STATE_ACTIVE)
+
+
+def generate(port, rate, duration, mix, batch, seed, sent):
+    """
+    Sends the message mix to 127.0.0.1:port for duration seconds, batch
+    frames per datagram, at rate messages per second or as fast as possible
+    when rate is 0. Runs in its own process; the count sent is left in sent.
+    """
+    mav = mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(('127.0.0.1', port))
+    # A shuffled cycle of types in proportion to the mix
+    cycle = [msg_type for msg_type, share in mix.items() for _ in range(share)]
+    np.random.default_rng(seed).shuffle(cycle)
+
+    count = 0
+    started = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - started
+        if elapsed >= duration:
+            break
+        if rate:
+            due = int(elapsed * rate) - count
+            if due <= 0:
+                time.sleep(min(0.001, 1.0 / rate))
+                continue
+            frames = min(due, batch)
+        else:
+            frames = batch
+        now_us = time.monotonic_ns() // 1000
+        buf = bytearray()
+        for _ in range(frames):
+            buf += encode(mav, cycle[count % len(cycle)], now_us, count).pack(mav)
+            mav.seq = (mav.seq + 1) % 256
+            count += 1
+        try:
+            sock.send(buf)
+        except (ConnectionRefusedError, BlockingIOError):
+            pass  # Counted as sent; the receiver's loss shows it
+    sock.close()
+    sent.value = count
+
+
+class LatencyHistogram:
+    # Log-spaced bins, 100 per decade from 1 us to 100 s: constant memory
+    # for long runs and about 2% resolution
+    BINS_PER_DECADE = 100
+    DECADES = 8
+
+    def __init__(self):
+        self.counts = [0] * (self.BINS_PER_DECADE * self.DECADES + 1)
+        self.total = 0
+        self.max_us = 0.0
+
+    def record(self, us):
+        index = int(math.log10(us) * self.BINS_PER_DECADE) if us > 1 else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.total += 1
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, fraction):
+        if not self.total:
+            return float('nan')
+        target = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return 10 ** ((index + 0.5) / self.BINS_PER_DECADE)
+        return self.max_us
+
+
+class Probe:
+    def __init__(self, event_bus, msg_types):
+        """
+        Counts the generated message types and records the latency of the
+        stamped ones. It subscribes with 'TYPE*' patterns: the bus runs
+        callbacks in pattern order, and these patterns are new, so the
+        probe runs after every component already subscribed.
+        """
+        self.received = 0
+        self.last = None  # Arrival time of the latest message
+        self.window = LatencyHistogram()
+        for msg_type in msg_types:
+            callback = self.stamped if msg_type in STAMPED_TYPES else self.count
+            event_bus.subscribe(f'{msg_type}*', callback)
+
+    def count(self, msg):
+        self.received += 1
+        self.last = time.monotonic()
+
+    def stamped(self, msg):
+        self.received += 1
+        self.last = time.monotonic()
+        self.window.record(time.monotonic_ns() / 1000 - msg.time_usec)
+
+    def reset(self):
+        # Start a new latency window; the received total keeps counting
+        self.window = LatencyHistogram()
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def build_recorder(name, event_bus, logger, workdir, router=None):
+    if name == 'tlog':
+        return DataRecorder(event_bus, logger, filename=os.path.join(workdir, 'flight.tlog'), file_format='tlog')
+    if name == 'csv':
+        return DataRecorder(event_bus, logger, filename=os.path.join(workdir, 'flight.csv'), file_format='csv')
+    if name == 'columnar':
+        return ColumnarRecorder(event_bus, logger, directory=os.path.join(workdir, 'columnar'))
+    if name == 'store':
+        return FlightStore(event_bus, logger, root=os.path.join(workdir, 'flights'), router=router)
+    return None
+
+
+def run(ingest, recorder, rate, duration=10.0, warmup=2.0, batch=1, mix=None, read_size=4096,
+        bus_metrics=False, seed=0):
+    """
+    One measurement: builds the ingest components, floods them for
+    warmup + duration seconds and tears them down.
+    """
+    mix = mix or MIX
+    logger = logging.getLogger('benchmark')
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix='ingest-') as workdir:
+        event_bus = EventBus(logger=logger)
+        router = MavlinkRouter(event_bus, logger, port=f'udpin:127.0.0.1:{port}', ingest=ingest, read_size=read_size)
+        router.start()
+        MavlinkCallBack(event_bus)
+        SensorData(event_bus)
+        safety = SafetyMonitor(event_bus, None, logger)
+        data_recorder = build_recorder(recorder, event_bus, logger, workdir, router)
+        probe = Probe(event_bus, mix)
+        if bus_metrics:
+            event_bus.metrics.enable()
+
+        sent = multiprocessing.get_context('spawn').Value('q', 0)
+        generator = multiprocessing.get_context('spawn').Process(
+            target=generate, args=(port, rate, warmup + duration, mix, batch, seed, sent), daemon=True)
+        generator.start()
+        time.sleep(warmup)
+
+        probe.reset()
+        received_start = probe.received
+        cpu_start = time.process_time()
+        started = time.monotonic()
+        samples = []
+        while generator.is_alive():
+            samples.append((time.monotonic() - started, rss_mb()))
+            generator.join(0.5)
+        # Let queued datagrams drain
+        previous = -1
+        while probe.received != previous:
+            previous = probe.received
+            time.sleep(0.1)
+        elapsed = (probe.last or started) - started
+        cpu = time.process_time() - cpu_start
+        received = probe.received - received_start
+        samples.append((elapsed, rss_mb()))
+
+        safety.stop()
+        router.stop()
+        if data_recorder:
+            data_recorder.close()
+        queues = event_bus.queue_stats()
+        metrics = event_bus.metrics.snapshot() if bus_metrics else None
+        event_bus.close()
+
+    times, rss = np.array(samples).T
+    latency = probe.window
+    result = {
+        'ingest': ingest,
+        'recorder': recorder,
+        'rate': rate,
+        'batch': batch,
+        'duration_s': elapsed,
+        'sent': sent.value,
+        'received': probe.received,
+        'loss': 1 - probe.received / sent.value if sent.value else 0.0,
+        'msgs_per_s': received / elapsed if elapsed else 0.0,
+        'latency_p50_us': latency.percentile(0.5),
+        'latency_p90_us': latency.percentile(0.9),
+        'latency_p99_us': latency.percentile(0.99),
+        'latency_p999_us': latency.percentile(0.999),
+        'latency_max_us': latency.max_us,
+        'cpu_us_per_msg': cpu / received * 1e6 if received else float('nan'),
+        'cpu_share': cpu / elapsed if elapsed else 0.0,
+        'rss_start_mb': float(rss[0]),
+        'rss_end_mb': float(rss[-1]),
+        'rss_growth_mb_per_min': float(np.polyfit(times, rss, 1)[0] * 60) if len(times) > 2 else 0.0,
+        'queue_drops': {name: stats.get('dropped', 0) for name, stats in queues.items()},
+    }
+    if ingest == 'bulk':
+        result.update(frames_skipped=router.frames_skipped, frames_bad=router.frames_bad)
+    if metrics is not None:
+        result['bus_metrics'] = metrics
+    return result
+
+
+def metadata(args):
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+    }
+
+
+def run_key(result):
+    return result['ingest'], result['recorder'], result['rate'], result['batch']
+
+
+def compare(base, new, tolerance):
+    """
+    Prints each metric of the runs both result sets share.
+
+    :return: Number of regressions beyond tolerance.
+    """
+    print(f"base {(base['meta'].get('commit') or '?')[:10]}  new {(new['meta'].get('commit') or '?')[:10]}")
+    base_runs = {run_key(result): result for result in base['runs']}
+    regressions = 0
+    for result in new['runs']:
+        reference = base_runs.get(run_key(result))
+        if reference is None:
+            continue
+        ingest, recorder, rate, batch = run_key(result)
+        print(f"{ingest} ingest, {recorder} recorder, rate {rate or 'max'}, batch {batch}")
+        for name, (higher_is_better, scale) in METRICS.items():
+            before, after = reference.get(name), result.get(name)
+            if before is None or after is None or math.isnan(before) or math.isnan(after):
+                continue
+            change = (after - before) / max(abs(before), scale)
+            worse = -change if higher_is_better else change
+            flag = 'REGRESSION' if worse > tolerance else ''
+            regressions += bool(flag)
+            print(f"  {name:<22} {before:>12.2f} {after:>12.2f} {change:>+8.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MAVLink ingest through the event bus.")
+    parser.add_argument('--ingest', nargs='*', default=['standard', 'bulk'], choices=['standard', 'bulk'])
+    parser.add_argument('--recorders', nargs='*', default=['tlog'], choices=RECORDERS)
+    parser.add_argument('--rates', nargs='*', type=int, default=[1000, 0], help="Messages per second; 0 floods")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds per run")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds before measuring")
+    parser.add_argument('--batch', type=int, default=1, help="Frames per datagram")
+    parser.add_argument('--read-size', type=int, default=4096, help="Bytes per read in bulk mode")
+    parser.add_argument('--bus-metrics', action='store_true', help="Include per-callback EventBus metrics")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help="BASE [NEW]: compare two result files, or BASE with the runs just made")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two result files")
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(base, new, args.tolerance) else 0)
+
+    results = []
+    for ingest in args.ingest:
+        for recorder in args.recorders:
+            for rate in args.rates:
+                results.append(run(ingest, recorder, rate, args.duration, args.warmup, args.batch,
+                                   read_size=args.read_size, bus_metrics=args.bus_metrics, seed=args.seed))
+
+    print(f"{args.duration:.0f} s per run, {args.batch} frame(s) per datagram")
+    print(f"{'ingest':<9} {'recorder':<9} {'rate':>6} {'msg/s':>8} {'loss':>6} {'p50 us':>8} {'p99 us':>8} "
+          f"{'p99.9 us':>9} {'cpu us/msg':>10} {'rss MB':>7} {'MB/min':>7}")
+    for r in results:
+        print(f"{r['ingest']:<9} {r['recorder']:<9} {r['rate'] or 'max':>6} {r['msgs_per_s']:>8.0f} {r['loss']:>6.1%} "
+              f"{r['latency_p50_us']:>8.0f} {r['latency_p99_us']:>8.0f} {r['latency_p999_us']:>9.0f} "
+              f"{r['cpu_us_per_msg']:>10.1f} {r['rss_end_mb']:>7.1f} {r['rss_growth_mb_per_min']:>7.2f}")
+
+    output = {'meta': metadata(args), 'runs': results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        sys.exit(1 if compare(base, output, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# benchmarks/vision.py
+"""
+Measures PrecisionLanding.process_frame, including ROI tracking, on
+synthetic scenes with known pad positions or on recorded footage.
+
+    python -m benchmarks.vision
+    python -m benchmarks.vision --scenarios drift descent --backends hough contour --tracking on
+    python -m benchmarks.vision --video runs/pad.mp4
+
+For each backend, tracking mode and scenario it reports throughput, p50/p99
+latency per frame, the detection rate and, on synthetic scenes, the error of
+the pad offset that the controller acts on, in pixels.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from callback import MavlinkCallBack  # noqa: E402
+from detectors import DETECTORS  # noqa: E402
+from frame_sources import ImageDirectorySource, SyntheticPadSource, VideoFileSource  # noqa: E402
+from lib.event_bus import EventBus  # noqa: E402
+from precision_landing import PrecisionLanding  # noqa: E402
+
+# SyntheticPadSource options for each scene
+SCENARIOS = {
+    'centered': {'radius': 60},
+    'offset': {'offset': (0.5, -0.4), 'radius': 40},
+    'drift': {'offset': (-0.6, -0.4), 'velocity': (0.004, 0.003), 'radius': 40},
+    'descent': {'offset': (0.3, 0.2), 'velocity': (-0.001, -0.0007), 'radius': 16, 'growth': 0.25},
+    'jitter': {'offset': (0.1, 0.1), 'radius': 40, 'jitter': 0.01},
+    'small': {'offset': (0.2, -0.2), 'radius': 14},
+    'blur': {'offset': (0.2, 0.2), 'radius': 40, 'blur': 3.0},
+    'noise': {'offset': (0.2, 0.2), 'radius': 40, 'noise': 12.0},
+    'dim': {'offset': (0.2, 0.2), 'radius': 40, 'brightness': 0.82},
+    'gradient': {'offset': (0.2, 0.2), 'radius': 40, 'gradient': 0.25},
+}
+
+
+def build_landing(source, backend, options, tracking):
+    config = {
+        'precision_landing': {
+            'detector': {'backend': backend, 'options': options or {}},
+            'tracking': {'enabled': tracking},
+        }
+    }
+    logger = logging.getLogger('benchmark')
+    return PrecisionLanding(MavlinkCallBack(EventBus()), None, config, logger, frame_source=source)
+
+
+def run(landing, source, max_frames=None):
+    """
+    Feeds every frame of the source through process_frame and collects
+    per-frame latency and, where the source knows the truth, offset error.
+    """
+    latencies = []
+    errors = []
+    expected = 0
+    found = 0
+    false_positives = 0
+    half_width = source.width / 2
+    half_height = source.height / 2
+    with source:
+        while max_frames is None or len(latencies) < max_frames:
+            frame = source.read()
+            if frame is None:
+                break
+            started = time.perf_counter()
+            _, offset_x, offset_y = landing.process_frame(frame)
+            latencies.append(time.perf_counter() - started)
+            truth = getattr(source, 'truth_offset', None)
+            detected = landing.last_found is not None
+            found += detected
+            if truth is None:
+                if detected and isinstance(source, SyntheticPadSource):
+                    false_positives += 1
+                continue
+            expected += 1
+            if detected:
+                errors.append(float(np.hypot((offset_x - truth[0]) * half_width, (offset_y - truth[1]) * half_height)))
+    latencies_ms = np.array(latencies) * 1000
+    errors = np.array(errors)
+    total = latencies_ms.sum() / 1000
+    return {
+        'frames': len(latencies),
+        'fps': len(latencies) / total if total else 0.0,
+        'p50_ms': float(np.percentile(latencies_ms, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies_ms, 99)) if len(latencies) else float('nan'),
+        'max_ms': float(latencies_ms.max()) if len(latencies) else float('nan'),
+        # Without ground truth this is the share of frames with a detection
+        'detection_rate': (len(errors) / expected if expected else found / len(latencies)) if len(latencies) else 0.0,
+        'false_positives': false_positives,
+        'tracked': landing.frames_tracked / len(latencies) if len(latencies) else 0.0,
+        'mean_error_px': float(errors.mean()) if len(errors) else float('nan'),
+        'p99_error_px': float(np.percentile(errors, 99)) if len(errors) else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the precision landing vision path.")
+    parser.add_argument('--scenarios', nargs='*', default=list(SCENARIOS), help="Synthetic scenes to run")
+    parser.add_argument('--video', help="Run on a video file instead of synthetic scenes")
+    parser.add_argument('--images', help="Run on a directory of images instead of synthetic scenes")
+    parser.add_argument('--frames', type=int, default=300, help="Frames per run")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--marker', help="Draw this aruco dictionary's marker 0 on synthetic pads, e.g. DICT_APRILTAG_36h11")
+    parser.add_argument('--backends', nargs='*', default=['hough', 'contour'], choices=sorted(DETECTORS))
+    parser.add_argument('--options', default='{}', help="JSON {backend: constructor options}")
+    parser.add_argument('--tracking', choices=['on', 'off', 'both'], default='both')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.video:
+        scenes = {os.path.basename(args.video): lambda: VideoFileSource(args.video, args.width, args.height)}
+    elif args.images:
+        scenes = {os.path.basename(os.path.normpath(args.images)): lambda: ImageDirectorySource(
+            args.images, args.width, args.height, preload=True)}
+    else:
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenes = {
+            name: (lambda name=name: SyntheticPadSource(
+                args.width, args.height, frames=args.frames, seed=args.seed, marker=args.marker, **SCENARIOS[name]))
+            for name in args.scenarios
+        }
+    options = json.loads(args.options)
+    modes = {'on': [True], 'off': [False], 'both': [True, False]}[args.tracking]
+
+    results = []
+    for backend in args.backends:
+        for tracking in modes:
+            for scene, make_source in scenes.items():
+                source = make_source()
+                try:
+                    landing = build_landing(source, backend, options.get(backend), tracking)
+                except ImportError as e:
+                    print(f"{backend}: unavailable ({e})")
+                    break
+                result = run(landing, source, args.frames)
+                result.update({'backend': backend, 'tracking': tracking, 'scene': scene})
+                results.append(result)
+
+    print(f"{args.width}x{args.height}, up to {args.frames} frames per run")
+    print(f"{'backend':<9} {'track':<5} {'scene':<10} {'fps':>7} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'detect':>7} {'FP':>4} {'tracked':>7} {'err px':>7} {'p99 err':>8}")
+    for r in results:
+        print(f"{r['backend']:<9} {'on' if r['tracking'] else 'off':<5} {r['scene']:<10} {r['fps']:>7.0f} "
+              f"{r['p50_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['detection_rate']:>7.1%} {r['false_positives']:>4} "
+              f"{r['tracked']:>7.1%} {r['mean_error_px']:>7.2f} {r['p99_error_px']:>8.2f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# blackbox.py
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from lib.mavlink_frames import TLOG_TIMESTAMP
+
+BLACKBOX_MAGIC = b'BLKBOX01'
+# magic, capacity, head, tail, records; head and tail are byte offsets that only grow
+HEADER = struct.Struct('<8sQQQQ')
+HEADER_SIZE = 64
+# length of the whole record, kind, timestamp in seconds
+RECORD = struct.Struct('<IBd')
+
+KIND_MAVLINK = 0   # Raw MAVLink frame
+KIND_EVENT = 1     # JSON object from an event with to_dict(), e.g. a LandingDecision
+
+# Non-MAVLink bus topics recorded when frames come from the router
+EVENT_TOPICS = ('LANDING_DECISION',)
+
+
+class BlackBox:
+    def __init__(self, event_bus, logger, path='start/blackbox.bin', size=16 << 20, keep_previous=True,
+                 router=None, event_topics=EVENT_TOPICS):
+        """
+        Keeps the most recent bus traffic in a fixed-size, memory-mapped ring
+        buffer file.
+
+        Every MAVLink message is stored as its raw frame, and other events
+        with a to_dict() method (landing decisions) as JSON. With a router,
+        frames are taken from its raw-frame path and only event_topics are
+        subscribed on the bus, so bulk ingest still decodes only the types
+        other components use. Without one, every bus topic is recorded.
+
+        Writing a record is a few copies into the shared mapping, so the data
+        is in the kernel's page cache as soon as it is written and survives
+        the process crashing or being killed. The oldest records are overwritten once the
+        buffer is full; the header is updated after the record bytes so a
+        reader never sees a half-written record.
+
+        :param event_bus: The event bus to record from.
+        :param logger: The logger instance for logging messages.
+        :param path: Ring buffer file.
+        :param size: Bytes of record storage; at 57600 baud 16 MB holds
+                     roughly the last 45 minutes of traffic.
+        :param keep_previous: Rename an existing buffer to path + '.1' instead
+                              of overwriting the last flight's data.
+        :param router: Optional MavlinkRouter to record raw frames from.
+        :param event_topics: Bus topics recorded alongside the router's frames.
+        """
+        self.event_bus = event_bus
+        self.router = router
+        self.topics = tuple(event_topics) if router else ('ALL',)
+        self.logger = logger
+        self.path = path
+        self.capacity = size
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+        if keep_previous and os.path.exists(path):
+            os.replace(path, path + '.1')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self.fd, HEADER_SIZE + size)
+        self.mm = mmap.mmap(self.fd, HEADER_SIZE + size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        self.head = 0
+        self.tail = 0
+        self.records = 0
+        self._write_header()
+
+        if router:
+            router.add_frame_sink(self.record_frame)
+        for topic in self.topics:
+            self.event_bus.subscribe(topic, self.record)
+        self.logger.info(f"Black box recording to {path} ({size >> 20} MB).")
+
+    def _write_header(self):
+        HEADER.pack_into(self.mm, 0, BLACKBOX_MAGIC, self.capacity, self.head, self.tail, self.records)
+
+    def _copy_in(self, offset, data):
+        # Copies data into the ring at a logical offset, wrapping at the end
+        start = offset % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.mm[HEADER_SIZE + start:HEADER_SIZE + start + first] = data[:first]
+        if first < len(data):
+            self.mm[HEADER_SIZE:HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _read_length(self, offset):
+        start = offset % self.capacity
+        raw = bytes(self.mm[HEADER_SIZE + start:HEADER_SIZE + min(start + 4, self.capacity)])
+        if len(raw) < 4:
+            raw += self.mm[HEADER_SIZE:HEADER_SIZE + 4 - len(raw)]
+        return struct.unpack('<I', raw)[0]
+
+    def record(self, msg):
+        get_msgbuf = getattr(msg, 'get_msgbuf', None)
+        if get_msgbuf is not None:
+            kind = KIND_MAVLINK
+            payload = get_msgbuf()
+        elif hasattr(msg, 'to_dict'):
+            kind = KIND_EVENT
+            payload = json.dumps(msg.to_dict(), default=str).encode()
+        else:
+            return
+        if not payload:
+            return
+        timestamp = getattr(msg, '_timestamp', None) or time.time()
+        self.write(kind, timestamp, payload)
+
+    def record_frame(self, msg_type, frame):
+        # Router frame sink; frames arrive undecoded, so stamp them on receipt
+        self.write(KIND_MAVLINK, time.time(), frame)
+
+    def write(self, kind, timestamp, payload):
+        """
+        Appends one record, evicting the oldest records to make room.
+        """
+        size = RECORD.size + len(payload)
+        if size > self.capacity:
+            self.dropped += 1
+            return
+        with self.lock:
+            head = self.head
+            tail = self.tail
+            evicted = 0
+            while head + size - tail > self.capacity:
+                tail += self._read_length(tail)
+                evicted += 1
+            if tail != self.tail:
+                # Publish the new tail before overwriting the records it skips
+                self.tail = tail
+                self.records -= evicted
+                self._write_header()
+            self._copy_in(head, RECORD.pack(size, kind, timestamp) + payload)
+            self.head = head + size
+            self.records += 1
+            self._write_header()
+
+    def close(self):
+        if self.router:
+            self.router.remove_frame_sink(self.record_frame)
+        for topic in self.topics:
+            self.event_bus.unsubscribe(topic, self.record)
+        with self.lock:
+            self.mm.flush()
+            self.mm.close()
+            os.close(self.fd)
+        self.logger.info(f"Black box closed with {self.records} records ({self.dropped} oversized dropped).")
+
+
+class BlackBoxReader:
+    def __init__(self, path):
+        """
+        Reads a black box file, also one left behind by a crashed process.
+        """
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        magic, self.capacity, self.head, self.tail, self.records = HEADER.unpack_from(self.data, 0)
+        if magic != BLACKBOX_MAGIC:
+            raise ValueError(f"{path} is not a black box file")
+        self.ring = self.data[HEADER_SIZE:HEADER_SIZE + self.capacity]
+
+    def _read(self, offset, length):
+        start = offset % self.capacity
+        chunk = self.ring[start:start + length]
+        if len(chunk) < length:
+            chunk += self.ring[:length - len(chunk)]
+        return chunk
+
+    def records_raw(self):
+        """
+        Yields (timestamp, kind, payload) from oldest to newest.
+        """
+        offset = self.tail
+        while offset < self.head:
+            size, kind, timestamp = RECORD.unpack(self._read(offset, RECORD.size))
+            if size < RECORD.size or offset + size > self.head:
+                break  # Corrupt record; stop rather than return garbage
+            yield timestamp, kind, self._read(offset + RECORD.size, size - RECORD.size)
+            offset += size
+
+    def messages(self, last=None):
+        """
+        Yields (timestamp, item) where item is a decoded MAVLink message or
+        the dict of a recorded event. With last, only the final last seconds
+        before the newest record are returned.
+        """
+        from pymavlink import mavutil
+        mav = mavutil.mavlink.MAVLink(None)
+        mav.robust_parsing = True
+        records = list(self.records_raw())
+        if last is not None and records:
+            cutoff = records[-1][0] - last
+            records = [record for record in records if record[0] >= cutoff]
+        for timestamp, kind, payload in records:
+            if kind == KIND_MAVLINK:
+                try:
+                    msg = mav.decode(bytearray(payload))
+                except Exception:
+                    continue
+                msg._timestamp = timestamp
+                yield timestamp, msg
+            elif kind == KIND_EVENT:
+                yield timestamp, json.loads(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dump a black box ring buffer.")
+    parser.add_argument('path', nargs='?', default='start/blackbox.bin')
+    parser.add_argument('--last', type=float, help="Only the final N seconds")
+    parser.add_argument('--types', nargs='*', help="Only these MAVLink types (events are always shown)")
+    parser.add_argument('--tlog', help="Write the MAVLink frames to this tlog for replay.py instead of printing")
+    args = parser.parse_args()
+
+    reader = BlackBoxReader(args.path)
+    print(f"{reader.records} records, {reader.head - reader.tail} bytes of {reader.capacity}")
+    types = set(args.types) if args.types else None
+    if args.tlog:
+        with open(args.tlog, 'wb') as f:
+            for timestamp, item in reader.messages(args.last):
+                if not isinstance(item, dict) and (types is None or item.get_type() in types):
+                    f.write(TLOG_TIMESTAMP.pack(round(timestamp * 1e6)) + item.get_msgbuf())
+        return
+    for timestamp, item in reader.messages(args.last):
+        stamp = time.strftime('%H:%M:%S', time.localtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}"
+        if isinstance(item, dict):
+            print(f"{stamp} EVENT {json.dumps(item)}")
+        elif types is None or item.get_type() in types:
+            print(f"{stamp} {item}")
+
+
+if __name__ == "__main__":
+    main()
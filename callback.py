@@ -1,38 +1,51 @@
 # drone_functions.py (updated)
 import threading
+from lib.telemetry_store import TelemetryStore
+
+# Types the application itself waits on or reads from the telemetry store:
+# mode confirmation, mission upload and progress, ego-motion and battery
+REQUIRED_TELEMETRY = ('HEARTBEAT', 'MISSION_*', 'GLOBAL_POSITION_INT', 'SYS_STATUS')
 
 class MavlinkCallBack:
-    def __init__(self, event_bus):
+    def __init__(self, event_bus, drone_commands=None, telemetry_types=None):
         self.event_bus = event_bus
-        self.messages = {}
+        self.drone_commands = drone_commands
         self.lock = threading.Lock()
 
-        # Subscribe to all messages
-        self.event_bus.subscribe('ALL', self.handle_message)
+        # Store the latest message of each type (every type unless restricted),
+        # with version counters. A restricted set always keeps the required
+        # types, or the waits on them would never return
+        if telemetry_types:
+            telemetry_types = list(telemetry_types) + [
+                msg_type for msg_type in REQUIRED_TELEMETRY if msg_type not in telemetry_types
+            ]
+        self.telemetry = TelemetryStore(self.event_bus, telemetry_types or ('ALL',))
 
         # Subscribe to specific messages
         self.event_bus.subscribe('HEARTBEAT', self.handle_heartbeat)
         self.event_bus.subscribe('ATTITUDE', self.handle_attitude)
+        self.event_bus.subscribe('GLOBAL_POSITION_INT', self.handle_global_position)
 
         # Store specific data
         self.system_status = None
         self.attitude = None
-   
+
     def get_message(self, msg_type):
-        with self.lock:
-            return self.messages.get(msg_type, None)
+        return self.telemetry.get(msg_type)
 
     def get_all_messages(self):
-        with self.lock:
-            return dict(self.messages)
-             
-    def handle_message(self, msg):
-        with self.lock:
-            # Store the latest message of each type
-            self.messages[msg.get_type()] = msg
-            # Update landed status if it's a relevant message
-            if msg.get_type() == 'GLOBAL_POSITION_INT':
-                self.drone_commands.update_landed_status(msg)
+        return self.telemetry.snapshot()
+
+    def wait_for(self, msg_type, predicate=None, timeout=None, after_version=0):
+        return self.telemetry.wait_for(msg_type, predicate, timeout, after_version)
+
+    async def wait_for_async(self, msg_type, predicate=None, timeout=None, after_version=0):
+        return await self.telemetry.wait_for_async(msg_type, predicate, timeout, after_version)
+
+    def handle_global_position(self, msg):
+        # Update landed status from position messages
+        if self.drone_commands:
+            self.drone_commands.update_landed_status(msg)
 
     def handle_heartbeat(self, msg):
         with self.lock:
@@ -1,93 +1,124 @@
 # commands.py
 from pymavlink import mavutil
 import time
+from outbound_queue import PRIORITY_CRITICAL, PRIORITY_COMMAND, PRIORITY_SETPOINT
 
 class MavlinkCommands:
-    def __init__(self, mavlink_connection, logger):
+    # Map mode string to mode ID based on ArduPilot's mode mappings
+    # These mode IDs are placeholders. Replace them with actual mode numbers as per your firmware.
+    MODE_MAPPING = {
+        'AUTO': 4,       # Example ID, adjust based on actual mappings
+        'GUIDED': 7,
+        'STABILIZE': 2,
+        'RTL': 6,
+        'LAND': 9
+        # Add other modes as needed
+    }
+
+    def __init__(self, mavlink_connection, logger, outbound=None):
+        """
+        :param mavlink_connection: The pymavlink connection to the flight controller.
+        :param logger: The logger instance for logging messages.
+        :param outbound: Optional OutboundQueue; when given, every message goes
+                         through its single writer instead of being written
+                         from the calling thread.
+        """
         self.mav = mavlink_connection.mav
         self.connection = mavlink_connection
         self.logger = logger
+        self.outbound = outbound
         self.landed = False
 
+    def send(self, message, priority=PRIORITY_COMMAND, key=None):
+        if self.outbound:
+            self.outbound.submit(message, priority, key)
+        else:
+            self.mav.send(message)
+
     def arm(self):
         self.logger.info("Sending ARM command")
-        self.mav.command_long_send(
+        self.send(self.mav.command_long_encode(
             self.connection.target_system,
             self.connection.target_component,
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
             0,
             1, 0, 0, 0, 0, 0, 0
-        )
+        ))
 
     def disarm(self):
         self.logger.info("Sending DISARM command")
-        self.mav.command_long_send(
+        self.send(self.mav.command_long_encode(
             self.connection.target_system,
             self.connection.target_component,
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
             0,
             0, 0, 0, 0, 0, 0, 0
-        )
+        ), PRIORITY_CRITICAL)
         self.landed = True  # Assume disarmed means landed
 
     def takeoff(self, altitude):
         self.logger.info(f"Sending TAKEOFF command to {altitude} meters")
-        self.mav.command_long_send(
+        self.send(self.mav.command_long_encode(
             self.connection.target_system,
             self.connection.target_component,
             mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
             0,
             0, 0, 0, 0, 0, 0, altitude
-        )
+        ))
 
     def land(self):
         self.logger.info("Sending LAND command")
-        self.mav.command_long_send(
+        self.send(self.mav.command_long_encode(
             self.connection.target_system,
             self.connection.target_component,
             mavutil.mavlink.MAV_CMD_NAV_LAND,
             0,
             0, 0, 0, 0, 0, 0, 0
-        )
+        ), PRIORITY_CRITICAL)
 
     def set_mode(self, mode):
         self.logger.info(f"Setting mode to {mode}")
-        # Map mode string to mode ID based on ArduPilot's mode mappings
-        # These mode IDs are placeholders. Replace them with actual mode numbers as per your firmware.
-        mode_mapping = {
-            'AUTO': 4,       # Example ID, adjust based on actual mappings
-            'GUIDED': 7,
-            'STABILIZE': 2,
-            'RTL': 6,
-            'LAND': 9
-            # Add other modes as needed
-        }
-        if mode not in mode_mapping:
+        if mode not in self.MODE_MAPPING:
             self.logger.error(f"Unknown mode: {mode}")
             return
 
-        mode_id = mode_mapping[mode]
-        self.mav.set_mode_send(
+        mode_id = self.MODE_MAPPING[mode]
+        self.send(self.mav.set_mode_encode(
             self.connection.target_system,
             mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
             mode_id
-        )
+        ), PRIORITY_CRITICAL)
         self.logger.info(f"Set mode to {mode}")
 
     def return_to_launch(self):
         self.logger.info("Sending RETURN_TO_LAUNCH command")
-        self.mav.command_long_send(
+        self.send(self.mav.command_long_encode(
             self.connection.target_system,
             self.connection.target_component,
             mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH,
             0,
             0, 0, 0, 0, 0, 0, 0
-        )
+        ), PRIORITY_CRITICAL)
         
+    def set_message_interval(self, msg_id, interval_us):
+        """
+        Requests a stream interval for one message ID. interval_us is -1 to
+        stop the stream and 0 to restore the autopilot's default rate.
+        """
+        self.logger.debug("Sending SET_MESSAGE_INTERVAL for message %s: %s us", msg_id, interval_us)
+        self.send(self.mav.command_long_encode(
+            self.connection.target_system,
+            self.connection.target_component,
+            mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+            0,
+            msg_id, interval_us, 0, 0, 0, 0, 0
+        ))
+
     def send_velocity_command(self, vx, vy, vz):
-            self.logger.debug(f"Sending velocity command: vx={vx}, vy={vy}, vz={vz}")
-            # Use the SET_POSITION_TARGET_LOCAL_NED message
-            self.mav.set_position_target_local_ned_send(
+            self.logger.debug("Sending velocity command: vx=%s, vy=%s, vz=%s", vx, vy, vz)
+            # Use the SET_POSITION_TARGET_LOCAL_NED message; a queued setpoint
+            # that has not gone out yet is replaced by this one
+            self.send(self.mav.set_position_target_local_ned_encode(
                 0,  # time_boot_ms (not used)
                 self.connection.target_system,
                 self.connection.target_component,
@@ -97,16 +128,16 @@ class MavlinkCommands:
                 vx, vy, vz,  # Velocity in m/s
                 0, 0, 0,  # Accelerations (not used)
                 0, 0  # Yaw, yaw rate (not used)
-        )
+        ), PRIORITY_SETPOINT, key='velocity')
             
     def update_landed_status(self, msg):
         # Update landed status based on incoming MAVLink messages
         # Example: Check altitude and velocity
         if msg.get_type() == 'GLOBAL_POSITION_INT':
             altitude = msg.relative_alt / 1000.0  # Convert mm to meters
-            self.logger.debug(f"Current altitude: {altitude} meters")
-            if altitude < 0.5:
-                self.landed = True
+            self.logger.debug("Current altitude: %s meters", altitude)
+            # Follows the altitude both ways; the status on the ground before take-off must not stick
+            self.landed = altitude < 0.5
 
     def is_landed(self):
         return self.landed
@@ -1,26 +1,294 @@
 # data_recorder.py
 import csv
+import glob
+import gzip
+import os
+import queue
 import threading
+import time
+import numpy as np
+from lib.event_bus import POLICY_DROP_OLDEST
+from lib.mavlink_frames import TLOG_TIMESTAMP
+
+FORMAT_CSV = 'csv'
+FORMAT_TLOG = 'tlog'
+FORMAT_COLUMNAR = 'columnar'
+
+COLUMNAR_SUFFIX = '.npy.gz'
+
+# MAVLink wire types to NumPy dtypes; char fields become fixed-width byte strings
+MAVLINK_DTYPES = {
+    'float': 'f4',
+    'double': 'f8',
+    'int8_t': 'i1',
+    'uint8_t': 'u1',
+    'int16_t': 'i2',
+    'uint16_t': 'u2',
+    'int32_t': 'i4',
+    'uint32_t': 'u4',
+    'int64_t': 'i8',
+    'uint64_t': 'u8',
+}
 
 class DataRecorder:
-    def __init__(self, event_bus, filename='flight_data.csv'):
+    def __init__(self, event_bus, logger, filename='flight_data.csv', file_format=FORMAT_CSV,
+                 flush_interval=0.5, flush_size=1 << 20):
+        """
+        Records every MAVLink message published on the event bus.
+
+        FORMAT_TLOG appends each message's raw frame with an 8-byte timestamp
+        prefix to an in-memory buffer; a background thread writes the buffer
+        out in large chunks. The file can be opened by standard tlog tools and
+        replayed with replay.py. FORMAT_CSV writes one row per message with
+        its type, and a header row whenever a new type first appears.
+
+        :param event_bus: The event bus to record from.
+        :param logger: The logger instance for logging messages.
+        :param filename: Output file.
+        :param file_format: FORMAT_CSV or FORMAT_TLOG.
+        :param flush_interval: Seconds between background writes in tlog mode.
+        :param flush_size: Buffered bytes that trigger an early write in tlog mode.
+        """
+        if file_format not in (FORMAT_CSV, FORMAT_TLOG):
+            raise ValueError(f"Unknown recording format: {file_format}")
         self.event_bus = event_bus
+        self.logger = logger
         self.filename = filename
+        self.file_format = file_format
         self.lock = threading.Lock()
-        self.file = open(self.filename, 'w', newline='')
-        self.writer = csv.writer(self.file)
-        self.header_written = False
+        self.records = 0
 
-        self.event_bus.subscribe('ALL', self.record_message)
+        if file_format == FORMAT_TLOG:
+            self.file = open(self.filename, 'wb')
+            self.buffer = bytearray()
+            self.flush_interval = flush_interval
+            self.flush_size = flush_size
+            self.bytes_written = 0
+            self.flush_event = threading.Event()
+            self.running = True
+            self.thread = threading.Thread(target=self._flush_loop, name="data-recorder", daemon=True)
+            self.thread.start()
+            # Appending bytes is cheap enough to run inline on the publishing thread
+            self.event_bus.subscribe('ALL', self.record_frame)
+        else:
+            self.file = open(self.filename, 'w', newline='')
+            self.writer = csv.writer(self.file)
+            self.fieldnames = {}  # Message type -> field names, once its header is written
+            # Record on a bus worker so CSV writes never hold up MAVLink reception
+            self.event_bus.subscribe('ALL', self.record_message, policy=POLICY_DROP_OLDEST, maxsize=4096)
 
     def record_message(self, msg):
+        if not hasattr(msg, 'get_fieldnames'):
+            return  # Not a MAVLink message, e.g. a landing decision
         with self.lock:
-            data = msg.to_dict()
-            if not self.header_written:
-                self.writer.writerow(data.keys())
-                self.header_written = True
-            self.writer.writerow(data.values())
+            msg_type = msg.get_type()
+            fieldnames = self.fieldnames.get(msg_type)
+            if fieldnames is None:
+                fieldnames = self.fieldnames[msg_type] = msg.get_fieldnames()
+                self.writer.writerow(['timestamp', 'msg_type'] + list(fieldnames))
+            timestamp = getattr(msg, '_timestamp', None) or time.time()
+            self.writer.writerow([timestamp, msg_type] + [getattr(msg, name) for name in fieldnames])
+            self.records += 1
+
+    def record_frame(self, msg):
+        get_msgbuf = getattr(msg, 'get_msgbuf', None)
+        frame = get_msgbuf() if get_msgbuf else None
+        if not frame:
+            return
+        timestamp = getattr(msg, '_timestamp', None) or time.time()
+        with self.lock:
+            self.buffer += TLOG_TIMESTAMP.pack(round(timestamp * 1e6))
+            self.buffer += frame
+            self.records += 1
+            if len(self.buffer) >= self.flush_size:
+                self.flush_event.set()
+
+    def _flush_loop(self):
+        while self.running:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            self._write_buffer()
+
+    def _write_buffer(self):
+        # Swap buffers under the lock and write outside it
+        with self.lock:
+            if not self.buffer:
+                return
+            data = self.buffer
+            self.buffer = bytearray()
+        try:
+            self.file.write(data)
+            self.bytes_written += len(data)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"DataRecorder write failed: {e}")
 
     def close(self):
+        if self.file_format == FORMAT_TLOG:
+            self.event_bus.unsubscribe('ALL', self.record_frame)
+            self.running = False
+            self.flush_event.set()
+            self.thread.join()
+            self._write_buffer()
+            self.logger.info(f"DataRecorder wrote {self.records} frames ({self.bytes_written} bytes) to {self.filename}")
+        else:
+            self.event_bus.unsubscribe('ALL', self.record_message)
         with self.lock:
             self.file.close()
+
+
+def message_dtype(msg):
+    """
+    Returns the structured dtype for a MAVLink message type: a float64
+    'timestamp' column followed by every payload field in definition order.
+    """
+    # array_lengths follows the wire order, fieldnames and fieldtypes the definition order
+    lengths = dict(zip(msg.ordered_fieldnames, msg.array_lengths))
+    fields = [('timestamp', 'f8')]
+    for name, field_type in zip(msg.fieldnames, msg.fieldtypes):
+        length = lengths[name]
+        if field_type == 'char':
+            fields.append((name, f"S{max(length, 1)}"))
+        elif length:
+            fields.append((name, MAVLINK_DTYPES[field_type], (length,)))
+        else:
+            fields.append((name, MAVLINK_DTYPES[field_type]))
+    return np.dtype(fields)
+
+
+class _ColumnBuffer:
+    __slots__ = ('fieldnames', 'rows', 'count')
+
+    def __init__(self, msg, chunk_rows):
+        self.fieldnames = list(msg.fieldnames)
+        self.rows = np.empty(chunk_rows, dtype=message_dtype(msg))
+        self.count = 0
+
+
+class ColumnarRecorder:
+    def __init__(self, event_bus, logger, directory='flight_data', msg_types=None,
+                 chunk_rows=4096, compresslevel=1):
+        """
+        Records each MAVLink message type into its own typed columnar file.
+
+        Every type gets a preallocated NumPy structured array that messages
+        are copied into field by field. Full chunks are handed to a writer
+        thread, which appends them to directory/TYPE.npy.gz. Each file is a
+        gzip stream of consecutive .npy arrays; load_columns() reads one
+        back as a single array.
+
+        :param event_bus: The event bus to record from.
+        :param logger: The logger instance for logging messages.
+        :param directory: Output directory, created if missing.
+        :param msg_types: Optional iterable of message types to record; all when empty.
+        :param chunk_rows: Rows per type buffered before a chunk is written.
+        :param compresslevel: gzip level; low levels keep the writer cheap.
+        """
+        self.event_bus = event_bus
+        self.logger = logger
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.compresslevel = compresslevel
+        self.lock = threading.Lock()
+        self.buffers = {}  # Message type -> _ColumnBuffer
+        self.files = {}    # Message type -> open gzip file, used by the writer thread only
+        self.records = 0
+        self.chunks_written = 0
+        self.errors = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.chunks = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, name="columnar-recorder", daemon=True)
+        self.thread.start()
+
+        self.topics = list(msg_types) if msg_types else ['ALL']
+        for topic in self.topics:
+            self.event_bus.subscribe(topic, self.record_message)
+
+    def record_message(self, msg):
+        if not hasattr(msg, 'fieldnames'):
+            return  # Not a MAVLink message, e.g. a landing decision
+        msg_type = msg.get_type()
+        timestamp = getattr(msg, '_timestamp', None) or time.time()
+        with self.lock:
+            buffer = self.buffers.get(msg_type)
+            if buffer is None:
+                try:
+                    buffer = self.buffers[msg_type] = _ColumnBuffer(msg, self.chunk_rows)
+                except (KeyError, AttributeError, TypeError) as e:
+                    self.errors += 1
+                    self.logger.error(f"ColumnarRecorder cannot record {msg_type}: {e}")
+                    self.buffers[msg_type] = buffer = None
+                    return
+            elif buffer is None:
+                return  # Unsupported type, already reported
+            try:
+                buffer.rows[buffer.count] = (timestamp,) + tuple(getattr(msg, name) for name in buffer.fieldnames)
+            except (ValueError, TypeError, UnicodeEncodeError):
+                self.errors += 1
+                return
+            buffer.count += 1
+            self.records += 1
+            if buffer.count == self.chunk_rows:
+                self.chunks.put((msg_type, buffer.rows))
+                buffer.rows = np.empty(self.chunk_rows, dtype=buffer.rows.dtype)
+                buffer.count = 0
+
+    def _write_loop(self):
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                return
+            msg_type, rows = item
+            try:
+                f = self.files.get(msg_type)
+                if f is None:
+                    path = os.path.join(self.directory, msg_type + COLUMNAR_SUFFIX)
+                    f = self.files[msg_type] = gzip.open(path, 'wb', compresslevel=self.compresslevel)
+                np.lib.format.write_array(f, rows, allow_pickle=False)
+                self.chunks_written += 1
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                self.logger.error(f"ColumnarRecorder write failed for {msg_type}: {e}")
+
+    def close(self):
+        for topic in self.topics:
+            self.event_bus.unsubscribe(topic, self.record_message)
+        # Queue the partial chunks, then let the writer drain and exit
+        with self.lock:
+            for msg_type, buffer in self.buffers.items():
+                if buffer is not None and buffer.count:
+                    self.chunks.put((msg_type, buffer.rows[:buffer.count].copy()))
+                    buffer.count = 0
+        self.chunks.put(None)
+        self.thread.join()
+        for f in self.files.values():
+            f.close()
+        self.logger.info(
+            f"ColumnarRecorder wrote {self.records} messages of {len(self.files)} types "
+            f"in {self.chunks_written} chunks to {self.directory} ({self.errors} errors)"
+        )
+
+
+def load_columns(directory, msg_type):
+    """
+    Loads everything ColumnarRecorder wrote for one message type as a single
+    structured array, e.g. load_columns('flight_data', 'ATTITUDE')['roll'].
+    """
+    path = os.path.join(directory, msg_type + COLUMNAR_SUFFIX)
+    chunks = []
+    with gzip.open(path, 'rb') as f:
+        while f.peek(1):
+            chunks.append(np.lib.format.read_array(f, allow_pickle=False))
+    if not chunks:
+        raise ValueError(f"{path} contains no data")
+    return np.concatenate(chunks)
+
+
+def recorded_types(directory):
+    """
+    Lists the message types ColumnarRecorder wrote to a directory.
+    """
+    return sorted(
+        os.path.basename(path)[:-len(COLUMNAR_SUFFIX)]
+        for path in glob.glob(os.path.join(directory, '*' + COLUMNAR_SUFFIX))
+    )
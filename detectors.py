@@ -0,0 +1,169 @@
+# detectors.py
+import math
+import cv2
+import numpy as np
+
+
+class PadDetector:
+    """
+    Finds the landing pad in a BGR image. Subclasses take their parameters
+    once in the constructor and precompute whatever they can.
+    """
+    name = None
+
+    def detect(self, image, min_radius=None, max_radius=None):
+        """
+        :param image: BGR image.
+        :param min_radius: Optional smallest pad radius in image pixels.
+        :param max_radius: Optional largest pad radius in image pixels.
+        :return: (x, y, radius) in image pixels, or None.
+        """
+        raise NotImplementedError
+
+
+class _WhiteMaskDetector(PadDetector):
+    def __init__(self, lower=(0, 0, 200), upper=(180, 30, 255), kernel_size=5):
+        self.lower = np.array(lower, dtype=np.uint8)
+        self.upper = np.array(upper, dtype=np.uint8)
+        self.kernel = np.ones((kernel_size, kernel_size), np.uint8)
+
+    def white_mask(self, image):
+        # Isolate white regions and remove noise
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, self.lower, self.upper)
+        mask = cv2.erode(mask, self.kernel, iterations=1)
+        return cv2.dilate(mask, self.kernel, iterations=2)
+
+
+class HoughDetector(_WhiteMaskDetector):
+    name = 'hough'
+
+    def __init__(self, dp=1.2, min_dist=50, param1=50, param2=20, min_radius=10, blur=9, **mask_options):
+        """
+        White mask followed by HoughCircles; the largest circle wins.
+        """
+        super().__init__(**mask_options)
+        self.dp = dp
+        self.min_dist = min_dist
+        self.param1 = param1
+        self.param2 = param2
+        self.min_radius = min_radius
+        self.blur = (blur, blur)
+
+    def detect(self, image, min_radius=None, max_radius=None):
+        mask = self.white_mask(image)
+        # Masked grayscale, blurred so the circle edge is smooth
+        gray = cv2.cvtColor(cv2.bitwise_and(image, image, mask=mask), cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, self.blur, 2)
+        circles = cv2.HoughCircles(
+            blurred,
+            cv2.HOUGH_GRADIENT,
+            dp=self.dp,
+            minDist=self.min_dist,
+            param1=self.param1,
+            param2=self.param2,
+            minRadius=self.min_radius if min_radius is None else min_radius,
+            maxRadius=max_radius or 0
+        )
+        if circles is None:
+            return None
+        x, y, radius = max(circles[0, :], key=lambda c: c[2])
+        return float(x), float(y), float(radius)
+
+
+class ContourDetector(_WhiteMaskDetector):
+    name = 'contour'
+
+    def __init__(self, min_radius=10, min_circularity=0.7, **mask_options):
+        """
+        White mask, external contours and image moments: the largest
+        sufficiently round blob is the pad, its centroid the centre and
+        sqrt(area / pi) the radius.
+        """
+        super().__init__(**mask_options)
+        self.min_radius = min_radius
+        self.min_circularity = min_circularity
+
+    def detect(self, image, min_radius=None, max_radius=None):
+        mask = self.white_mask(image)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = math.pi * (self.min_radius if min_radius is None else min_radius) ** 2
+        max_area = math.pi * max_radius ** 2 if max_radius else None
+        best = None
+        best_area = 0.0
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < min_area or area <= best_area or (max_area is not None and area > max_area):
+                continue
+            perimeter = cv2.arcLength(contour, True)
+            if perimeter <= 0 or 4 * math.pi * area / (perimeter * perimeter) < self.min_circularity:
+                continue
+            best = contour
+            best_area = area
+        if best is None:
+            return None
+        moments = cv2.moments(best)
+        if moments['m00'] == 0:
+            return None
+        return moments['m10'] / moments['m00'], moments['m01'] / moments['m00'], math.sqrt(best_area / math.pi)
+
+
+class FiducialDetector(PadDetector):
+    name = 'fiducial'
+
+    def __init__(self, dictionary='DICT_APRILTAG_36h11', marker_id=None):
+        """
+        ArUco or AprilTag marker on the pad, using OpenCV's aruco module.
+        The centre is the mean of the marker corners and the radius half
+        the mean side length.
+
+        :param dictionary: cv2.aruco dictionary name, e.g. DICT_4X4_50 or DICT_APRILTAG_36h11.
+        :param marker_id: Only accept this marker ID; any marker when None.
+        """
+        aruco = getattr(cv2, 'aruco', None)
+        if aruco is None or not hasattr(aruco, dictionary):
+            raise ImportError(f"OpenCV build has no aruco support for {dictionary}")
+        self.dictionary = aruco.getPredefinedDictionary(getattr(aruco, dictionary))
+        self.marker_id = marker_id
+        if hasattr(aruco, 'ArucoDetector'):
+            self._detector = aruco.ArucoDetector(self.dictionary, aruco.DetectorParameters())
+            self._detect = self._detector.detectMarkers
+        else:
+            # OpenCV < 4.7
+            parameters = aruco.DetectorParameters_create()
+            self._detect = lambda gray: aruco.detectMarkers(gray, self.dictionary, parameters=parameters)
+
+    def detect(self, image, min_radius=None, max_radius=None):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        corners, ids, _ = self._detect(gray)
+        if ids is None:
+            return None
+        best = None
+        for marker_corners, marker_id in zip(corners, ids.flatten()):
+            if self.marker_id is not None and marker_id != self.marker_id:
+                continue
+            points = marker_corners.reshape(4, 2)
+            sides = np.linalg.norm(points - np.roll(points, 1, axis=0), axis=1)
+            radius = float(sides.mean()) / 2
+            if (min_radius is not None and radius < min_radius) or (max_radius and radius > max_radius):
+                continue
+            if best is None or radius > best[2]:
+                center = points.mean(axis=0)
+                best = (float(center[0]), float(center[1]), radius)
+        return best
+
+
+DETECTORS = {
+    HoughDetector.name: HoughDetector,
+    ContourDetector.name: ContourDetector,
+    FiducialDetector.name: FiducialDetector,
+}
+
+
+def create_detector(name='hough', options=None):
+    """
+    Builds a detector backend by name with its constructor options.
+    """
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown landing pad detector: {name}")
+    return DETECTORS[name](**(options or {}))
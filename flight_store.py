@@ -0,0 +1,353 @@
+# flight_store.py
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from lib.mavlink_frames import TLOG_TIMESTAMP, frame_msgid, frame_size
+
+SEGMENT_SUFFIX = '.tlz'
+INDEX_SUFFIX = '.idx.json'
+
+
+class FlightStore:
+    def __init__(self, event_bus, logger, root='flights', flight_id=None, block_size=256 << 10,
+                 block_seconds=5.0, segment_size=64 << 20, segment_seconds=600.0, compresslevel=6,
+                 router=None):
+        """
+        Records a flight as rotated segments of independently compressed blocks.
+
+        Messages are appended as tlog records (timestamp, raw frame) to an
+        in-memory block. A block is closed when it reaches block_size bytes
+        or spans block_seconds, then compressed and appended to the current
+        segment file by a writer thread. Every segment has a JSON index
+        listing each block's byte offset, compressed length, time range and
+        message-type counts, so FlightArchive can seek straight to the blocks
+        a query needs. The index is rewritten after every block, so a crash
+        loses at most the blocks still in memory.
+
+        With a router, frames are recorded from its raw-frame path, so bulk
+        ingest still decodes only the types other components subscribe to.
+        Without one, every MAVLink message published on the bus is recorded.
+
+        :param event_bus: The event bus to record from.
+        :param logger: The logger instance for logging messages.
+        :param root: Archive directory; each flight gets a subdirectory.
+        :param flight_id: Flight directory name; the start time when omitted.
+        :param block_size: Uncompressed bytes per block.
+        :param block_seconds: Maximum time span of a block.
+        :param segment_size: Compressed bytes after which a new segment starts.
+        :param segment_seconds: Maximum time span of a segment.
+        :param compresslevel: zlib level for blocks.
+        :param router: Optional MavlinkRouter to record raw frames from.
+        """
+        self.event_bus = event_bus
+        self.router = router
+        self.logger = logger
+        self.flight_id = flight_id or time.strftime('%Y%m%d-%H%M%S')
+        self.directory = os.path.join(root, self.flight_id)
+        self.block_size = block_size
+        self.block_seconds = block_seconds
+        self.segment_size = segment_size
+        self.segment_seconds = segment_seconds
+        self.compresslevel = compresslevel
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._new_block()
+        self.records = 0
+
+        # Writer thread state
+        self.blocks = queue.Queue()
+        self.segment_number = -1
+        self.segment_file = None
+        self.segment_index = None
+        self.bytes_written = 0
+        self.thread = threading.Thread(target=self._write_loop, name="flight-store", daemon=True)
+        self.thread.start()
+
+        if router:
+            router.add_frame_sink(self.record_frame)
+        else:
+            self.event_bus.subscribe('ALL', self.record)
+        self.logger.info(f"FlightStore recording flight {self.flight_id} to {self.directory}")
+
+    def _new_block(self):
+        # Caller must hold self.lock, or be the constructor
+        self.block = bytearray()
+        self.block_types = {}
+        self.block_start = None
+        self.block_end = None
+
+    def record(self, msg):
+        get_msgbuf = getattr(msg, 'get_msgbuf', None)
+        frame = get_msgbuf() if get_msgbuf else None
+        if not frame:
+            return
+        self.record_frame(msg.get_type(), frame, getattr(msg, '_timestamp', None))
+
+    def record_frame(self, msg_type, frame, timestamp=None):
+        """
+        Appends one raw frame; also the router frame sink, which stamps
+        frames on receipt.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            if self.block_start is None:
+                self.block_start = timestamp
+            elif timestamp - self.block_start >= self.block_seconds:
+                self._close_block()
+                self.block_start = timestamp
+            self.block += TLOG_TIMESTAMP.pack(round(timestamp * 1e6))
+            self.block += frame
+            self.block_end = timestamp
+            self.block_types[msg_type] = self.block_types.get(msg_type, 0) + 1
+            self.records += 1
+            if len(self.block) >= self.block_size:
+                self._close_block()
+
+    def _close_block(self):
+        # Caller must hold self.lock
+        if self.block:
+            self.blocks.put((bytes(self.block), self.block_start, self.block_end, self.block_types))
+        self._new_block()
+
+    def _open_segment(self):
+        if self.segment_file:
+            self.segment_file.close()
+        self.segment_number += 1
+        name = f"segment-{self.segment_number:05d}"
+        self.segment_file = open(os.path.join(self.directory, name + SEGMENT_SUFFIX), 'wb')
+        self.segment_index = {
+            'flight': self.flight_id,
+            'segment': name + SEGMENT_SUFFIX,
+            'start': None,
+            'end': None,
+            'blocks': [],
+        }
+
+    def _segment_full(self, start):
+        index = self.segment_index
+        return (self.segment_file.tell() >= self.segment_size
+                or (index['start'] is not None and start - index['start'] >= self.segment_seconds))
+
+    def _write_loop(self):
+        while True:
+            item = self.blocks.get()
+            if item is None:
+                return
+            data, start, end, types = item
+            try:
+                if self.segment_file is None or self._segment_full(start):
+                    self._open_segment()
+                compressed = zlib.compress(data, self.compresslevel)
+                offset = self.segment_file.tell()
+                self.segment_file.write(compressed)
+                self.segment_file.flush()
+                self.bytes_written += len(compressed)
+                index = self.segment_index
+                index['blocks'].append({
+                    'offset': offset,
+                    'length': len(compressed),
+                    'raw_length': len(data),
+                    'start': start,
+                    'end': end,
+                    'types': types,
+                })
+                if index['start'] is None:
+                    index['start'] = start
+                index['end'] = end
+                self._write_index()
+            except (OSError, ValueError) as e:
+                self.logger.error(f"FlightStore write failed: {e}")
+
+    def _write_index(self):
+        path = os.path.join(self.directory, self.segment_index['segment'][:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.segment_index, f)
+        os.replace(tmp, path)
+
+    def close(self):
+        if self.router:
+            self.router.remove_frame_sink(self.record_frame)
+        else:
+            self.event_bus.unsubscribe('ALL', self.record)
+        with self.lock:
+            self._close_block()
+        self.blocks.put(None)
+        self.thread.join()
+        if self.segment_file:
+            self.segment_file.close()
+        self.logger.info(
+            f"FlightStore closed flight {self.flight_id}: {self.records} messages, "
+            f"{self.segment_number + 1} segments, {self.bytes_written} bytes"
+        )
+
+
+class FlightArchive:
+    def __init__(self, root='flights'):
+        """
+        Queries flights recorded by FlightStore using their segment indexes.
+        """
+        self.root = root
+
+    def flights(self):
+        """
+        Returns {flight_id: (start, end, message count)} for every flight in the archive.
+        """
+        flights = {}
+        for directory in sorted(glob.glob(os.path.join(self.root, '*'))):
+            indexes = self._indexes(directory)
+            if not indexes:
+                continue
+            starts = [index['start'] for index in indexes if index['start'] is not None]
+            ends = [index['end'] for index in indexes if index['end'] is not None]
+            count = sum(sum(block['types'].values()) for index in indexes for block in index['blocks'])
+            flights[os.path.basename(directory)] = (min(starts, default=None), max(ends, default=None), count)
+        return flights
+
+    def _indexes(self, directory):
+        indexes = []
+        for path in sorted(glob.glob(os.path.join(directory, '*' + INDEX_SUFFIX))):
+            with open(path) as f:
+                indexes.append(json.load(f))
+        return indexes
+
+    def query(self, msg_types=None, start=None, end=None, flights=None):
+        """
+        Yields (flight_id, timestamp, frame) for the matching raw frames in
+        time order within each flight. Only blocks whose index entry overlaps
+        [start, end] and contains one of msg_types are read and decompressed.
+
+        :param msg_types: Optional iterable of message types; all when empty.
+        :param start: Optional start time in epoch seconds.
+        :param end: Optional end time in epoch seconds.
+        :param flights: Optional iterable of flight IDs; all flights when empty.
+        """
+        types = set(msg_types) if msg_types else None
+        msg_ids = self._msg_ids(types) if types else None
+        flight_ids = list(flights) if flights else sorted(self.flights())
+        for flight_id in flight_ids:
+            directory = os.path.join(self.root, flight_id)
+            for index in self._indexes(directory):
+                blocks = [
+                    block for block in index['blocks']
+                    if (start is None or block['end'] >= start)
+                    and (end is None or block['start'] <= end)
+                    and (types is None or not types.isdisjoint(block['types']))
+                ]
+                if not blocks:
+                    continue
+                with open(os.path.join(directory, index['segment']), 'rb') as f:
+                    for block in blocks:
+                        f.seek(block['offset'])
+                        data = zlib.decompress(f.read(block['length']))
+                        for timestamp, frame in self._records(data):
+                            if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                                continue
+                            if msg_ids is None or frame_msgid(frame) in msg_ids:
+                                yield flight_id, timestamp, frame
+
+    def messages(self, msg_types=None, start=None, end=None, flights=None):
+        """
+        Same as query() but yields decoded messages with msg._timestamp set.
+        """
+        from pymavlink import mavutil
+        mav = mavutil.mavlink.MAVLink(None)
+        mav.robust_parsing = True
+        for flight_id, timestamp, frame in self.query(msg_types, start, end, flights):
+            try:
+                msg = mav.decode(bytearray(frame))
+            except Exception:
+                continue
+            msg._timestamp = timestamp
+            yield flight_id, timestamp, msg
+
+    @staticmethod
+    def _records(data):
+        pos = 0
+        end = len(data)
+        while pos < end:
+            (timestamp_us,) = TLOG_TIMESTAMP.unpack_from(data, pos)
+            start = pos + TLOG_TIMESTAMP.size
+            size = frame_size(data[start:start + 3])
+            if size is None:
+                return  # Blocks are written whole, so this only happens on corruption
+            pos = start + size
+            yield timestamp_us * 1.0e-6, data[start:pos]
+
+    @staticmethod
+    def _msg_ids(msg_types):
+        from pymavlink import mavutil
+        return {
+            msgid for msgid, msg_class in mavutil.mavlink.mavlink_map.items()
+            if msg_class.msgname in msg_types
+        }
+
+
+def _parse_time(value, flight_start):
+    # '+N' is N seconds after the flight start, anything else epoch seconds
+    if value is None:
+        return None
+    if value.startswith('+'):
+        return (flight_start or 0) + float(value[1:])
+    return float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and query flights recorded by FlightStore.")
+    parser.add_argument('--root', default='flights', help="Archive directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="List archived flights")
+    query_parser = subparsers.add_parser('query', help="Extract messages")
+    query_parser.add_argument('--flight', nargs='*', help="Flight IDs; all when omitted")
+    query_parser.add_argument('--types', nargs='*', help="Message types; all when omitted")
+    query_parser.add_argument('--start', help="Epoch seconds, or +N seconds after the flight start")
+    query_parser.add_argument('--end', help="Epoch seconds, or +N seconds after the flight start")
+    query_parser.add_argument('--tlog', help="Write matching frames to this tlog instead of printing")
+    query_parser.add_argument('--count', action='store_true', help="Only print the number of matches")
+    args = parser.parse_args()
+
+    archive = FlightArchive(args.root)
+    flights = archive.flights()
+    if args.command == 'list':
+        for flight_id, (start, end, count) in flights.items():
+            span = f"{end - start:.1f}s" if start is not None else "empty"
+            began = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start)) if start else '-'
+            print(f"{flight_id}  {began}  {span:>10}  {count} messages")
+        return
+
+    flight_ids = args.flight or sorted(flights)
+    output = open(args.tlog, 'wb') if args.tlog else None
+    matches = 0
+    try:
+        for flight_id in flight_ids:
+            if flight_id not in flights:
+                print(f"Unknown flight: {flight_id}")
+                continue
+            flight_start = flights[flight_id][0]
+            start = _parse_time(args.start, flight_start)
+            end = _parse_time(args.end, flight_start)
+            if output or args.count:
+                for _, timestamp, frame in archive.query(args.types, start, end, [flight_id]):
+                    matches += 1
+                    if output:
+                        output.write(TLOG_TIMESTAMP.pack(round(timestamp * 1e6)) + frame)
+            else:
+                for _, timestamp, msg in archive.messages(args.types, start, end, [flight_id]):
+                    matches += 1
+                    print(f"{flight_id} {timestamp:.3f} {msg}")
+    finally:
+        if output:
+            output.close()
+    if args.count or output:
+        print(f"{matches} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# forwarder.py
+import socket
+import threading
+import time
+from collections import deque
+from lib.mavlink_frames import FrameSplitter
+
+ENDPOINT_TYPES = ('udpout', 'udpin', 'tcp', 'tcpin')
+
+
+class MavlinkEndpoint:
+    def __init__(self, name, kind, address, logger, msg_types=None, rate_limit=0, queue_size=1000):
+        """
+        Forwards raw MAVLink frames between the flight controller link and a
+        UDP or TCP peer such as a ground station.
+
+        Frames are queued by offer() without blocking and written by the
+        endpoint's own sender thread, so a slow peer can only fill and drop
+        its own queue. Frames from the peer are split on frame boundaries and
+        handed to the on_receive callback given to start().
+
+        :param name: Name used in logs and stats.
+        :param kind: 'udpout' (send to address), 'udpin' (bind address and reply
+                     to the last sender), 'tcp' (connect to address) or 'tcpin'
+                     (listen on address).
+        :param address: 'host:port'.
+        :param logger: The logger instance for logging messages.
+        :param msg_types: Optional iterable of message types to forward; all when empty.
+        :param rate_limit: Maximum forwarded messages per second, 0 for no limit.
+        :param queue_size: Maximum queued frames; the oldest is dropped when full.
+        """
+        if kind not in ENDPOINT_TYPES:
+            raise ValueError(f"Unknown endpoint type: {kind}")
+        host, port = address.rsplit(':', 1)
+        self.name = name
+        self.kind = kind
+        self.address = (host, int(port))
+        self.logger = logger
+        self.msg_types = frozenset(msg_types) if msg_types else None
+        self.rate_limit = rate_limit
+        self.queue_size = queue_size
+        self.running = False
+        self.on_receive = None
+
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.sock = None
+        self.peer = None  # Connected TCP socket, or last UDP sender for udpin
+        self.splitter = FrameSplitter()
+        self.threads = []
+
+        self._tokens = float(rate_limit)
+        self._last_refill = time.monotonic()
+
+        self.sent = 0
+        self.dropped = 0
+        self.filtered = 0
+        self.rate_limited = 0
+        self.received = 0
+
+    @classmethod
+    def from_config(cls, endpoint_config, logger):
+        return cls(
+            name=endpoint_config.get('name', endpoint_config['address']),
+            kind=endpoint_config.get('type', 'udpout'),
+            address=endpoint_config['address'],
+            logger=logger,
+            msg_types=endpoint_config.get('msg_types'),
+            rate_limit=endpoint_config.get('rate_limit', 0),
+            queue_size=endpoint_config.get('queue_size', 1000)
+        )
+
+    def start(self, on_receive=None):
+        """
+        Opens the socket and starts the sender and receiver threads.
+
+        :param on_receive: Called with each complete raw frame from the peer.
+        """
+        self.on_receive = on_receive
+        if self.kind in ('udpout', 'udpin'):
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.kind == 'udpin':
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.sock.bind(self.address)
+            else:
+                self.peer = self.address
+            self.sock.settimeout(0.5)
+        elif self.kind == 'tcpin':
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind(self.address)
+            self.sock.listen(1)
+            self.sock.settimeout(0.5)
+        self.running = True
+        for target in (self._send_loop, self._receive_loop):
+            thread = threading.Thread(target=target, name=f"endpoint-{self.name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"MAVLink endpoint '{self.name}' started ({self.kind} {self.address[0]}:{self.address[1]}).")
+
+    def offer(self, msg_type, frame):
+        """
+        Queues a frame for the peer if it passes the type filter and rate
+        limit. Never blocks.
+        """
+        if self.msg_types is not None and msg_type not in self.msg_types:
+            self.filtered += 1
+            return
+        if self.rate_limit:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._last_refill) * self.rate_limit)
+            self._last_refill = now
+            if self._tokens < 1.0:
+                self.rate_limited += 1
+                return
+            self._tokens -= 1.0
+        with self.cond:
+            if len(self.queue) >= self.queue_size:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(frame)
+            self.cond.notify()
+
+    def _send_loop(self):
+        while self.running:
+            with self.cond:
+                while not self.queue and self.running:
+                    self.cond.wait(0.5)
+                if not self.running:
+                    return
+                frames = list(self.queue)
+                self.queue.clear()
+            for frame in frames:
+                self._send(frame)
+
+    def _send(self, frame):
+        peer = self.peer
+        if peer is None:
+            self.dropped += 1
+            return
+        try:
+            if self.kind in ('udpout', 'udpin'):
+                self.sock.sendto(frame, peer)
+            else:
+                peer.sendall(frame)
+            self.sent += 1
+        except OSError as e:
+            self.dropped += 1
+            if self.kind in ('tcp', 'tcpin'):
+                self.logger.warning(f"MAVLink endpoint '{self.name}' disconnected: {e}")
+                self._close_peer(peer)
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                if self.kind in ('udpout', 'udpin'):
+                    data, sender = self.sock.recvfrom(65535)
+                    if self.kind == 'udpin':
+                        self.peer = sender
+                    self._received(data)
+                elif self.peer is None:
+                    self._connect()
+                else:
+                    data = self.peer.recv(65535)
+                    if not data:
+                        self._close_peer(self.peer)
+                        continue
+                    self._received(data)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self.running:
+                    self.logger.warning(f"MAVLink endpoint '{self.name}' receive error: {e}")
+                    self._close_peer(self.peer)
+                    time.sleep(1)
+
+    def _connect(self):
+        if self.kind == 'tcpin':
+            conn, client = self.sock.accept()
+            self.logger.info(f"MAVLink endpoint '{self.name}' accepted {client[0]}:{client[1]}.")
+        else:
+            try:
+                conn = socket.create_connection(self.address, timeout=2)
+            except OSError:
+                time.sleep(1)  # Retry until the peer is up
+                return
+            self.logger.info(f"MAVLink endpoint '{self.name}' connected.")
+        conn.settimeout(0.5)
+        self.splitter = FrameSplitter()
+        self.peer = conn
+
+    def _close_peer(self, peer):
+        if self.kind in ('tcp', 'tcpin') and peer is not None:
+            try:
+                peer.close()
+            except OSError:
+                pass
+            if self.peer is peer:
+                self.peer = None
+
+    def _received(self, data):
+        for _, frame in self.splitter.split(data):
+            self.received += 1
+            if self.on_receive:
+                self.on_receive(frame)
+
+    def stats(self):
+        return {
+            'queued': len(self.queue),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'filtered': self.filtered,
+            'rate_limited': self.rate_limited,
+            'received': self.received,
+        }
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        self._close_peer(self.peer)
+        if self.sock:
+            self.sock.close()
+        for thread in self.threads:
+            thread.join(2)
+        self.logger.info(f"MAVLink endpoint '{self.name}' stopped: {self.stats()}")
@@ -0,0 +1,339 @@
+# frame_sources.py
+import glob
+import os
+import time
+import cv2
+import numpy as np
+
+try:
+    import depthai as dai
+except ImportError:  # Only needed on the drone; other sources work without it
+    dai = None
+
+
+class FrameSource:
+    """
+    Supplies BGR frames of a fixed size to the landing pipeline. read()
+    blocks until the next frame and returns None once the source is
+    exhausted. Sources are context managers: open() on entry, close() on exit.
+    """
+    name = None
+
+    def __init__(self, width=640, height=480, fps=None):
+        """
+        :param width: Frame width in pixels; frames of another size are resized.
+        :param height: Frame height in pixels.
+        :param fps: Pace read() to this rate; as fast as possible when None.
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames_read = 0
+        self._next_due = None
+
+    def open(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _fit(self, frame):
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        return frame
+
+    def _pace(self):
+        # Sleep until the next frame is due so file sources replay at camera rate
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_due is None or now - self._next_due > 1.0:
+            self._next_due = now
+        elif self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due += 1.0 / self.fps
+
+
+class DepthAISource(FrameSource):
+    name = 'depthai'
+
+    def __init__(self, width=640, height=480, fps=None):
+        """
+        OAK camera preview stream. The device queue holds a single frame, so
+        read() always returns the newest one.
+        """
+        if dai is None:
+            raise ImportError("depthai is not installed")
+        super().__init__(width, height, None)
+        self.camera_fps = fps
+        self.device = None
+        self.queue = None
+
+    def open(self):
+        pipeline = dai.Pipeline()
+
+        # Define sources and outputs
+        cam_rgb = pipeline.create(dai.node.ColorCamera)
+        xout_video = pipeline.create(dai.node.XLinkOut)
+        xout_video.setStreamName("video")
+
+        # Properties
+        cam_rgb.setPreviewSize(self.width, self.height)
+        cam_rgb.setInterleaved(False)
+        cam_rgb.setColorOrder(dai.ColorCameraProperties.ColorOrder.BGR)
+        if self.camera_fps:
+            cam_rgb.setFps(self.camera_fps)
+
+        # Linking
+        cam_rgb.preview.link(xout_video.input)
+
+        self.device = dai.Device(pipeline)
+        self.queue = self.device.getOutputQueue(name="video", maxSize=1, blocking=False)
+
+    def read(self):
+        frame = self.queue.get().getCvFrame()
+        self.frames_read += 1
+        return frame
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+
+
+class VideoFileSource(FrameSource):
+    name = 'video'
+
+    def __init__(self, path, width=640, height=480, fps=None, loop=False):
+        """
+        Frames from a recorded video file.
+
+        :param path: Any file cv2.VideoCapture can open.
+        :param loop: Start again from the first frame at the end of the file.
+        """
+        super().__init__(width, height, fps)
+        self.path = path
+        self.loop = loop
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            raise FileNotFoundError(f"Cannot open video {self.path}")
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok and self.loop and self.frames_read:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            return None
+        self._pace()
+        self.frames_read += 1
+        return self._fit(frame)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageDirectorySource(FrameSource):
+    name = 'images'
+
+    def __init__(self, path, width=640, height=480, fps=None, loop=False, pattern='*.png', preload=False):
+        """
+        Frames from the images in a directory, in file name order.
+
+        :param pattern: Glob for the image files, e.g. '*.jpg'.
+        :param preload: Decode every image on open() so read() costs no disk I/O.
+        """
+        super().__init__(width, height, fps)
+        self.path = path
+        self.loop = loop
+        self.pattern = pattern
+        self.preload = preload
+        self.files = []
+        self.images = None
+        self.index = 0
+
+    def open(self):
+        self.files = sorted(glob.glob(os.path.join(self.path, self.pattern)))
+        if not self.files:
+            raise FileNotFoundError(f"No {self.pattern} images in {self.path}")
+        self.index = 0
+        if self.preload:
+            self.images = [self._load(name) for name in self.files]
+
+    def _load(self, name):
+        image = cv2.imread(name)
+        if image is None:
+            raise FileNotFoundError(f"Cannot read {name}")
+        return self._fit(image)
+
+    def read(self):
+        if self.index >= len(self.files):
+            if not self.loop:
+                return None
+            self.index = 0
+        index = self.index
+        self.index += 1
+        frame = self.images[index] if self.images is not None else self._load(self.files[index])
+        self._pace()
+        self.frames_read += 1
+        return frame
+
+
+class SyntheticPadSource(FrameSource):
+    name = 'synthetic'
+
+    def __init__(self, width=640, height=480, fps=None, frames=None, seed=0, offset=(0.0, 0.0),
+                 radius=40.0, velocity=(0.0, 0.0), growth=0.0, jitter=0.0, blur=0.0, noise=8.0,
+                 brightness=1.0, gradient=0.0, background=70, marker=None):
+        """
+        Renders a landing pad at a known position, so detection error can be
+        measured against ground truth. After each read(), truth holds the
+        pad's (x, y, radius) in pixels and truth_offset its offset
+        normalised to -1..1 from the image centre, the same convention as
+        PrecisionLanding.evaluate_detection.
+
+        :param frames: Number of frames before read() returns None; endless when None.
+        :param seed: Seed for noise and jitter, so runs are repeatable.
+        :param offset: Initial (x, y) pad offset from the centre, normalised to -1..1.
+        :param radius: Initial pad radius in pixels.
+        :param velocity: Offset change per frame, normalised units.
+        :param growth: Radius change per frame in pixels; positive simulates a descent.
+        :param jitter: Per-frame random walk of the offset (standard deviation, normalised units).
+        :param blur: Gaussian blur sigma in pixels (defocus or motion).
+        :param noise: Standard deviation of per-pixel sensor noise.
+        :param brightness: Overall lighting gain; below 1 is dimmer.
+        :param gradient: Lighting falloff from left to right, 0 (even) to 1.
+        :param background: Ground grey level before lighting.
+        :param marker: cv2.aruco dictionary name to draw marker 0 on the pad instead of a plain disk.
+        """
+        super().__init__(width, height, fps)
+        self.frames = frames
+        self.offset = tuple(offset)
+        self.radius = float(radius)
+        self.velocity = tuple(velocity)
+        self.growth = growth
+        self.jitter = jitter
+        self.blur = blur
+        self.noise = noise
+        self.brightness = brightness
+        self.gradient = gradient
+        self.background = background
+        self.truth = None
+        self.truth_offset = None
+
+        self.marker = None
+        if marker:
+            aruco = getattr(cv2, 'aruco', None)
+            if aruco is None or not hasattr(aruco, marker):
+                raise ImportError(f"OpenCV build has no aruco support for {marker}")
+            dictionary = aruco.getPredefinedDictionary(getattr(aruco, marker))
+            self.marker = aruco.generateImageMarker(dictionary, 0, 200)
+
+        # Lighting only depends on the frame size; build the gain map once
+        ramp = np.linspace(1.0, 1.0 - gradient, width, dtype=np.float32) * brightness
+        self.lighting = np.ascontiguousarray(np.broadcast_to(ramp[None, :, None], (height, width, 3)))
+        self._noise = np.empty((height, width, 3), np.int16)
+        self.seed = seed
+        self.open()
+
+    def open(self):
+        # Restart the scene from the initial pad position
+        self.frames_read = 0
+        self.rng = np.random.default_rng(self.seed)
+        cv2.setRNGSeed(self.seed)
+        self._position = list(self.offset)
+        self._radius = self.radius
+
+    def read(self):
+        if self.frames is not None and self.frames_read >= self.frames:
+            return None
+        offset_x, offset_y = self._position
+        if self.jitter:
+            offset_x += self.rng.normal(0, self.jitter)
+            offset_y += self.rng.normal(0, self.jitter)
+        frame = self.render(offset_x, offset_y, self._radius)
+        self._position = [offset_x + self.velocity[0], offset_y + self.velocity[1]]
+        self._radius = max(1.0, self._radius + self.growth)
+        self._pace()
+        self.frames_read += 1
+        return frame
+
+    def render(self, offset_x, offset_y, radius, marker=None):
+        """
+        Draws one frame with the pad centred at the normalised offset and
+        sets truth and truth_offset. A radius of 0 draws no pad and sets
+        both to None.
+
+        :param marker: Draw the marker instead of a disk; the source default when None.
+        """
+        x = self.width / 2 * (1 + offset_x)
+        y = self.height / 2 * (1 + offset_y)
+        self.truth = (x, y, radius) if radius > 0 else None
+        self.truth_offset = (offset_x, offset_y) if radius > 0 else None
+
+        image = np.full((self.height, self.width, 3), self.background, np.uint8)
+        use_marker = self.marker is not None if marker is None else marker
+        if radius > 0 and use_marker and self.marker is not None:
+            self._draw_marker(image, x, y, radius)
+        elif radius > 0:
+            # Sub-pixel centre so slow drifts move the pad smoothly
+            shift = 4
+            cv2.circle(image, (round(x * (1 << shift)), round(y * (1 << shift))),
+                       round(radius * (1 << shift)), (255, 255, 255), -1, cv2.LINE_AA, shift)
+
+        if self.blur > 0:
+            image = cv2.GaussianBlur(image, (0, 0), self.blur)
+        if self.brightness != 1.0 or self.gradient:
+            image = cv2.multiply(image, self.lighting, dtype=cv2.CV_8U)
+        if self.noise:
+            # OpenCV's generator is several times faster than numpy's at frame size
+            cv2.randn(self._noise, 0, self.noise)
+            image = cv2.add(image, self._noise, dtype=cv2.CV_8U)
+        return image
+
+    def _draw_marker(self, image, x, y, radius):
+        side = max(8, int(round(2 * radius)))
+        border = max(4, side // 8)  # White quiet zone around the marker
+        x0 = int(round(x)) - side // 2
+        y0 = int(round(y)) - side // 2
+        cv2.rectangle(image, (x0 - border, y0 - border), (x0 + side + border, y0 + side + border), (255, 255, 255), -1)
+        scaled = cv2.resize(self.marker, (side, side), interpolation=cv2.INTER_NEAREST)
+        # Clip the marker to the frame
+        ix0, iy0 = max(x0, 0), max(y0, 0)
+        ix1, iy1 = min(x0 + side, self.width), min(y0 + side, self.height)
+        if ix1 > ix0 and iy1 > iy0:
+            image[iy0:iy1, ix0:ix1] = scaled[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0, None]
+
+
+FRAME_SOURCES = {
+    DepthAISource.name: DepthAISource,
+    VideoFileSource.name: VideoFileSource,
+    ImageDirectorySource.name: ImageDirectorySource,
+    SyntheticPadSource.name: SyntheticPadSource,
+}
+
+
+def create_frame_source(name='depthai', width=640, height=480, options=None):
+    """
+    Builds a frame source by name with its constructor options.
+    """
+    if name not in FRAME_SOURCES:
+        raise ValueError(f"Unknown frame source: {name}")
+    return FRAME_SOURCES[name](width=width, height=height, **(options or {}))
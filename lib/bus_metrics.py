@@ -0,0 +1,178 @@
+# lib/bus_metrics.py
+import threading
+import time
+import traceback
+
+# Latency histogram: bucket i counts callbacks that took [2**(i-1), 2**i) microseconds,
+# bucket 0 is under 1 us and the last bucket collects everything slower than ~1 s
+HISTOGRAM_BUCKETS = 22
+
+
+def _callback_name(callback):
+    name = getattr(callback, '__qualname__', None) or repr(callback)
+    owner = getattr(callback, '__self__', None)
+    owner_name = getattr(owner, 'name', None)
+    if isinstance(owner_name, str):
+        name = f"{name}[{owner_name}]"
+    return name
+
+
+class CallbackStats:
+    __slots__ = ('name', 'calls', 'total_ns', 'max_ns', 'buckets', 'exceptions', 'last_traceback')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.exceptions = 0
+        self.last_traceback = None
+
+    def record(self, elapsed_ns):
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        index = (elapsed_ns // 1000).bit_length()
+        self.buckets[index if index < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1] += 1
+
+    def percentile_us(self, fraction):
+        """
+        Upper bound of the histogram bucket holding the given fraction of calls.
+        """
+        if not self.calls:
+            return 0
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return 2 ** index
+        return 2 ** (HISTOGRAM_BUCKETS - 1)
+
+    def summary(self):
+        return {
+            'calls': self.calls,
+            'mean_us': self.total_ns / self.calls / 1000 if self.calls else 0.0,
+            'p50_us': self.percentile_us(0.50),
+            'p99_us': self.percentile_us(0.99),
+            'max_us': self.max_ns / 1000,
+            'total_ms': self.total_ns / 1e6,
+            'exceptions': self.exceptions,
+            'last_traceback': self.last_traceback,
+            'histogram': list(self.buckets),
+        }
+
+
+class BusMetrics:
+    def __init__(self, logger=None):
+        """
+        Collects per-topic message counts, per-callback latency histograms and
+        exception counters for an EventBus.
+
+        Timing is only done while enabled, and the disabled cost is a single
+        attribute check per publish. Exceptions are always counted because
+        they are off the fast path. Counters are updated without locking and
+        may be approximate when several threads publish to one topic.
+
+        :param logger: Optional logger; the first exception of each callback is logged.
+        """
+        self.logger = logger
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.topics = {}     # topic -> published count
+            self.callbacks = {}  # callback -> CallbackStats
+            self.started = time.monotonic()
+            self._last_counts = {}
+            self._last_snapshot = self.started
+
+    def _stats_for(self, callback):
+        stats = self.callbacks.get(callback)
+        if stats is None:
+            with self.lock:
+                stats = self.callbacks.setdefault(callback, CallbackStats(_callback_name(callback)))
+        return stats
+
+    def record_publish(self, topic):
+        self.topics[topic] = self.topics.get(topic, 0) + 1
+
+    def invoke(self, topic, callback, data):
+        """
+        Calls a subscriber callback and records its latency and any exception.
+        """
+        start = time.perf_counter_ns()
+        try:
+            callback(data)
+        except Exception as e:
+            self.record_exception(topic, callback, e)
+        self._stats_for(callback).record(time.perf_counter_ns() - start)
+
+    def record_exception(self, topic, callback, error):
+        stats = self._stats_for(callback)
+        stats.exceptions += 1
+        stats.last_traceback = traceback.format_exc()
+        if stats.exceptions == 1 and self.logger:
+            self.logger.error(
+                f"Event bus callback {stats.name} failed on {topic}: {error!r} "
+                f"(further exceptions are only counted)"
+            )
+
+    def snapshot(self):
+        """
+        Returns topic rates and callback statistics as plain dictionaries.
+        'rate' is averaged since the last reset, 'recent_rate' since the
+        previous snapshot.
+        """
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.started, 1e-9)
+            interval = max(now - self._last_snapshot, 1e-9)
+            topics = {}
+            for topic, count in dict(self.topics).items():
+                topics[topic] = {
+                    'count': count,
+                    'rate': count / elapsed,
+                    'recent_rate': (count - self._last_counts.get(topic, 0)) / interval,
+                }
+            self._last_counts = {topic: values['count'] for topic, values in topics.items()}
+            self._last_snapshot = now
+            callbacks = {stats.name: stats.summary() for stats in list(self.callbacks.values())}
+        return {
+            'enabled': self.enabled,
+            'elapsed': elapsed,
+            'topics': topics,
+            'callbacks': callbacks,
+        }
+
+    def report(self):
+        """
+        Formats snapshot() as a table, slowest callbacks first.
+        """
+        snapshot = self.snapshot()
+        lines = [f"Event bus metrics over {snapshot['elapsed']:.1f}s (enabled={snapshot['enabled']})"]
+        lines.append("Topics:")
+        for topic, values in sorted(snapshot['topics'].items(), key=lambda item: -item[1]['count']):
+            lines.append(
+                f"  {topic:<28} {values['count']:>9} msgs {values['rate']:>9.1f}/s "
+                f"(recent {values['recent_rate']:.1f}/s)"
+            )
+        lines.append("Callbacks:")
+        for name, values in sorted(snapshot['callbacks'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(
+                f"  {name:<48} calls={values['calls']} total={values['total_ms']:.1f}ms "
+                f"mean={values['mean_us']:.1f}us p50<={values['p50_us']}us "
+                f"p99<={values['p99_us']}us max={values['max_us']:.1f}us "
+                f"exceptions={values['exceptions']}"
+            )
+        return "\n".join(lines)
@@ -1,30 +1,333 @@
 # lib/event_bus.py
+import asyncio
 import threading
+from collections import deque
+from lib.bus_metrics import BusMetrics
+
+# Subscribing to one of these receives every published event
+WILDCARD_TOPICS = ('ALL', '*')
+
+# Backpressure policies for queued subscriptions
+POLICY_BLOCK = 'block'              # Publisher waits while the queue is full
+POLICY_DROP_OLDEST = 'drop_oldest'  # Oldest queued event is discarded
+POLICY_LATEST = 'latest'            # Only the newest event per message type is kept
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_LATEST)
+
+
+def topic_matches(pattern, event_type):
+    """
+    Returns True if a subscription pattern receives events of event_type.
+    """
+    if pattern in WILDCARD_TOPICS or pattern == event_type:
+        return True
+    return pattern.endswith('*') and event_type.startswith(pattern[:-1])
+
+
+class QueuedSubscriber:
+    def __init__(self, callback, policy=POLICY_DROP_OLDEST, maxsize=256, name=None,
+                 metrics=None, event_type=None):
+        """
+        Delivers events to a callback from its own worker thread.
+
+        :param callback: The subscriber callback, called with each event.
+        :param policy: One of POLICIES, applied when the queue is full.
+        :param maxsize: Maximum number of queued events.
+        :param name: Name used for the worker thread and in stats.
+        :param metrics: Optional BusMetrics recording the worker-side calls.
+        :param event_type: Subscribed topic, used when reporting exceptions.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.callback = callback
+        self.metrics = metrics
+        self.event_type = event_type
+        self.policy = policy
+        self.maxsize = maxsize
+        self.name = name or getattr(callback, '__qualname__', repr(callback))
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.running = True
+
+        # POLICY_LATEST keeps one slot per message type, in arrival order
+        self._items = {} if policy == POLICY_LATEST else deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.thread = threading.Thread(target=self._run, name=f"bus-{self.name}", daemon=True)
+        self.thread.start()
+
+    def deliver(self, data):
+        """
+        Queues an event according to the subscription policy. Only
+        POLICY_BLOCK ever makes the publishing thread wait.
+        """
+        with self._lock:
+            items = self._items
+            if self.policy == POLICY_LATEST:
+                key = data.get_type() if hasattr(data, 'get_type') else None
+                if key in items:
+                    self.dropped += 1
+                elif len(items) >= self.maxsize:
+                    del items[next(iter(items))]
+                    self.dropped += 1
+                items[key] = data
+            elif self.policy == POLICY_DROP_OLDEST:
+                if len(items) >= self.maxsize:
+                    items.popleft()
+                    self.dropped += 1
+                items.append(data)
+            else:
+                while len(items) >= self.maxsize and self.running:
+                    self._not_full.wait()
+                items.append(data)
+            if len(items) > self.max_depth:
+                self.max_depth = len(items)
+            self._not_empty.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                items = self._items
+                while not items and self.running:
+                    self._not_empty.wait()
+                if not items:
+                    return  # Stopped and drained
+                if self.policy == POLICY_LATEST:
+                    data = items.pop(next(iter(items)))
+                else:
+                    data = items.popleft()
+                self._not_full.notify()
+            metrics = self.metrics
+            if metrics is not None and metrics.enabled:
+                metrics.invoke(self.event_type, self.callback, data)
+            else:
+                try:
+                    self.callback(data)
+                except Exception as e:
+                    if metrics is not None:
+                        metrics.record_exception(self.event_type, self.callback, e)
+            self.delivered += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'maxsize': self.maxsize,
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+            }
+
+    def close(self, timeout=5.0):
+        """
+        Stops the worker once the events already queued are delivered.
+        """
+        with self._lock:
+            self.running = False
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+
+class AsyncSubscription:
+    def __init__(self, event_bus, event_type, maxsize=256):
+        """
+        Feeds events into an asyncio.Queue owned by the running event loop.
+        Must be created from a coroutine on that loop.
+
+        :param event_bus: The bus the subscription is registered on.
+        :param event_type: The subscribed topic or pattern.
+        :param maxsize: Queue bound; the oldest event is dropped when full.
+        """
+        self.event_bus = event_bus
+        self.event_type = event_type
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self._loop_thread = threading.get_ident()
+
+    def deliver(self, data):
+        if threading.get_ident() == self._loop_thread:
+            self._put(data)
+        else:
+            self.loop.call_soon_threadsafe(self._put, data)
+
+    def _put(self, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.event_bus.unsubscribe(self.event_type, self.deliver)
+
 
 class EventBus:
-    def __init__(self):
-        self.subscribers = {}
+    def __init__(self, logger=None):
+        """
+        Initializes the EventBus.
+
+        :param logger: Optional logger for callback exceptions.
+
+        Subscriptions may name a concrete topic ('HEARTBEAT'), a wildcard
+        ('ALL' or '*') or a prefix ending in '*' ('GPS_*'). Every topic that
+        has been subscribed to or published is resolved once into an
+        immutable tuple of callbacks; the table is rebuilt on subscribe and
+        unsubscribe only, so publish never takes the lock.
+
+        Subscribers that should not run on the publishing thread can pass a
+        queue policy to subscribe(); they are then fed through a bounded
+        QueuedSubscriber with its own worker.
+
+        Callback exceptions are counted in self.metrics; per-topic rates and
+        per-callback latencies are recorded once self.metrics.enable() is called.
+        """
+        self.metrics = BusMetrics(logger)
+        self.subscribers = {}  # pattern -> list of callbacks, guarded by lock
         self.lock = threading.Lock()
+        self._dispatch = {}  # topic -> tuple of callbacks, replaced wholesale
+        self._queued = {}  # (pattern, callback) -> QueuedSubscriber
+        self.version = 0  # Incremented whenever the subscriptions change
 
-    def subscribe(self, event_type, callback):
+    def subscribe(self, event_type, callback, policy=None, maxsize=256):
+        """
+        Subscribes a callback to a topic, wildcard or prefix pattern.
+
+        :param event_type: Topic name, 'ALL'/'*', or a prefix ending in '*'.
+        :param callback: Called with the published data.
+        :param policy: None to run the callback inline on the publishing
+                       thread, or one of POLICIES to run it on its own worker.
+        :param maxsize: Queue bound when a policy is given.
+        :raises ValueError: If the callback already has a queued subscription
+                            to event_type.
+        """
+        target = callback
         with self.lock:
+            if policy is not None:
+                # One worker per (pattern, callback), so unsubscribe and close can find it
+                if (event_type, callback) in self._queued:
+                    raise ValueError(f"Callback already has a queued subscription to {event_type}")
+                queued = QueuedSubscriber(callback, policy=policy, maxsize=maxsize,
+                                          metrics=self.metrics, event_type=event_type)
+                self._queued[(event_type, callback)] = queued
+                target = queued.deliver
             if event_type not in self.subscribers:
                 self.subscribers[event_type] = []
-            self.subscribers[event_type].append(callback)
+            self.subscribers[event_type].append(target)
+            self._rebuild()
+
+    def subscribe_async(self, event_type, maxsize=256):
+        """
+        Subscribes the running event loop to a topic. Events published from
+        the loop thread are queued directly; events from other threads are
+        handed over with call_soon_threadsafe.
+
+        :return: An AsyncSubscription to await or iterate with 'async for'.
+        """
+        subscription = AsyncSubscription(self, event_type, maxsize=maxsize)
+        self.subscribe(event_type, subscription.deliver)
+        return subscription
 
     def unsubscribe(self, event_type, callback):
         with self.lock:
+            queued = self._queued.pop((event_type, callback), None)
+            target = queued.deliver if queued else callback
             if event_type in self.subscribers:
-                self.subscribers[event_type].remove(callback)
+                self.subscribers[event_type].remove(target)
                 if not self.subscribers[event_type]:
                     del self.subscribers[event_type]
+                self._rebuild()
+        if queued:
+            queued.close()
 
-    def publish(self, event_type, data):
+    def queue_stats(self):
+        """
+        Returns depth, drop and delivery counters for every queued subscription.
+        """
+        with self.lock:
+            queued = dict(self._queued)
+        return {
+            f"{event_type}:{subscriber.name}": subscriber.stats()
+            for (event_type, _), subscriber in queued.items()
+        }
+
+    def close(self):
+        """
+        Stops all queued subscriber workers after draining their queues.
+        """
         with self.lock:
-            subscribers = self.subscribers.get(event_type, []).copy()
-        for callback in subscribers:
+            queued = list(self._queued.values())
+        for subscriber in queued:
+            subscriber.close()
+
+    def publish(self, event_type, data):
+        callbacks = self._dispatch.get(event_type)
+        if callbacks is None:
+            callbacks = self._add_topic(event_type)
+        if self.metrics.enabled:
+            self._publish_instrumented(event_type, callbacks, data)
+            return
+        for callback in callbacks:
             try:
                 callback(data)
             except Exception as e:
-                # Optionally, log the exception
-                pass
+                self.metrics.record_exception(event_type, callback, e)
+
+    def _publish_instrumented(self, event_type, callbacks, data):
+        metrics = self.metrics
+        metrics.record_publish(event_type)
+        for callback in callbacks:
+            metrics.invoke(event_type, callback, data)
+
+    def _resolve(self, event_type):
+        # Caller must hold self.lock
+        return tuple(
+            callback
+            for pattern, callbacks in self.subscribers.items()
+            if topic_matches(pattern, event_type)
+            for callback in callbacks
+        )
+
+    def _rebuild(self):
+        # Caller must hold self.lock. Publishers keep using the old table
+        # until the new one is swapped in with a single assignment.
+        topics = set(self._dispatch)
+        topics.update(
+            pattern for pattern in self.subscribers
+            if pattern not in WILDCARD_TOPICS and not pattern.endswith('*')
+        )
+        self._dispatch = {topic: self._resolve(topic) for topic in topics}
+        self.version += 1
+
+    def patterns(self):
+        """
+        Returns the subscribed topics and patterns. Pair with self.version to
+        cache anything derived from them.
+        """
+        with self.lock:
+            return tuple(self.subscribers)
+
+    def _add_topic(self, event_type):
+        """
+        Resolves a topic seen for the first time and adds it to the table.
+        """
+        with self.lock:
+            callbacks = self._dispatch.get(event_type)
+            if callbacks is None:
+                callbacks = self._resolve(event_type)
+                dispatch = dict(self._dispatch)
+                dispatch[event_type] = callbacks
+                self._dispatch = dispatch
+            return callbacks
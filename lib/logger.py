@@ -1,21 +1,119 @@
 # logger.py
+import atexit
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import threading
+import time
 
-def setup_logger(log_file=None, level=logging.DEBUG, config=None):
+_queue_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most one record per call site (file and line) every
+    interval seconds. Suppressed records are counted, and the count is
+    appended to the next record that gets through from the same site.
+    Records above max_level are never suppressed; the default keeps it to
+    DEBUG, since one INFO or WARNING line in a loop (per waypoint, per
+    stage) logs distinct records that must all be kept.
+    """
+    def __init__(self, interval=1.0, max_level=logging.DEBUG):
+        super().__init__()
+        self.interval = interval
+        self.max_level = max_level
+        self.lock = threading.Lock()
+        self.sites = {}  # (pathname, lineno) -> [next allowed time, suppressed count]
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None:
+                self.sites[key] = [now + self.interval, 0]
+                return True
+            if now < site[0]:
+                site[1] += 1
+                return False
+            suppressed = site[1]
+            site[0] = now + self.interval
+            site[1] = 0
+        if suppressed:
+            # Format now so the note is appended to the final message text
+            record.msg = f"{record.getMessage()} ({suppressed} similar suppressed)"
+            record.args = None
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues records as they are. The stock prepare()
+    formats the message and exception text on the calling thread; records
+    here stay within the process, so getMessage() and all formatting are
+    left to the listener's handlers. Arguments are therefore rendered
+    later, so log values rather than objects that change afterwards.
+    """
+    def prepare(self, record):
+        return record
+
+
+def _install_queue(logger):
+    """
+    Moves the logger's handlers onto a QueueListener thread and gives the
+    logger a single DeferredQueueHandler, so formatting and file/console
+    I/O happen off the calling thread.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        return
+    handlers = list(logger.handlers)
+    if not handlers:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(shutdown_logger)
+
+
+def shutdown_logger():
+    """
+    Stops the queue listener, if any, after writing out everything queued.
+    """
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def setup_logger(log_file=None, level=logging.DEBUG, config=None, use_queue=False, rate_limit=None):
     """
     Sets up the logger for the application.
 
     Parameters:
     - log_file: The file to which logs will be written. Overrides config if provided.
     - level: The logging level (e.g., logging.DEBUG, logging.INFO).
-    - config: A dictionary containing logging configuration.
+    - config: A dictionary containing logging configuration. The extra keys
+      'queue' and 'rate_limit' are read as the two options below.
+    - use_queue: Hand records to a background listener thread instead of
+      writing them on the calling thread.
+    - rate_limit: Seconds between DEBUG records from the same call site;
+      None or 0 disables rate limiting.
 
     Returns:
     - logger: Configured logger object.
     """
     if config:
+        config = dict(config)
+        use_queue = config.pop('queue', use_queue)
+        rate_limit = config.pop('rate_limit', rate_limit)
         # If a log_file is specified outside of config, update it
         if log_file:
             # Update the file handler's filename
@@ -88,4 +186,9 @@ def setup_logger(log_file=None, level=logging.DEBUG, config=None):
             else:
                 logger.addHandler(c_handler)
 
+    if rate_limit and not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(interval=rate_limit))
+    if use_queue:
+        _install_queue(logger)
+
     return logger
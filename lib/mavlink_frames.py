@@ -0,0 +1,124 @@
+# lib/mavlink_frames.py
+import re
+import struct
+
+MAVLINK_V1_MAGIC = 0xFE
+MAVLINK_V2_MAGIC = 0xFD
+V1_HEADER_LEN = 6
+V2_HEADER_LEN = 10
+CRC_LEN = 2
+SIGNATURE_LEN = 13
+IFLAG_SIGNED = 0x01
+MAX_FRAME_LEN = V2_HEADER_LEN + 255 + CRC_LEN + SIGNATURE_LEN
+
+_MAGIC = re.compile(b'[\xfd\xfe]')
+
+# tlog record header: microseconds since the epoch, big-endian, before every frame
+TLOG_TIMESTAMP = struct.Struct('>Q')
+
+
+def frame_msgid(frame):
+    """
+    Returns the message ID from the header of a complete raw frame.
+    """
+    if frame[0] == MAVLINK_V2_MAGIC:
+        return frame[7] | (frame[8] << 8) | (frame[9] << 16)
+    return frame[5]
+
+
+def frame_payload(frame):
+    """
+    Returns the payload of a complete raw frame. MAVLink 2 drops trailing
+    zero bytes, so fields near the end may be missing and read as zero.
+    """
+    if frame[0] == MAVLINK_V2_MAGIC:
+        return frame[V2_HEADER_LEN:V2_HEADER_LEN + frame[1]]
+    return frame[V1_HEADER_LEN:V1_HEADER_LEN + frame[1]]
+
+
+def frame_size(header):
+    """
+    Returns the total frame length, including CRC and any signature, from
+    the first bytes of a frame (at least V1_HEADER_LEN, or V2_HEADER_LEN
+    for v2 frames), or None if it does not start with a magic byte.
+    """
+    if header[0] == MAVLINK_V2_MAGIC:
+        size = V2_HEADER_LEN + header[1] + CRC_LEN
+        if header[2] & IFLAG_SIGNED:
+            size += SIGNATURE_LEN
+        return size
+    if header[0] == MAVLINK_V1_MAGIC:
+        return V1_HEADER_LEN + header[1] + CRC_LEN
+    return None
+
+
+class FrameSplitter:
+    def __init__(self, known_ids=None):
+        """
+        Splits a MAVLink v1/v2 byte stream into raw frames using only the
+        header fields, without decoding payloads or checking CRCs. A frame
+        is accepted when its header is plausible and the next byte starts
+        another frame.
+
+        :param known_ids: Optional set of valid message IDs. A header with an
+                          unknown ID is treated as noise and the splitter
+                          resynchronises on the next magic byte.
+        """
+        self.known_ids = known_ids
+        self.buffer = bytearray()
+        self.discarded = 0  # Bytes skipped while searching for a frame start
+
+    def split(self, data):
+        """
+        Appends data and returns a list of (msgid, frame) tuples for every
+        complete frame. Each frame is a bytearray ready for MAVLink.decode().
+        An incomplete trailing frame is kept for the next call.
+        """
+        buf = self.buffer
+        buf += data
+        frames = []
+        known_ids = self.known_ids
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            magic = buf[pos]
+            if magic == MAVLINK_V2_MAGIC:
+                if end - pos < V2_HEADER_LEN:
+                    break
+                incompat = buf[pos + 2]
+                msgid = buf[pos + 7] | (buf[pos + 8] << 8) | (buf[pos + 9] << 16)
+                size = V2_HEADER_LEN + buf[pos + 1] + CRC_LEN
+                if incompat & IFLAG_SIGNED:
+                    size += SIGNATURE_LEN
+                valid = incompat & ~IFLAG_SIGNED == 0
+            elif magic == MAVLINK_V1_MAGIC:
+                if end - pos < V1_HEADER_LEN:
+                    break
+                msgid = buf[pos + 5]
+                size = V1_HEADER_LEN + buf[pos + 1] + CRC_LEN
+                valid = True
+            else:
+                match = _MAGIC.search(buf, pos)
+                next_pos = match.start() if match else end
+                self.discarded += next_pos - pos
+                pos = next_pos
+                continue
+
+            if not valid or (known_ids is not None and msgid not in known_ids):
+                self.discarded += 1
+                pos += 1
+                continue
+            if end - pos < size:
+                break
+            # Frames arrive back to back, so a candidate that is not followed
+            # by another start byte is most likely noise that looked like a header
+            following = pos + size
+            if following < end and buf[following] != MAVLINK_V2_MAGIC and buf[following] != MAVLINK_V1_MAGIC:
+                self.discarded += 1
+                pos += 1
+                continue
+            frames.append((msgid, buf[pos:following]))
+            pos = following
+
+        del buf[:pos]
+        return frames
@@ -1,4 +1,7 @@
 # pid_controller.py
+import numpy as np
+
+
 class PIDController:
     def __init__(self, kp, ki, kd, output_limits=(-1.0, 1.0)):
         self.kp = kp  # Proportional gain
@@ -9,6 +12,11 @@ class PIDController:
         self._last_error = 0.0
         self._integral = 0.0
 
+    def reset(self):
+        # Forget the integral and derivative history, e.g. after losing the target
+        self._last_error = 0.0
+        self._integral = 0.0
+
     def update(self, error, dt):
         # Proportional term
         p = self.kp * error
@@ -32,3 +40,73 @@ class PIDController:
         self._last_error = error
 
         return output
+
+
+class VectorPIDController:
+    def __init__(self, kp, ki, kd, output_limits=(-1.0, 1.0), shape=(1,), derivative_filter=0.0,
+                 integral_limit=None):
+        """
+        PID controller for many axes at once, updated with one set of NumPy
+        operations. Gains may be scalars or arrays that broadcast against
+        shape, so a (N, axes) controller with (N, 1) gains runs N gain sets
+        side by side, as pid_tuning.py does.
+
+        The derivative acts on the measurement rather than the error, so a
+        setpoint step gives no derivative kick, and is low-pass filtered with
+        time constant derivative_filter. The integral is not advanced while
+        the output is saturated in the direction of the error (conditional
+        integration anti-windup) and is optionally clamped to integral_limit.
+
+        :param kp: Proportional gain.
+        :param ki: Integral gain.
+        :param kd: Derivative gain.
+        :param output_limits: (min_output, max_output), scalars or arrays.
+        :param shape: Shape of the measurements, e.g. (2,) for x and y.
+        :param derivative_filter: Derivative low-pass time constant in seconds; 0 disables.
+        :param integral_limit: Optional bound on the absolute error integral.
+        """
+        self.kp = np.asarray(kp, dtype=float)
+        self.ki = np.asarray(ki, dtype=float)
+        self.kd = np.asarray(kd, dtype=float)
+        self.output_min = np.asarray(output_limits[0], dtype=float)
+        self.output_max = np.asarray(output_limits[1], dtype=float)
+        self.shape = tuple(shape)
+        self.derivative_filter = derivative_filter
+        self.integral_limit = integral_limit
+        self.reset()
+
+    def reset(self):
+        # Forget the integral and derivative history, e.g. after losing the target
+        self._integral = np.zeros(self.shape)
+        self._derivative = np.zeros(self.shape)
+        self._last_measurement = None
+
+    def update(self, measurement, dt, setpoint=0.0):
+        """
+        :param measurement: Process values, an array of the controller's shape.
+        :param dt: Seconds since the previous update.
+        :param setpoint: Target values, scalar or array.
+        :return: Clamped outputs as an array of the controller's shape.
+        """
+        measurement = np.asarray(measurement, dtype=float)
+        error = setpoint - measurement
+
+        if dt > 0 and self._last_measurement is not None:
+            raw = (self._last_measurement - measurement) / dt
+            if self.derivative_filter > 0:
+                self._derivative += (raw - self._derivative) * (dt / (self.derivative_filter + dt))
+            else:
+                self._derivative = raw
+        self._last_measurement = measurement
+
+        p_and_d = self.kp * error + self.kd * self._derivative
+        if dt > 0:
+            integral = self._integral + error * dt
+            if self.integral_limit is not None:
+                integral = np.clip(integral, -self.integral_limit, self.integral_limit)
+            unclamped = p_and_d + self.ki * integral
+            # Hold the integral where it would push a saturated output further out
+            winding = ((unclamped > self.output_max) & (error > 0)) | ((unclamped < self.output_min) & (error < 0))
+            self._integral = np.where(winding, self._integral, integral)
+
+        return np.clip(p_and_d + self.ki * self._integral, self.output_min, self.output_max)
@@ -0,0 +1,171 @@
+# lib/pipeline.py
+import threading
+import time
+
+
+class LatestValue:
+    def __init__(self):
+        """
+        Single-slot mailbox between two pipeline stages. put() replaces any
+        value the consumer has not taken yet, so the consumer always gets
+        the newest one and never works through a backlog.
+        """
+        self.cond = threading.Condition()
+        self.value = None
+        self.has_value = False
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, value):
+        with self.cond:
+            if self.has_value:
+                self.dropped += 1
+            self.value = value
+            self.has_value = True
+            self.put_count += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Waits for a new value and takes it. Returns None once closed or
+        after timeout seconds without a value.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.has_value or self.closed, timeout):
+                return None
+            if not self.has_value:
+                return None
+            value = self.value
+            self.value = None
+            self.has_value = False
+            return value
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageStats:
+    def __init__(self, name):
+        """
+        Throughput and timing for one pipeline stage. Service time is spent
+        in the stage function; latency is from capture to the end of this
+        stage.
+        """
+        self.name = name
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.items = 0
+        self.errors = 0
+        self.service_total = 0.0
+        self.service_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, service, latency):
+        with self.lock:
+            self.items += 1
+            self.service_total += service
+            self.latency_total += latency
+            if service > self.service_max:
+                self.service_max = service
+            if latency > self.latency_max:
+                self.latency_max = latency
+
+    def summary(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            items = self.items or 1
+            return {
+                'items': self.items,
+                'rate_hz': self.items / elapsed,
+                'service_ms': self.service_total / items * 1000,
+                'service_max_ms': self.service_max * 1000,
+                'latency_ms': self.latency_total / items * 1000,
+                'latency_max_ms': self.latency_max * 1000,
+                'errors': self.errors,
+            }
+
+
+class PipelineStage:
+    def __init__(self, name, func, logger, source=None, sink=None, stamped=False):
+        """
+        Runs func on its own thread, reading from one LatestValue and writing
+        to the next.
+
+        Items travel between stages as (captured_at, value) so every stage
+        can report latency since capture. A stage without a source is a
+        capture stage: func() is called repeatedly, should block until new
+        data arrives, and stamps each value as it returns. Otherwise
+        func(value) is called with the newest input, or
+        func(captured_at, value) when stamped is set; returning None
+        produces no output.
+
+        :param name: Stage name for the thread and stats.
+        :param func: Stage function.
+        :param logger: The logger instance for logging messages.
+        :param source: Input LatestValue, or None for a capture stage.
+        :param sink: Optional output LatestValue.
+        :param stamped: Also pass the capture time (time.monotonic()) to func.
+        """
+        self.name = name
+        self.func = func
+        self.logger = logger
+        self.source = source
+        self.sink = sink
+        self.stamped = stamped
+        self.stats = StageStats(name)
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.stats = StageStats(self.name)
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            if self.source is None:
+                captured_at = None
+            else:
+                item = self.source.get(timeout=0.5)
+                if item is None:
+                    continue
+                captured_at, value = item
+            started = time.monotonic()
+            try:
+                if self.source is None:
+                    result = self.func()
+                elif self.stamped:
+                    result = self.func(captured_at, value)
+                else:
+                    result = self.func(value)
+            except Exception as e:
+                if self.running:
+                    self.stats.errors += 1
+                    self.logger.error(f"Pipeline stage {self.name} failed: {e}")
+                continue
+            finished = time.monotonic()
+            if captured_at is None:
+                captured_at = finished
+            self.stats.record(finished - started, finished - captured_at)
+            if result is not None and self.sink is not None:
+                self.sink.put((captured_at, result))
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        if self.source is not None:
+            self.source.close()
+        if self.sink is not None:
+            self.sink.close()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def summary(self):
+        summary = self.stats.summary()
+        if self.source is not None:
+            summary['dropped'] = self.source.dropped
+        return summary
@@ -0,0 +1,118 @@
+# lib/scheduler.py
+import threading
+import time
+from collections import deque
+
+OVERRUN_SKIP = 'skip'          # Drop missed periods and stay on the original grid
+OVERRUN_CATCHUP = 'catchup'    # Run missed periods back to back, up to max_catchup
+
+
+class FixedRateScheduler:
+    def __init__(self, rate, overrun=OVERRUN_SKIP, max_catchup=3, name=None, history=1024):
+        """
+        Paces a loop to a fixed rate on time.monotonic() deadlines. Each
+        deadline is the previous one plus the period, not "now plus the
+        period", so the loop rate does not drift with the time the work
+        takes.
+
+        An iteration that runs past the next deadline is an overrun. With
+        OVERRUN_SKIP the missed deadlines are dropped and the next iteration
+        starts at once; with OVERRUN_CATCHUP they are run back to back, until
+        more than max_catchup periods behind, when the rest are skipped.
+
+        :param rate: Iterations per second.
+        :param overrun: OVERRUN_SKIP or OVERRUN_CATCHUP.
+        :param max_catchup: Most missed periods to catch up on.
+        :param name: Name used in stats.
+        :param history: Number of recent wake-up jitters kept for percentiles.
+        """
+        if overrun not in (OVERRUN_SKIP, OVERRUN_CATCHUP):
+            raise ValueError(f"Unknown overrun policy: {overrun}")
+        self.period = 1.0 / rate
+        self.overrun = overrun
+        self.max_catchup = max_catchup
+        self.name = name
+        self.stop_event = threading.Event()
+        self.jitters = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """
+        Restarts the schedule and the statistics; the next wait() returns at once.
+        """
+        self.stop_event.clear()
+        self.deadline = None
+        self.last_tick = None
+        self.iterations = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.jitters.clear()
+
+    def wait(self):
+        """
+        Blocks until the next deadline.
+
+        :return: Seconds since the previous tick (0.0 on the first), for use
+                 as a controller time step, or None once stop() was called.
+        """
+        now = time.monotonic()
+        if self.deadline is None:
+            self.deadline = now
+        elif now > self.deadline:
+            # The work since the last tick ran past this deadline
+            self.overruns += 1
+            behind = int((now - self.deadline) / self.period)
+            if self.overrun == OVERRUN_SKIP:
+                missed = behind
+            else:
+                missed = max(0, behind - self.max_catchup)
+            if missed:
+                self.deadline += missed * self.period
+                self.skipped += missed
+        else:
+            if self.stop_event.wait(self.deadline - now):
+                return None
+            now = time.monotonic()
+        if self.stop_event.is_set():
+            return None
+
+        jitter = now - self.deadline
+        self.jitters.append(jitter)
+        self.jitter_total += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        self.iterations += 1
+        self.deadline += self.period
+        dt = now - self.last_tick if self.last_tick is not None else 0.0
+        self.last_tick = now
+        return dt
+
+    def run(self, func):
+        """
+        Calls func() once per period until stop().
+        """
+        while self.wait() is not None:
+            func()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self):
+        """
+        Iteration, overrun and skip counts and wake-up jitter (lateness
+        against the deadline) in milliseconds.
+        """
+        jitters = sorted(self.jitters)
+        count = len(jitters)
+        return {
+            'name': self.name,
+            'rate_hz': 1.0 / self.period,
+            'iterations': self.iterations,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'jitter_mean_ms': self.jitter_total / self.iterations * 1000 if self.iterations else 0.0,
+            'jitter_p99_ms': jitters[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+            'jitter_max_ms': self.jitter_max * 1000,
+        }
@@ -0,0 +1,200 @@
+# lib/telemetry_store.py
+import asyncio
+import threading
+import time
+
+
+class _ThreadWaiter:
+    def __init__(self, predicate):
+        self.predicate = predicate
+        self.event = threading.Event()
+        self.msg = None
+        self.version = None
+        self.error = None
+        self.cancelled = False
+
+    def offer(self, msg, version):
+        """
+        Returns True once the waiter is finished and can be discarded.
+        """
+        if self.cancelled:
+            return True
+        try:
+            if self.predicate is not None and not self.predicate(msg):
+                return False
+            self.msg = msg
+            self.version = version
+        except Exception as e:
+            self.error = e
+        self.event.set()
+        return True
+
+
+class _AsyncWaiter:
+    def __init__(self, loop, predicate):
+        self.loop = loop
+        self.predicate = predicate
+        self.future = loop.create_future()
+
+    def offer(self, msg, version):
+        if self.future.done():
+            return True
+        try:
+            if self.predicate is not None and not self.predicate(msg):
+                return False
+            self.loop.call_soon_threadsafe(self._resolve, msg, None)
+        except Exception as e:
+            self.loop.call_soon_threadsafe(self._resolve, None, e)
+        return True
+
+    def _resolve(self, msg, error):
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(msg)
+
+
+class TelemetryStore:
+    def __init__(self, event_bus, event_types=('ALL',)):
+        """
+        Keeps the latest message of each type with a per-type version counter.
+
+        Waiters register a predicate and are handed the first matching message
+        from the publishing thread, so a transition is seen as soon as the
+        message arrives and is never missed between two polls.
+
+        :param event_bus: The event bus to subscribe to.
+        :param event_types: Topics or patterns to store, everything by default.
+                            Naming only the types that are read keeps the
+                            rest eligible for selective decoding in the router.
+        """
+        self.event_bus = event_bus
+        self.lock = threading.Lock()
+        self.latest = {}      # type -> message
+        self.versions = {}    # type -> number of messages received
+        self.timestamps = {}  # type -> time.monotonic() at receipt
+        self._waiters = {}    # type -> list of pending waiters
+
+        for event_type in event_types:
+            self.event_bus.subscribe(event_type, self.update)
+
+    def update(self, msg):
+        msg_type = msg.get_type()
+        with self.lock:
+            self.latest[msg_type] = msg
+            version = self.versions[msg_type] = self.versions.get(msg_type, 0) + 1
+            self.timestamps[msg_type] = time.monotonic()
+            waiters = self._waiters.get(msg_type)
+            if waiters:
+                self._waiters[msg_type] = [waiter for waiter in waiters if not waiter.offer(msg, version)]
+
+    def get(self, msg_type):
+        with self.lock:
+            return self.latest.get(msg_type, None)
+
+    def version(self, msg_type):
+        with self.lock:
+            return self.versions.get(msg_type, 0)
+
+    def age(self, msg_type):
+        """
+        Seconds since the last message of this type, or None if never received.
+        """
+        with self.lock:
+            timestamp = self.timestamps.get(msg_type)
+        return None if timestamp is None else time.monotonic() - timestamp
+
+    def snapshot(self, *msg_types):
+        """
+        Returns a consistent {type: message} view taken under a single lock.
+
+        :param msg_types: Types to include; all stored types when omitted.
+        """
+        with self.lock:
+            if not msg_types:
+                return dict(self.latest)
+            return {msg_type: self.latest.get(msg_type) for msg_type in msg_types}
+
+    def snapshot_versions(self, *msg_types):
+        """
+        Like snapshot(), but returns {type: (version, message)}.
+        """
+        with self.lock:
+            msg_types = msg_types or tuple(self.latest)
+            return {
+                msg_type: (self.versions.get(msg_type, 0), self.latest.get(msg_type))
+                for msg_type in msg_types
+            }
+
+    def _current(self, msg_type, predicate, after_version):
+        # Caller must hold self.lock
+        msg = self.latest.get(msg_type)
+        if msg is None or self.versions[msg_type] <= after_version:
+            return None
+        if predicate is not None and not predicate(msg):
+            return None
+        return msg
+
+    def wait_for(self, msg_type, predicate=None, timeout=None, after_version=0):
+        """
+        Blocks until a message of msg_type satisfies predicate.
+
+        :param msg_type: MAVLink message type, e.g. 'MISSION_CURRENT'.
+        :param predicate: Optional callable taking the message.
+        :param timeout: Seconds to wait, or None to wait indefinitely.
+        :param after_version: Ignore the stored message unless its version is
+                              newer than this; pass version(msg_type) to wait
+                              for the next update only.
+        :return: The matching message, or None on timeout.
+        """
+        return self.wait_for_version(msg_type, predicate, timeout, after_version)[0]
+
+    def wait_for_version(self, msg_type, predicate=None, timeout=None, after_version=0):
+        """
+        Like wait_for(), but returns (message, version) with the version of
+        that very message, for a follow-up wait that must not skip a message
+        arriving in between. Returns (None, after_version) on timeout.
+        """
+        with self.lock:
+            msg = self._current(msg_type, predicate, after_version)
+            if msg is not None:
+                return msg, self.versions[msg_type]
+            waiter = _ThreadWaiter(predicate)
+            self._waiters.setdefault(msg_type, []).append(waiter)
+
+        waiter.event.wait(timeout)
+        with self.lock:
+            waiter.cancelled = True
+            self._discard(msg_type, waiter)
+        if waiter.error is not None:
+            raise waiter.error
+        if waiter.msg is None:
+            return None, after_version
+        return waiter.msg, waiter.version
+
+    async def wait_for_async(self, msg_type, predicate=None, timeout=None, after_version=0):
+        """
+        Awaitable version of wait_for for use in asyncio mode.
+        """
+        with self.lock:
+            msg = self._current(msg_type, predicate, after_version)
+            if msg is not None:
+                return msg
+            waiter = _AsyncWaiter(asyncio.get_running_loop(), predicate)
+            self._waiters.setdefault(msg_type, []).append(waiter)
+
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self.lock:
+                self._discard(msg_type, waiter)
+
+    def _discard(self, msg_type, waiter):
+        # Caller must hold self.lock
+        waiters = self._waiters.get(msg_type)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
@@ -1,15 +1,22 @@
 # main.py
+import asyncio
+import signal
 import time
 import os
 import logging  # Needed for log level conversion
 import yaml  # Assuming you use YAML for config
 from lib.event_bus import EventBus
 from router import MavlinkRouter
+from forwarder import MavlinkEndpoint
+from outbound_queue import PRIORITY_NAMES
 from callback import MavlinkCallBack
-from lib.logger import setup_logger
+from lib.logger import setup_logger, shutdown_logger
 from commands import MavlinkCommands
 from safety import SafetyMonitor
-from data_recorder import DataRecorder
+from stream_rates import StreamRateManager
+from data_recorder import DataRecorder, ColumnarRecorder
+from blackbox import BlackBox
+from flight_store import FlightStore
 from mission_planner import MissionPlanner
 from precision_landing import PrecisionLanding
 
@@ -28,8 +35,10 @@ class DroneApplication:
         self.event_bus = None
         self.mavlink_router = None
         self.drone_commands = None
+        self.stream_rates = None
         self.drone = None
         self.data_recorder = None
+        self.blackbox = None
         self.safety_monitor = None
         self.mission_planner = None
         self.precision_landing = None
@@ -60,26 +69,48 @@ class DroneApplication:
         self.logger.info("=========================")
         self.logger.info("Logger initialized.")
 
-    def initialize_components(self):
+    def initialize_components(self, loop=None):
         """
         Initializes all necessary components for the drone application.
+
+        Parameters:
+        - loop (asyncio.AbstractEventLoop): Event loop to run the MAVLink
+          reader and safety monitor on. Threads are used when omitted.
         """
         # Initialize Event Bus
-        self.event_bus = EventBus()
+        self.event_bus = EventBus(logger=self.logger)
+        if self.config.get('event_bus', {}).get('metrics', False):
+            self.event_bus.metrics.enable()
+        # SIGUSR1 toggles bus metrics in flight and logs a report when turning them off
+        signal.signal(signal.SIGUSR1, self.toggle_bus_metrics)
         self.logger.debug("EventBus initialized.")
 
         # Retrieve MAVLink configuration
         port = self.config['mavlink_router'].get('port', '/dev/ttyUSB0')
         baudrate = self.config['mavlink_router'].get('baudrate', 57600)
+        ingest = self.config['mavlink_router'].get('ingest', 'standard')
+        read_size = self.config['mavlink_router'].get('read_size', 4096)
+        outbound_rates = {
+            PRIORITY_NAMES[name]: rate
+            for name, rate in (self.config['mavlink_router'].get('outbound_rates') or {}).items()
+        }
+        endpoints = [
+            MavlinkEndpoint.from_config(endpoint_config, self.logger)
+            for endpoint_config in self.config['mavlink_router'].get('endpoints') or []
+        ]
 
         # Initialize MAVLink router with correct parameters and logger
         self.mavlink_router = MavlinkRouter(
             event_bus=self.event_bus,
             logger=self.logger,
             port=port,
-            baudrate=baudrate
+            baudrate=baudrate,
+            ingest=ingest,
+            read_size=read_size,
+            endpoints=endpoints,
+            outbound_rates=outbound_rates
         )
-        self.mavlink_router.start()
+        self.mavlink_router.start(loop=loop)
         self.logger.debug(f"MAVLink router attempt on {port} at {baudrate} baud.")
 
         # Wait for MAVLink connection to be established
@@ -93,35 +124,127 @@ class DroneApplication:
             time.sleep(1)
 
         # Initialize MAVLink commands with connection and logger
-        self.drone_commands = MavlinkCommands(self.mavlink_router.mavlink_connection, self.logger)
+        self.drone_commands = MavlinkCommands(
+            self.mavlink_router.mavlink_connection,
+            self.logger,
+            outbound=self.mavlink_router.outbound
+        )
         self.logger.debug("MavlinkCommands initialized.")
 
+        # Request only the telemetry streams the components need; applied on the first heartbeat
+        stream_config = self.config.get('stream_rates', {})
+        if stream_config.get('enabled', True):
+            self.stream_rates = StreamRateManager(
+                self.event_bus,
+                self.drone_commands,
+                self.logger,
+                disable_unused=stream_config.get('disable_unused', False),
+                discovery_period=stream_config.get('discovery_period', 5.0),
+                heartbeat_timeout=stream_config.get('heartbeat_timeout', 3.0)
+            )
+            for msg_type, hz in (stream_config.get('rates') or {}).items():
+                self.stream_rates.request('config', msg_type, hz)
+            self.stream_rates.start()
+            self.logger.debug("StreamRateManager initialized.")
+
         # Initialize MAVLink callback
-        self.drone = MavlinkCallBack(self.event_bus)
+        telemetry_types = self.config.get('telemetry', {}).get('types')
+        self.drone = MavlinkCallBack(self.event_bus, self.drone_commands, telemetry_types)
         self.logger.debug("MavlinkCallBack initialized.")
 
         # Initialize data recorder with event bus and logger
-        self.data_recorder = DataRecorder(self.event_bus, self.logger)
+        recorder_config = self.config.get('data_recorder', {})
+        if recorder_config.get('format') == 'store':
+            self.data_recorder = FlightStore(
+                self.event_bus,
+                self.logger,
+                root=recorder_config.get('root', 'flights'),
+                block_size=recorder_config.get('block_size', 256 << 10),
+                block_seconds=recorder_config.get('block_seconds', 5.0),
+                segment_size=recorder_config.get('segment_size', 64 << 20),
+                segment_seconds=recorder_config.get('segment_seconds', 600.0),
+                router=self.mavlink_router
+            )
+        elif recorder_config.get('format') == 'columnar':
+            self.data_recorder = ColumnarRecorder(
+                self.event_bus,
+                self.logger,
+                directory=recorder_config.get('directory', 'flight_data'),
+                msg_types=recorder_config.get('msg_types'),
+                chunk_rows=recorder_config.get('chunk_rows', 4096),
+                compresslevel=recorder_config.get('compresslevel', 1)
+            )
+        else:
+            self.data_recorder = DataRecorder(
+                self.event_bus,
+                self.logger,
+                filename=recorder_config.get('filename', 'flight_data.tlog'),
+                file_format=recorder_config.get('format', 'tlog'),
+                flush_interval=recorder_config.get('flush_interval', 0.5),
+                flush_size=recorder_config.get('flush_size', 1 << 20)
+            )
         self.logger.debug("DataRecorder initialized.")
 
+        # Always keep the final minutes of traffic, even when full recording is off
+        blackbox_config = self.config.get('blackbox', {})
+        if blackbox_config.get('enabled', True):
+            self.blackbox = BlackBox(
+                self.event_bus,
+                self.logger,
+                path=blackbox_config.get('path', 'start/blackbox.bin'),
+                size=int(blackbox_config.get('size_mb', 16) * (1 << 20)),
+                keep_previous=blackbox_config.get('keep_previous', True),
+                router=self.mavlink_router
+            )
+            self.logger.debug("BlackBox initialized.")
+
         # Initialize safety monitor with event bus, commands, and logger
         battery_threshold = self.config['safety'].get('battery_threshold', 20)
         self.safety_monitor = SafetyMonitor(
             event_bus=self.event_bus,
             drone_commands=self.drone_commands,
             logger=self.logger,
-            battery_threshold=battery_threshold
+            battery_threshold=battery_threshold,
+            autostart=loop is None,
+            stream_rates=self.stream_rates,
+            check_rate=self.config['safety'].get('check_rate', 1)
         )
         self.logger.debug("SafetyMonitor initialized.")
 
         # Initialize mission planner with connection, config, and logger
-        self.mission_planner = MissionPlanner(self.mavlink_router.mavlink_connection, self.config, self.logger)
+        self.mission_planner = MissionPlanner(
+            self.mavlink_router.mavlink_connection,
+            self.config,
+            self.logger,
+            outbound=self.mavlink_router.outbound,
+            drone_callback=self.drone
+        )
         self.logger.debug("MissionPlanner initialized.")
 
         # Initialize precision landing with callback, commands, config, and logger
-        self.precision_landing = PrecisionLanding(self.drone, self.drone_commands, self.config, self.logger)
+        self.precision_landing = PrecisionLanding(
+            self.drone,
+            self.drone_commands,
+            self.config,
+            self.logger,
+            stream_rates=self.stream_rates
+        )
         self.logger.debug("PrecisionLanding initialized.")
 
+    def toggle_bus_metrics(self, signum=None, frame=None):
+        """
+        Enables event bus metrics, or logs the report and disables them if
+        they are already on.
+        """
+        metrics = self.event_bus.metrics
+        if metrics.enabled:
+            metrics.disable()
+            self.logger.info(metrics.report())
+        else:
+            metrics.reset()
+            metrics.enable()
+            self.logger.info("Event bus metrics enabled.")
+
     def run_mission(self):
         """
         Creates, uploads the mission, arms the drone, and starts monitoring.
@@ -140,17 +263,11 @@ class DroneApplication:
 
         # Monitor the mission progress
         try:
-            while True:
-                # Check current waypoint
-                current_wp = self.drone.get_message('MISSION_CURRENT')
-                if current_wp and current_wp.seq == 1:
-                    self.logger.info("Reached target waypoint, initiating precision landing.")
-                    # Switch to precision landing
-                    self.precision_landing.start()
-                    break
-
-                # Sleep briefly to reduce CPU usage
-                time.sleep(1)
+            # Block until MISSION_CURRENT reports the target waypoint
+            self.drone.wait_for('MISSION_CURRENT', lambda msg: msg.seq == 1)
+            self.logger.info("Reached target waypoint, initiating precision landing.")
+            # Switch to precision landing
+            self.precision_landing.start()
 
             # Keep the main thread alive while precision landing is in progress
             while self.precision_landing.is_running():
@@ -159,6 +276,42 @@ class DroneApplication:
         except KeyboardInterrupt:
             self.logger.info("Interrupted by user.")
 
+    async def run_mission_async(self):
+        """
+        Coroutine version of run_mission. Awaits the MISSION_CURRENT update
+        instead of polling, then runs precision landing on the same event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Mission upload blocks on MAVLink replies, so keep it off the loop
+        self.logger.info("Creating and uploading mission.")
+        await loop.run_in_executor(None, self.mission_planner.create_and_upload_mission)
+
+        self.drone_commands.set_mode('AUTO')
+        self.logger.info("Set mode to AUTO.")
+
+        self.drone_commands.arm()
+        self.logger.info("Armed the drone.")
+
+        await self.drone.wait_for_async('MISSION_CURRENT', lambda msg: msg.seq == 1)
+
+        self.logger.info("Reached target waypoint, initiating precision landing.")
+        await self.precision_landing.run_precision_landing_async()
+
+    async def run_async(self):
+        """
+        Runs the MAVLink reader, safety monitor, mission and precision landing
+        as tasks on a single asyncio event loop.
+        """
+        self.initialize_components(loop=asyncio.get_running_loop())
+        safety_task = asyncio.create_task(self.safety_monitor.monitor_safety_async())
+        try:
+            await self.run_mission_async()
+        finally:
+            safety_task.cancel()
+            # Keep the connection open for the landing and disarm in cleanup
+            self.mavlink_router.detach_loop()
+
     def cleanup(self):
         """
         Ensures all components are properly shut down.
@@ -166,7 +319,7 @@ class DroneApplication:
         self.logger.info("Commencing cleanup.")
 
         # Ensure precision landing is stopped if still running
-        if self.precision_landing.is_running():
+        if self.precision_landing and self.precision_landing.is_running():
             self.precision_landing.stop()
             self.logger.info("Stopped precision landing.")
 
@@ -186,6 +339,10 @@ class DroneApplication:
             self.drone_commands.disarm()
             self.logger.info("Disarmed the drone.")
 
+        # Stop adjusting stream rates
+        if self.stream_rates:
+            self.stream_rates.stop()
+
         # Stop the MAVLink router
         if self.mavlink_router:
             self.mavlink_router.stop()
@@ -196,8 +353,21 @@ class DroneApplication:
             self.data_recorder.close()
             self.logger.info("Data recorder closed.")
 
+        # Close the black box last so it holds the landing and disarm
+        if self.blackbox:
+            self.blackbox.close()
+
+        # Stop queued subscriber workers
+        if self.event_bus:
+            if self.event_bus.metrics.enabled:
+                self.logger.info(self.event_bus.metrics.report())
+            for name, stats in self.event_bus.queue_stats().items():
+                self.logger.info(f"Event bus queue {name}: {stats}")
+            self.event_bus.close()
+
         # Indicate the application is finished
         self.logger.info("Drone application finished.")
+        shutdown_logger()
 
     def run(self):
         """
@@ -206,8 +376,15 @@ class DroneApplication:
         try:
             self.load_config()
             self.setup_logging()
-            self.initialize_components()
-            self.run_mission()
+            if self.config.get('runtime', {}).get('mode', 'threads') == 'asyncio':
+                self.logger.info("Running in asyncio mode.")
+                try:
+                    asyncio.run(self.run_async())
+                except KeyboardInterrupt:
+                    self.logger.info("Interrupted by user.")
+            else:
+                self.initialize_components()
+                self.run_mission()
         except Exception as e:
             if self.logger:
                 self.logger.exception(f"An unexpected error occurred: {e}")
@@ -1,13 +1,60 @@
+# mission_planner.py
 from pymavlink import mavutil
-import time
+
+def mavlink_enum(value):
+    # Waypoint fields may name MAVLink enums in the config, e.g. MAV_CMD_NAV_TAKEOFF
+    if isinstance(value, str):
+        return getattr(mavutil.mavlink, value)
+    return value
+
 
 class MissionPlanner:
-    def __init__(self, mavlink_connection, config, logger):
+    def __init__(self, mavlink_connection, config, logger, outbound=None, drone_callback=None):
+        """
+        :param mavlink_connection: The pymavlink connection to the flight controller.
+        :param config: Configuration dict; reads the mission_planner section.
+        :param logger: The logger instance for logging messages.
+        :param outbound: Optional OutboundQueue shared with the other senders.
+        :param drone_callback: Optional MavlinkCallBack. Replies from the
+                               autopilot are then taken from its telemetry
+                               store; without it they are read from the
+                               connection, which must not have another reader.
+        """
         self.mavlink_connection = mavlink_connection
         self.logger = logger
         self.config = config
+        self.outbound = outbound
+        self.drone = drone_callback
+
+    def send(self, message):
+        if self.outbound:
+            self.outbound.submit(message)
+        else:
+            self.mavlink_connection.mav.send(message)
+
+    def wait_for(self, msg_type, after_version=0, timeout=30):
+        """
+        Waits for the next msg_type message from the autopilot.
+
+        :param after_version: Telemetry version seen before the request was sent.
+        :return: (message, version of that message), to pass as after_version
+                 to the next wait; the message is None on timeout.
+        """
+        if self.drone:
+            return self.drone.telemetry.wait_for_version(msg_type, timeout=timeout, after_version=after_version)
+        msg = self.mavlink_connection.recv_match(type=[msg_type], blocking=True, timeout=timeout)
+        return msg, after_version
+
+    def version(self, msg_type):
+        return self.drone.telemetry.version(msg_type) if self.drone else 0
 
     def create_and_upload_mission(self):
+        # Wait until the autopilot has been heard: the items are addressed to
+        # its system ID, and a udpin link drops writes until the first packet
+        heartbeat, _ = self.wait_for('HEARTBEAT', timeout=10)
+        if heartbeat is None:
+            self.logger.warning("No heartbeat from the autopilot, uploading the mission anyway")
+
         # Define mission waypoints from config
         waypoints = self.create_mission_waypoints()
 
@@ -19,7 +66,7 @@ class MissionPlanner:
 
     def create_mission_waypoints(self):
         # Retrieve waypoints from config
-        waypoint_configs = self.config.get_section('mission_planner').get('waypoints', [])
+        waypoint_configs = self.config.get('mission_planner', {}).get('waypoints', [])
         waypoints = []
 
         for wp in waypoint_configs:
@@ -27,8 +74,8 @@ class MissionPlanner:
                 target_system=self.mavlink_connection.target_system,
                 target_component=self.mavlink_connection.target_component,
                 seq=wp.get('seq', 0),
-                frame=wp.get('frame', mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT),
-                command=wp.get('command', mavutil.mavlink.MAV_CMD_NAV_WAYPOINT),
+                frame=mavlink_enum(wp.get('frame', mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT)),
+                command=mavlink_enum(wp.get('command', mavutil.mavlink.MAV_CMD_NAV_WAYPOINT)),
                 current=wp.get('current', 0),
                 autocontinue=wp.get('autocontinue', 1),
                 param1=wp.get('param1', 0),
@@ -47,25 +94,32 @@ class MissionPlanner:
 
     def clear_mission(self):
         self.logger.info("Clearing existing missions")
-        self.mavlink_connection.mav.mission_clear_all_send(
+        version = self.version('MISSION_ACK')
+        self.send(self.mavlink_connection.mav.mission_clear_all_encode(
             self.mavlink_connection.target_system,
             self.mavlink_connection.target_component
-        )
-        time.sleep(1)  # Wait for the mission to be cleared
-        self.logger.debug("Mission cleared successfully")
+        ))
+        # Continue on the autopilot's acknowledgement rather than a fixed delay
+        ack, _ = self.wait_for('MISSION_ACK', version, timeout=1)
+        if ack:
+            self.logger.debug("Mission cleared successfully")
+        else:
+            self.logger.warning("Mission clear not acknowledged, continuing")
 
     def upload_mission(self, waypoints):
         self.logger.info("Uploading mission")
+        request_version = self.version('MISSION_REQUEST')
+        ack_version = self.version('MISSION_ACK')
         # Send mission count
-        self.mavlink_connection.mav.mission_count_send(
+        self.send(self.mavlink_connection.mav.mission_count_encode(
             self.mavlink_connection.target_system,
             self.mavlink_connection.target_component,
             len(waypoints)
-        )
+        ))
 
         for waypoint in waypoints:
             # Wait for MISSION_REQUEST message
-            msg = self.mavlink_connection.recv_match(type=['MISSION_REQUEST'], blocking=True, timeout=30)
+            msg, request_version = self.wait_for('MISSION_REQUEST', request_version)
             if not msg:
                 self.logger.error("Failed to receive MISSION_REQUEST")
                 return
@@ -74,11 +128,11 @@ class MissionPlanner:
                 self.logger.error(f"Received invalid waypoint sequence: {seq}")
                 return
             # Send the waypoint
-            self.mavlink_connection.mav.send(waypoints[seq])
+            self.send(waypoints[seq])
             self.logger.info(f"Sent waypoint {seq}")
 
         # Wait for mission acknowledgment
-        ack = self.mavlink_connection.recv_match(type=['MISSION_ACK'], blocking=True, timeout=30)
+        ack, _ = self.wait_for('MISSION_ACK', ack_version)
         if ack and ack.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
             self.logger.info("Mission upload acknowledged")
         else:
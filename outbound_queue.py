@@ -0,0 +1,172 @@
+# outbound_queue.py
+import threading
+import time
+from collections import deque
+
+# Priority classes, highest first
+PRIORITY_CRITICAL = 0   # RTL, LAND, disarm and mode changes
+PRIORITY_COMMAND = 1    # Other commands and the mission protocol
+PRIORITY_SETPOINT = 2   # Streaming setpoints, coalesced by key
+PRIORITY_FORWARD = 3    # Raw frames from forwarding endpoints
+PRIORITIES = (PRIORITY_CRITICAL, PRIORITY_COMMAND, PRIORITY_SETPOINT, PRIORITY_FORWARD)
+PRIORITY_NAMES = {
+    'critical': PRIORITY_CRITICAL,
+    'command': PRIORITY_COMMAND,
+    'setpoint': PRIORITY_SETPOINT,
+    'forward': PRIORITY_FORWARD,
+}
+
+
+class OutboundQueue:
+    def __init__(self, mavlink_connection, logger, rate_limits=None, queue_size=256):
+        """
+        Single writer for everything sent to the flight controller.
+
+        Messages are queued per priority class and written by one thread,
+        always taking the highest class that is under its rate cap. A message
+        submitted with a key replaces a still-queued message with the same
+        key, so only the newest setpoint goes out. Submitting a critical
+        message discards queued setpoints, since they are stale once an RTL
+        or LAND has been requested.
+
+        :param mavlink_connection: The pymavlink connection to write to.
+        :param logger: The logger instance for logging messages.
+        :param rate_limits: Optional {priority: max messages per second}; 0 or
+                            missing means unlimited.
+        :param queue_size: Maximum queued entries per class; the oldest is
+                           dropped when full.
+        """
+        self.connection = mavlink_connection
+        self.logger = logger
+        self.queue_size = queue_size
+        self.intervals = {
+            priority: 1.0 / rate
+            for priority, rate in (rate_limits or {}).items() if rate
+        }
+        self.queues = {priority: deque() for priority in PRIORITIES}
+        self.pending_keys = {}  # key -> queued entry, for coalescing
+        self.next_allowed = {priority: 0.0 for priority in PRIORITIES}
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.sent = {priority: 0 for priority in PRIORITIES}
+        self.coalesced = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="mavlink-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, message, priority=PRIORITY_COMMAND, key=None):
+        """
+        Queues a MAVLink message object, or raw frame bytes, for sending.
+
+        :param message: A MAVLink_message (sequenced and packed by the writer)
+                        or a bytes-like raw frame written as is.
+        :param priority: One of PRIORITIES.
+        :param key: Optional coalescing key; a queued entry with the same key
+                    is replaced instead of adding a new one.
+        """
+        with self.cond:
+            if key is not None:
+                entry = self.pending_keys.get(key)
+                if entry is not None:
+                    entry[0] = message
+                    self.coalesced += 1
+                    return
+            if priority == PRIORITY_CRITICAL:
+                self._flush(PRIORITY_SETPOINT)
+            queue = self.queues[priority]
+            if len(queue) >= self.queue_size:
+                dropped = queue.popleft()
+                self.dropped += 1
+                self._forget(dropped)
+            entry = [message, key]
+            queue.append(entry)
+            if key is not None:
+                self.pending_keys[key] = entry
+            self.cond.notify_all()
+
+    def _flush(self, priority):
+        # Caller must hold self.cond
+        queue = self.queues[priority]
+        self.flushed += len(queue)
+        for entry in queue:
+            self._forget(entry)
+        queue.clear()
+
+    def _forget(self, entry):
+        # Caller must hold self.cond
+        key = entry[1]
+        if key is not None and self.pending_keys.get(key) is entry:
+            del self.pending_keys[key]
+
+    def _next_entry(self):
+        """
+        Returns (entry, priority, None) for the next sendable entry, or
+        (None, None, wait) where wait is the time until a rate-capped class
+        may send again. Caller must hold self.cond.
+        """
+        now = time.monotonic()
+        wait = None
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            if not queue:
+                continue
+            allowed = self.next_allowed[priority]
+            if allowed > now:
+                wait = allowed - now if wait is None else min(wait, allowed - now)
+                continue
+            entry = queue.popleft()
+            self._forget(entry)
+            interval = self.intervals.get(priority)
+            if interval:
+                self.next_allowed[priority] = now + interval
+            return entry, priority, None
+        return None, None, wait
+
+    def _run(self):
+        while True:
+            with self.cond:
+                entry, priority, wait = self._next_entry()
+                while entry is None:
+                    if not self.running:
+                        return
+                    self.cond.wait(wait if wait is not None else 0.5)
+                    entry, priority, wait = self._next_entry()
+            message = entry[0]
+            try:
+                if isinstance(message, (bytes, bytearray, memoryview)):
+                    self.connection.write(message)
+                else:
+                    self.connection.mav.send(message)
+                self.sent[priority] += 1
+            except Exception as e:
+                self.logger.error(f"Failed to send message: {e}")
+
+    def stats(self):
+        with self.cond:
+            return {
+                'queued': {priority: len(queue) for priority, queue in self.queues.items()},
+                'sent': dict(self.sent),
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'flushed': self.flushed,
+            }
+
+    def stop(self, timeout=2.0):
+        """
+        Stops the writer after sending what is already queued, waiting up to
+        timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while any(self.queues.values()) and time.monotonic() < deadline:
+                self.cond.wait(0.05)
+            self.running = False
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
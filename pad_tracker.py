@@ -0,0 +1,159 @@
+# pad_tracker.py
+import math
+import threading
+import numpy as np
+
+
+class PadTracker:
+    def __init__(self, hfov=69.0, vfov=55.0, process_noise=0.5, measurement_noise=0.02,
+                 max_coast=0.5, gate=13.8, max_rejects=3):
+        """
+        Constant-velocity Kalman filter for the landing pad offset, so the
+        controller can run at a fixed rate between detections and ride
+        through missed frames.
+
+        Offsets follow PrecisionLanding: normalised to -1..1 from the image
+        centre, with image up as forward and image right as the body's left,
+        the mapping adjust_drone_position assumes. Detections are de-rotated
+        by roll and pitch into a level camera frame, so attitude changes do
+        not look like pad motion. Between detections the prediction adds the
+        image motion expected from the drone's own velocity at its altitude
+        (set_ego_motion); the filter's rate state only has to absorb what
+        telemetry misses, such as wind drift or a moving pad.
+
+        Both axes share one model, so the state is a 2x2 array (position and
+        rate by x and y) with a single 2x2 covariance.
+
+        :param hfov: Horizontal camera field of view in degrees.
+        :param vfov: Vertical camera field of view in degrees.
+        :param process_noise: Acceleration noise of the residual pad motion, normalised units/s^2.
+        :param measurement_noise: Standard deviation of a detection, normalised units.
+        :param max_coast: Seconds without a detection before the track is dropped.
+        :param gate: Squared Mahalanobis distance beyond which a detection is rejected as an outlier.
+        :param max_rejects: Consecutive rejected detections after which the filter restarts on the latest.
+        """
+        self.tan_x = math.tan(math.radians(hfov) / 2)
+        self.tan_y = math.tan(math.radians(vfov) / 2)
+        self.q = process_noise ** 2
+        self.r = measurement_noise ** 2
+        self.max_coast = max_coast
+        self.gate = gate
+        self.max_rejects = max_rejects
+        self.lock = threading.Lock()
+
+        self.ego_rate = np.zeros(2)
+        self.updates = 0
+        self.rejected = 0
+        self.resets = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.state = None      # [[x, y], [x rate, y rate]] at self.time
+            self.covariance = None
+            self.time = None       # Time of the last detection the state includes
+            self.radius = None     # Pad radius in pixels from the last detection
+            self.rejects = 0
+
+    def level_offset(self, offset_x, offset_y, roll=0.0, pitch=0.0):
+        """
+        Where a detection would appear to a camera held level, from the
+        measured offset and the attitude in radians.
+        """
+        level_x = math.tan(math.atan(offset_x * self.tan_x) + roll) / self.tan_x
+        level_y = math.tan(math.atan(offset_y * self.tan_y) - pitch) / self.tan_y
+        return level_x, level_y
+
+    def set_ego_motion(self, vn, ve, yaw, altitude):
+        """
+        Sets the expected image motion of a fixed pad from the drone's
+        velocity. Pass None for any value to fall back to the constant
+        velocity model alone.
+
+        :param vn: North velocity in m/s.
+        :param ve: East velocity in m/s.
+        :param yaw: Heading in radians.
+        :param altitude: Height above the pad in metres.
+        """
+        with self.lock:
+            if vn is None or ve is None or yaw is None or not altitude or altitude <= 0:
+                self.ego_rate = np.zeros(2)
+                return
+            forward = vn * math.cos(yaw) + ve * math.sin(yaw)
+            right = -vn * math.sin(yaw) + ve * math.cos(yaw)
+            self.ego_rate = np.array([right / (altitude * self.tan_x), forward / (altitude * self.tan_y)])
+
+    def _predict(self, dt):
+        # Caller must hold self.lock
+        transition = np.array([[1.0, dt], [0.0, 1.0]])
+        noise = self.q * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+        self.state = transition @ self.state
+        self.state[0] += self.ego_rate * dt
+        self.covariance = transition @ self.covariance @ transition.T + noise
+
+    def _start(self, timestamp, position, radius):
+        # Caller must hold self.lock
+        self.state = np.array([position, [0.0, 0.0]])
+        self.covariance = np.diag([self.r, 1.0])
+        self.time = timestamp
+        self.radius = radius
+        self.rejects = 0
+
+    def update(self, timestamp, offset_x, offset_y, radius=None, roll=0.0, pitch=0.0):
+        """
+        Fuses one detection.
+
+        :param timestamp: Capture time of the frame (time.monotonic()).
+        :param offset_x: Measured normalised x offset.
+        :param offset_y: Measured normalised y offset.
+        :param radius: Pad radius in pixels.
+        :param roll: Roll at capture in radians.
+        :param pitch: Pitch at capture in radians.
+        :return: False if the detection was rejected as an outlier.
+        """
+        position = np.array(self.level_offset(offset_x, offset_y, roll, pitch))
+        with self.lock:
+            self.updates += 1
+            if self.state is None or timestamp - self.time > self.max_coast:
+                self._start(timestamp, position, radius)
+                return True
+            dt = timestamp - self.time
+            if dt > 0:
+                self._predict(dt)
+                self.time = timestamp
+            innovation = position - self.state[0]
+            innovation_var = self.covariance[0, 0] + self.r
+            if float(innovation @ innovation) / innovation_var > self.gate:
+                self.rejected += 1
+                self.rejects += 1
+                if self.rejects >= self.max_rejects:
+                    # Consistently elsewhere: the track was wrong, not the detections
+                    self.resets += 1
+                    self._start(timestamp, position, radius)
+                return False
+            gain = self.covariance[:, 0] / innovation_var
+            self.state += np.outer(gain, innovation)
+            self.covariance -= np.outer(gain, self.covariance[0])
+            self.radius = radius
+            self.rejects = 0
+            return True
+
+    def estimate(self, timestamp):
+        """
+        Predicted level-frame offset at timestamp, without changing the filter.
+
+        :return: (offset_x, offset_y, radius), or None when there is no track
+                 or the last detection is older than max_coast.
+        """
+        with self.lock:
+            if self.state is None:
+                return None
+            dt = timestamp - self.time
+            if dt > self.max_coast:
+                return None
+            position = self.state[0] + (self.state[1] + self.ego_rate) * max(dt, 0.0)
+            return float(position[0]), float(position[1]), self.radius
+
+    def stats(self):
+        with self.lock:
+            return {'updates': self.updates, 'rejected': self.rejected, 'resets': self.resets}
@@ -0,0 +1,241 @@
+# pid_tuning.py
+import argparse
+import itertools
+import math
+import os
+import numpy as np
+from lib.pid_controller import VectorPIDController
+
+
+def parse_values(spec):
+    """
+    '0.2,0.5,1' lists values; 'start:stop:count' spaces count values evenly.
+    """
+    if ':' in spec:
+        start, stop, count = spec.split(':')
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(value) for value in spec.split(',')])
+
+
+def gain_grid(kp_values, ki_values, kd_values):
+    """
+    Every combination of the given gains as three flat arrays.
+    """
+    grid = np.array(list(itertools.product(kp_values, ki_values, kd_values)), dtype=float)
+    return grid[:, 0], grid[:, 1], grid[:, 2]
+
+
+def plant_gain(altitude, hfov, vfov):
+    # Normalised image offset change per m/s of drone motion, for the
+    # (forward, sideways) axes the controller drives
+    return np.array([
+        1.0 / (altitude * math.tan(math.radians(vfov) / 2)),
+        1.0 / (altitude * math.tan(math.radians(hfov) / 2)),
+    ])
+
+
+def batch_controller(kp, ki, kd, max_output=1.0, derivative_filter=0.0):
+    """
+    One two-axis VectorPIDController per gain set, all in a single
+    (gain sets, 2) controller.
+    """
+    kp, ki, kd = (np.asarray(gains, dtype=float)[:, None] for gains in (kp, ki, kd))
+    return VectorPIDController(kp, ki, kd, (-max_output, max_output), shape=(kp.shape[0], 2),
+                               derivative_filter=derivative_filter)
+
+
+class SweepMetrics:
+    def __init__(self, count, threshold):
+        """
+        Per-gain-set step response figures, accumulated one time step at a
+        time so long runs do not keep their history.
+
+        :param count: Number of gain sets.
+        :param threshold: Offset treated as settled, e.g. the landing centre threshold.
+        """
+        self.threshold = threshold
+        self.elapsed = 0.0
+        self.iae = np.zeros(count)
+        self.effort = np.zeros(count)
+        self.overshoot = np.zeros(count)
+        self.settle_time = np.zeros(count)
+        self.final_error = np.zeros(count)
+        self.initial_sign = None
+
+    def add(self, offsets, outputs, dt):
+        if self.initial_sign is None:
+            self.initial_sign = np.sign(offsets)
+        self.elapsed += dt
+        error = np.abs(offsets).max(axis=1)
+        self.iae += np.abs(offsets).sum(axis=1) * dt
+        self.effort += np.abs(outputs).sum(axis=1) * dt
+        # Overshoot: travel past the pad on the opposite side from the start
+        self.overshoot = np.maximum(self.overshoot, (-self.initial_sign * offsets).max(axis=1))
+        self.settle_time = np.where(error > self.threshold, self.elapsed, self.settle_time)
+        self.final_error = error
+
+    def results(self, effort_weight=0.1):
+        elapsed = max(self.elapsed, 1e-9)
+        return {
+            'iae': self.iae,
+            'effort': self.effort / elapsed,
+            'overshoot': self.overshoot,
+            'settle_time': self.settle_time,
+            'settled': self.final_error <= self.threshold,
+            'score': self.iae + effort_weight * self.effort,
+        }
+
+
+def simulate(kp, ki, kd, duration=10.0, rate=20.0, initial_offset=(0.5, -0.4), altitude=5.0, hfov=69.0,
+             vfov=55.0, velocity_lag=0.3, latency=0.05, noise=0.01, wind=(0.0, 0.0), max_output=1.0,
+             derivative_filter=0.0, threshold=0.05, effort_weight=0.1, seed=0):
+    """
+    Flies every gain set against a point-mass plant at once. The controller
+    sees the pad offset after latency seconds with Gaussian noise, the
+    autopilot follows velocity commands with a first-order lag, and a
+    constant wind pushes the drone off the pad.
+
+    :param kp: Array of proportional gains, one per gain set.
+    :param ki: Array of integral gains.
+    :param kd: Array of derivative gains.
+    :param duration: Simulated seconds.
+    :param rate: Control rate in Hz.
+    :param initial_offset: Starting (x, y) pad offset, normalised as in PrecisionLanding.
+    :param altitude: Height above the pad in metres, which sets the plant gain.
+    :param velocity_lag: Autopilot velocity response time constant in seconds.
+    :param latency: Detection latency in seconds.
+    :param noise: Detection noise standard deviation, normalised units.
+    :param wind: Drift in m/s along the (forward, sideways) axes.
+    :param threshold: Offset counted as settled.
+    :param effort_weight: Weight of the control effort against the integrated error in the score.
+    :return: Dict of per-gain-set metric arrays.
+    """
+    pid = batch_controller(kp, ki, kd, max_output, derivative_filter)
+    count = pid.shape[0]
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / rate
+    gain = plant_gain(altitude, hfov, vfov)
+    wind = np.asarray(wind, dtype=float)
+    alpha = min(1.0, dt / velocity_lag) if velocity_lag > 0 else 1.0
+
+    # Controller axes are (forward, sideways), driven by the (y, x) offsets
+    offsets = np.tile([initial_offset[1], initial_offset[0]], (count, 1)).astype(float)
+    velocity = np.zeros((count, 2))
+    delayed = [offsets.copy() for _ in range(int(round(latency * rate)))]
+    metrics = SweepMetrics(count, threshold)
+    for _ in range(int(round(duration * rate))):
+        delayed.append(offsets.copy())
+        measured = delayed.pop(0) + rng.normal(0, noise, offsets.shape)
+        outputs = pid.update(measured, dt)
+        velocity += (outputs - velocity) * alpha
+        offsets += gain * (velocity + wind) * dt
+        metrics.add(offsets, outputs, dt)
+    return metrics.results(effort_weight)
+
+
+def load_decisions(path):
+    """
+    LANDING_DECISION 'track' records from a black box file, as
+    (offsets, commands, dt) arrays in controller axis order.
+    """
+    from blackbox import BlackBoxReader
+    rows = [
+        item for _, item in BlackBoxReader(path).messages()
+        if isinstance(item, dict) and item.get('type') == 'LANDING_DECISION' and item.get('action') == 'track'
+    ]
+    if not rows:
+        raise ValueError(f"No landing decisions in {path}")
+    offsets = np.array([[row['offset_y'], row['offset_x']] for row in rows])
+    commands = np.array([[row['vx'], row['vy']] for row in rows])
+    dts = np.array([row['dt'] for row in rows])
+    return offsets, commands, dts
+
+
+def replay(kp, ki, kd, offsets, commands, dts, altitude=5.0, hfov=69.0, vfov=55.0, velocity_lag=0.3,
+           max_output=1.0, derivative_filter=0.0, threshold=0.05, effort_weight=0.1):
+    """
+    Re-flies a recorded landing with every gain set. Each candidate sees the
+    recorded offset plus the drift its own commands would have caused
+    relative to the recorded ones, so the recorded disturbances (wind,
+    detection noise, pad motion) are kept while the control differs.
+
+    :param offsets: (steps, 2) recorded offsets in controller axis order.
+    :param commands: (steps, 2) recorded velocity commands.
+    :param dts: (steps,) recorded time steps.
+    """
+    pid = batch_controller(kp, ki, kd, max_output, derivative_filter)
+    count = pid.shape[0]
+    gain = plant_gain(altitude, hfov, vfov)
+    shift = np.zeros((count, 2))
+    velocity = np.zeros((count, 2))
+    recorded_velocity = np.zeros(2)
+    metrics = SweepMetrics(count, threshold)
+    for recorded, command, dt in zip(offsets, commands, dts):
+        current = recorded + shift
+        outputs = pid.update(current, dt)
+        alpha = min(1.0, dt / velocity_lag) if velocity_lag > 0 else 1.0
+        velocity += (outputs - velocity) * alpha
+        recorded_velocity += (command - recorded_velocity) * alpha
+        shift += gain * (velocity - recorded_velocity) * dt
+        metrics.add(current, outputs, dt)
+    return metrics.results(effort_weight)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep precision landing PID gains offline.")
+    parser.add_argument('--kp', default='0.2:4.0:20', help="Values, as a,b,c or start:stop:count")
+    parser.add_argument('--ki', default='0,0.05,0.1,0.2')
+    parser.add_argument('--kd', default='0:0.4:9')
+    parser.add_argument('--blackbox', help="Replay the landing decisions recorded in this black box file")
+    parser.add_argument('--config', default='start/config.yaml', help="Config whose precision_landing.pid is the baseline")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=20.0, help="Control rate in Hz")
+    parser.add_argument('--offset', type=float, nargs=2, default=(0.5, -0.4), help="Initial x y offset")
+    parser.add_argument('--altitude', type=float, default=5.0)
+    parser.add_argument('--velocity-lag', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--noise', type=float, default=0.01)
+    parser.add_argument('--wind', type=float, nargs=2, default=(0.0, 0.0), help="Forward and sideways drift in m/s")
+    parser.add_argument('--max-output', type=float, default=1.0)
+    parser.add_argument('--derivative-filter', type=float, default=0.0)
+    parser.add_argument('--threshold', type=float, default=0.05, help="Offset counted as settled")
+    parser.add_argument('--effort-weight', type=float, default=0.1, help="Score = IAE + weight * integrated |command|")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    kp, ki, kd = gain_grid(parse_values(args.kp), parse_values(args.ki), parse_values(args.kd))
+    baseline = None
+    if args.config and os.path.exists(args.config):
+        from config import Config
+        pid_config = Config(args.config).get_section('precision_landing').get('pid', {})
+        baseline = (pid_config.get('kp', 0.5), pid_config.get('ki', 0.0), pid_config.get('kd', 0.1))
+        kp, ki, kd = np.append(kp, baseline[0]), np.append(ki, baseline[1]), np.append(kd, baseline[2])
+
+    common = dict(altitude=args.altitude, velocity_lag=args.velocity_lag, max_output=args.max_output,
+                  derivative_filter=args.derivative_filter, threshold=args.threshold,
+                  effort_weight=args.effort_weight)
+    if args.blackbox:
+        results = replay(kp, ki, kd, *load_decisions(args.blackbox), **common)
+    else:
+        results = simulate(kp, ki, kd, duration=args.duration, rate=args.rate, initial_offset=args.offset,
+                           latency=args.latency, noise=args.noise, wind=args.wind, **common)
+
+    order = np.argsort(results['score'])
+    print(f"{len(kp)} gain sets")
+    print(f"{'rank':>4} {'kp':>6} {'ki':>6} {'kd':>6} {'score':>7} {'IAE':>7} {'effort':>7} {'overshoot':>9} {'settle s':>8}")
+
+    def row(rank, index):
+        settle = f"{results['settle_time'][index]:.2f}" if results['settled'][index] else 'never'
+        print(f"{rank:>4} {kp[index]:>6.3f} {ki[index]:>6.3f} {kd[index]:>6.3f} {results['score'][index]:>7.3f} "
+              f"{results['iae'][index]:>7.3f} {results['effort'][index]:>7.3f} {results['overshoot'][index]:>9.3f} {settle:>8}")
+
+    for rank, index in enumerate(order[:args.top], 1):
+        row(rank, index)
+    if baseline is not None:
+        index = len(kp) - 1
+        print("baseline (config):")
+        row(int(np.nonzero(order == index)[0][0]) + 1, index)
+
+
+if __name__ == "__main__":
+    main()
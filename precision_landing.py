@@ -1,39 +1,310 @@
 # precision_landing.py
+import asyncio
+import multiprocessing
+import queue
 import threading
 import time
 import cv2
-import depthai as dai
 import numpy as np
-from lib.pid_controller import PIDController
+from multiprocessing import shared_memory
+from detectors import create_detector
+from frame_sources import create_frame_source
+from pad_tracker import PadTracker
+from lib.pid_controller import VectorPIDController
+from lib.pipeline import LatestValue, PipelineStage
+from lib.scheduler import FixedRateScheduler
+
+LANDING_DECISION = 'LANDING_DECISION'
+
+
+def _detector_worker(detector_name, detector_options, slot_names, frame_shape, tasks, results):
+    """
+    Detector process: reads frames from the shared-memory slots named in
+    each task and returns the pad position, never pickling pixel data.
+    """
+    cv2.setNumThreads(1)  # The pool provides the parallelism
+    detector = create_detector(detector_name, detector_options)
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    frames = [np.ndarray(frame_shape, dtype=np.uint8, buffer=slot.buf) for slot in slots]
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, captured_at = task
+            try:
+                found = detector.detect(frames[slot])
+            except Exception:
+                found = None
+            results.put((seq, slot, captured_at, found))
+    finally:
+        del frames
+        for slot in slots:
+            slot.close()
+
+
+class DetectorPool:
+    def __init__(self, workers, frame_shape, logger, on_result, slots=None,
+                 detector_name='hough', detector_options=None, reorder_timeout=0.5):
+        """
+        Runs a detector backend in worker processes so detection is not
+        limited by the GIL.
+
+        Frames are copied into a fixed set of shared-memory slots and only
+        (sequence number, slot, capture time) goes through the task queue.
+        A collector thread hands results to on_result(captured_at, found)
+        in the order the frames were submitted. A result that has not come
+        back reorder_timeout seconds after a later one (a worker died) is
+        given up on, so one lost frame cannot hold back every later
+        detection. When every slot is busy the new frame is dropped rather
+        than queued, so the pool never falls behind the camera.
+
+        :param workers: Number of worker processes.
+        :param frame_shape: (height, width, 3) of the uint8 BGR frames.
+        :param logger: The logger instance for logging messages.
+        :param on_result: Called from the collector thread with each result.
+        :param slots: Shared-memory frame slots; two per worker by default.
+        :param detector_name: Backend from detectors.DETECTORS, built in each worker.
+        :param detector_options: Constructor options for the backend.
+        :param reorder_timeout: Seconds to hold later results while waiting
+                                for a missing one.
+        """
+        self.logger = logger
+        self.on_result = on_result
+        self.reorder_timeout = reorder_timeout
+        self.frame_shape = tuple(frame_shape)
+        size = int(np.prod(self.frame_shape))
+        slot_count = slots or workers * 2
+        self.shms = [shared_memory.SharedMemory(create=True, size=size) for _ in range(slot_count)]
+        self.frames = [np.ndarray(self.frame_shape, dtype=np.uint8, buffer=shm.buf) for shm in self.shms]
+        self.free_slots = list(range(slot_count))
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.lost = 0   # Results given up on
+        self.late = 0   # Results that arrived after being given up on
+
+        # Spawned workers do not inherit the parent's threads and locks
+        context = multiprocessing.get_context('spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        names = [shm.name for shm in self.shms]
+        self.processes = [
+            context.Process(target=_detector_worker, args=(detector_name, detector_options, names, self.frame_shape, self.tasks, self.results),
+                            name=f"detector-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self.collector = threading.Thread(target=self._collect, name="detector-results", daemon=True)
+        self.collector.start()
+        self.logger.info(f"DetectorPool started with {workers} workers and {slot_count} frame slots.")
+
+    def submit(self, frame, captured_at=None):
+        """
+        Copies a frame into a free slot and queues it. Returns False if every
+        slot is busy and the frame was dropped.
+        """
+        with self.lock:
+            if not self.free_slots:
+                self.dropped += 1
+                return False
+            slot = self.free_slots.pop()
+            seq = self.next_seq
+            self.next_seq += 1
+        np.copyto(self.frames[slot], frame)
+        self.tasks.put((seq, slot, captured_at if captured_at is not None else time.monotonic()))
+        self.submitted += 1
+        return True
+
+    def _collect(self):
+        pending = {}  # seq -> (captured_at, found, arrival time)
+        expected = 0
+        while True:
+            try:
+                item = self.results.get(timeout=self.reorder_timeout if pending else None)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                return
+            if item:
+                seq, slot, captured_at, found = item
+                with self.lock:
+                    self.free_slots.append(slot)
+                if seq < expected:
+                    self.late += 1  # Later results have already been released
+                    continue
+                pending[seq] = (captured_at, found, time.monotonic())
+            if pending and expected not in pending:
+                oldest = min(pending)
+                if time.monotonic() - pending[oldest][2] >= self.reorder_timeout:
+                    self.logger.warning(f"DetectorPool gave up on {oldest - expected} missing result(s)")
+                    self.lost += oldest - expected
+                    expected = oldest
+            # Release results in submission order
+            while expected in pending:
+                captured_at, found, _ = pending.pop(expected)
+                expected += 1
+                self.completed += 1
+                try:
+                    self.on_result(captured_at, found)
+                except Exception as e:
+                    self.logger.error(f"DetectorPool result handler failed: {e}")
+
+    def stats(self):
+        return {
+            'workers': len(self.processes),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'lost': self.lost,
+            'late': self.late,
+        }
+
+    def close(self):
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self.results.put(None)
+        self.collector.join(5)
+        del self.frames
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+        self.logger.info(f"DetectorPool stopped: {self.stats()}")
+
+
+class LandingDecision:
+    """
+    One landing-controller step, published on the event bus as
+    LANDING_DECISION so recorders such as the black box can keep it.
+    """
+    __slots__ = ('_timestamp', 'action', 'offset_x', 'offset_y', 'vx', 'vy', 'vz', 'dt')
+
+    def __init__(self, action, offset_x, offset_y, vx=0.0, vy=0.0, vz=0.0, dt=0.0):
+        self._timestamp = time.time()
+        self.action = action  # 'track', 'hold' or 'land'
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.vx = vx
+        self.vy = vy
+        self.vz = vz
+        self.dt = dt
+
+    def get_type(self):
+        return LANDING_DECISION
+
+    def to_dict(self):
+        return {
+            'type': LANDING_DECISION,
+            'action': self.action,
+            'offset_x': float(self.offset_x),
+            'offset_y': float(self.offset_y),
+            'vx': float(self.vx),
+            'vy': float(self.vy),
+            'vz': float(self.vz),
+            'dt': self.dt,
+        }
+
 
 class PrecisionLanding:
-    def __init__(self, drone_callback, drone_commands, config, logger):
+    def __init__(self, drone_callback, drone_commands, config, logger, stream_rates=None, frame_source=None):
+        """
+        :param drone_callback: MavlinkCallBack for mode confirmation and the event bus.
+        :param drone_commands: MavlinkCommands used to steer and land.
+        :param config: Full configuration; reads the precision_landing section.
+        :param logger: The logger instance for logging messages.
+        :param stream_rates: Optional StreamRateManager.
+        :param frame_source: Optional FrameSource; built from precision_landing.camera when omitted.
+        """
         self.drone = drone_callback
+        self.event_bus = drone_callback.event_bus
         self.drone_commands = drone_commands
         self.config = config
         self.logger = logger
+        self.stream_rates = stream_rates  # Optional StreamRateManager
+        self.attitude_rate = self.config.get('precision_landing', {}).get('attitude_rate', 50)
         self.running = False
         self.thread = None
-
-        # Camera parameters
-        self.frame_width = 640
-        self.frame_height = 480
-        self.camera_initialized = False
-
-        # Initialize PID controllers for x and y axes
+        self.stages = []
+        self.landed_event = threading.Event()
+        self.finished_event = threading.Event()
+        self.last_capture = None
+
+        # Camera parameters; every source delivers frames of this size
+        camera_config = self.config.get('precision_landing', {}).get('camera', {})
+        if frame_source is None:
+            frame_source = create_frame_source(
+                camera_config.get('source', 'depthai'),
+                camera_config.get('width', 640),
+                camera_config.get('height', 480),
+                camera_config.get('options')
+            )
+        self.frame_source = frame_source
+        self.frame_width = frame_source.width
+        self.frame_height = frame_source.height
+
+        # One PID controller for both axes: forward speed from the y offset and
+        # sideways speed from the x offset
         pid_config = self.config.get('precision_landing', {}).get('pid', {})
-        self.pid_x = PIDController(
+        max_output = pid_config.get('max_output', 1.0)
+        self.pid = VectorPIDController(
             kp=pid_config.get('kp', 0.5),
             ki=pid_config.get('ki', 0.0),
             kd=pid_config.get('kd', 0.1),
-            output_limits=(-pid_config.get('max_output', 1.0), pid_config.get('max_output', 1.0))
+            output_limits=(-max_output, max_output),
+            shape=(2,),
+            derivative_filter=pid_config.get('derivative_filter', 0.0),
+            integral_limit=pid_config.get('integral_limit')
         )
-        self.pid_y = PIDController(
-            kp=pid_config.get('kp', 0.5),
-            ki=pid_config.get('ki', 0.0),
-            kd=pid_config.get('kd', 0.1),
-            output_limits=(-pid_config.get('max_output', 1.0), pid_config.get('max_output', 1.0))
+
+        # Landing condition and detector backend, read once
+        landing_config = self.config.get('precision_landing', {})
+        self.center_threshold = landing_config.get('center_threshold', 0.05)
+        self.min_landing_radius = landing_config.get('min_landing_radius', 50)
+        detector_config = landing_config.get('detector', {})
+        self.detector_name = detector_config.get('backend', 'hough')
+        self.detector_options = detector_config.get('options') or {}
+        self.detector = create_detector(self.detector_name, self.detector_options)
+
+        # Once the pad is found, search only a window around it at reduced scale
+        tracking_config = self.config.get('precision_landing', {}).get('tracking', {})
+        self.tracking_enabled = tracking_config.get('enabled', True)
+        self.roi_factor = tracking_config.get('roi_factor', 3.0)          # Window half-size in pad radii
+        self.min_roi = tracking_config.get('min_roi', 96)                 # Smallest window side in pixels
+        self.track_radius = tracking_config.get('track_radius', 24)       # Pad radius after downscaling
+        self.min_track_radius = tracking_config.get('min_track_radius', 12)
+        self.max_track_misses = tracking_config.get('max_misses', 3)
+        self.track = None  # Last (x, y, radius) while tracking
+        self.track_velocity = (0.0, 0.0)
+        self.track_misses = 0
+        self.last_found = None  # Pad (x, y, radius) from the last process_frame(), or None
+        self.frames_tracked = 0
+        self.frames_full = 0
+
+        # Optional detector processes; full-frame detection only, without ROI tracking
+        self.detector_workers = self.config.get('precision_landing', {}).get('detector_workers', 0)
+        self.detector_pool = None
+
+        # Pad state estimator between detection and control; the controller
+        # then runs at control_rate whatever the detection rate
+        estimator_config = self.config.get('precision_landing', {}).get('estimator', {})
+        self.estimator_enabled = estimator_config.get('enabled', True)
+        self.control_scheduler = FixedRateScheduler(estimator_config.get('control_rate', 20), name='landing-control')
+        self.velocity_rate = estimator_config.get('velocity_rate', 10)
+        self.pad_tracker = PadTracker(
+            hfov=estimator_config.get('hfov', 69.0),
+            vfov=estimator_config.get('vfov', 55.0),
+            process_noise=estimator_config.get('process_noise', 0.5),
+            measurement_noise=estimator_config.get('measurement_noise', 0.02),
+            max_coast=estimator_config.get('max_coast', 0.5)
         )
+        self.holding = False
 
     def start(self):
         if not self.running:
@@ -42,148 +313,371 @@ class PrecisionLanding:
             self.thread.start()
             self.logger.info("Precision landing thread started.")
 
+    def request_streams(self):
+        # Attitude is only needed at a high rate while landing
+        if self.stream_rates:
+            self.stream_rates.request('PrecisionLanding', 'ATTITUDE', self.attitude_rate)
+            if self.estimator_enabled:
+                # Velocity and altitude for the estimator's prediction
+                self.stream_rates.request('PrecisionLanding', 'GLOBAL_POSITION_INT', self.velocity_rate)
+
+    def release_streams(self):
+        if self.stream_rates:
+            self.stream_rates.release('PrecisionLanding')
+
     def run_precision_landing(self):
         self.logger.info("Starting precision landing using computer vision")
+        self.request_streams()
 
         # Switch to GUIDED mode for manual control
         desired_mode = self.config.get('precision_landing', {}).get('mode', 'GUIDED')
         self.drone_commands.set_mode(desired_mode)
-        time.sleep(2)  # Allow mode switch to take effect
-
-        # Initialize the camera
-        if not self.camera_initialized:
-            self.init_camera()
-
-        # Start the camera stream
-        with dai.Device(self.pipeline) as device:
-            self.logger.info("DepthAI camera initialized.")
-            # Start data queues
-            q_video = device.getOutputQueue(name="video", maxSize=4, blocking=False)
-
-            last_time = time.time()
-
-            while self.running:
-                current_time = time.time()
-                dt = current_time - last_time
-                last_time = current_time
-
-                in_video = q_video.tryGet()
-                if in_video is not None:
-                    frame = in_video.getCvFrame()
-                    # Process the frame to detect the landing pad
-                    landing_condition_met, offset_x, offset_y = self.process_frame(frame)
-
-                    if landing_condition_met:
-                        self.logger.info("Landing condition met, initiating landing")
-                        self.drone_commands.land()
-                        break
-                    else:
-                        # Adjust drone position based on offset
-                        self.adjust_drone_position(offset_x, offset_y, dt)
-
-                # Sleep briefly to reduce CPU usage
-                time.sleep(0.1)
+        # Continue as soon as the autopilot reports the new mode
+        mode_id = self.drone_commands.MODE_MAPPING.get(desired_mode)
+        if not self.drone.wait_for('HEARTBEAT', lambda msg: msg.custom_mode == mode_id, timeout=2):
+            self.logger.warning(f"Mode {desired_mode} not confirmed by heartbeat, continuing.")
+
+        # Start the camera stream; read() blocks until the next frame, so
+        # capture runs at the camera rate
+        with self.frame_source as source:
+            self.logger.info(f"Frame source {source.name} opened.")
+            self.run_pipeline(source.read)
 
         self.running = False
+        self.release_streams()
         self.logger.info("Precision landing completed")
 
-    def init_camera(self):
-        # Create pipeline
-        self.pipeline = dai.Pipeline()
-
-        # Define sources and outputs
-        cam_rgb = self.pipeline.create(dai.node.ColorCamera)
-        xout_video = self.pipeline.create(dai.node.XLinkOut)
-
-        xout_video.setStreamName("video")
-
-        # Properties
-        cam_rgb.setPreviewSize(self.frame_width, self.frame_height)
-        cam_rgb.setInterleaved(False)
-        cam_rgb.setColorOrder(dai.ColorCameraProperties.ColorOrder.BGR)
+    def run_pipeline(self, read_frame):
+        """
+        Runs capture, detection and control as separate stages until the
+        landing command is sent or stop() is called. Detection always takes
+        the newest captured frame and control the newest detection, so a
+        slow stage drops stale data instead of adding latency.
+
+        :param read_frame: Blocking callable returning the next BGR frame,
+                           or None once there are no more frames.
+        """
+        frames = LatestValue()
+        detections = LatestValue()
+        self.last_capture = None
+        self.holding = False
+        self.pad_tracker.reset()
+        self.control_scheduler.reset()
+        if self.estimator_enabled:
+            # Detections feed the estimator; control ticks on its own clock
+            on_result = self.observe
+            control = PipelineStage('control', self.control_tick, self.logger)
+        else:
+            on_result = lambda captured_at, found: detections.put((captured_at, self.evaluate_detection(found)))  # noqa: E731
+            control = PipelineStage('control', self.control_step, self.logger, source=detections, stamped=True)
+        if self.detector_workers:
+            # Detection runs in worker processes; results return in frame order
+            self.detector_pool = DetectorPool(
+                self.detector_workers,
+                (self.frame_height, self.frame_width, 3),
+                self.logger,
+                on_result,
+                detector_name=self.detector_name,
+                detector_options=self.detector_options
+            )
+            detect = PipelineStage(
+                'detect',
+                lambda captured_at, frame: self.detector_pool.submit(frame, captured_at),
+                self.logger,
+                source=frames,
+                stamped=True
+            )
+        elif self.estimator_enabled:
+            detect = PipelineStage('detect', self.detect_step, self.logger, source=frames, stamped=True)
+        else:
+            detect = PipelineStage('detect', self.process_frame, self.logger, source=frames, sink=detections)
+        def capture():
+            frame = read_frame()
+            if frame is None:
+                self.logger.info("Frame source exhausted, stopping precision landing")
+                capture_stage.running = False  # End the capture loop without closing the frames mailbox
+                self.finished_event.set()
+            return frame
+
+        capture_stage = PipelineStage('capture', capture, self.logger, sink=frames)
+        self.stages = [
+            capture_stage,
+            detect,
+            control,
+        ]
+        for stage in self.stages:
+            stage.start()
+        self.landed_event.clear()
+        self.finished_event.clear()
+        try:
+            while self.running and not self.finished_event.wait(0.5):
+                pass
+        finally:
+            for stage in self.stages:
+                if stage is control:
+                    self.control_scheduler.stop()  # Wake the control stage from its wait
+                stage.stop()
+            if self.detector_pool:
+                self.detector_pool.close()
+                self.detector_pool = None
+            for stage in self.stages:
+                self.logger.info(f"Landing pipeline stage {stage.name}: {stage.summary()}")
+            if self.estimator_enabled:
+                self.logger.info(f"Landing pad estimator: {self.pad_tracker.stats()}")
+                self.logger.info(f"Landing control schedule: {self.control_scheduler.stats()}")
+
+    def control_step(self, captured_at, detection):
+        """
+        Control stage: acts on one detection, using the time between the
+        frames' capture times as the PID time step.
+        """
+        if self.landed_event.is_set():
+            return  # Nothing more to send once LAND has gone out
+        dt = captured_at - self.last_capture if self.last_capture is not None else 0.0
+        self.last_capture = captured_at
+        if self.handle_detection(detection, dt):
+            self.landed_event.set()
+            self.finished_event.set()
+
+    def detect_step(self, captured_at, frame):
+        """
+        Detect stage when the estimator is enabled: hands each detection to
+        the estimator instead of the control stage.
+        """
+        self.process_frame(frame)
+        self.observe(captured_at, self.last_found)
+
+    def observe(self, captured_at, found):
+        """
+        Fuses one detector result, taken from a frame captured at
+        captured_at, into the pad estimate. Misses are simply skipped; the
+        estimate coasts until max_coast.
+        """
+        if found is None:
+            return
+        offset_x, offset_y = self.pad_offset(found)
+        attitude = self.drone.get_attitude() or {}
+        self.pad_tracker.update(captured_at, offset_x, offset_y, found[2],
+                                attitude.get('roll', 0.0), attitude.get('pitch', 0.0))
+
+    def update_ego_motion(self):
+        # Drone velocity and height for the estimator's prediction; ignored when stale
+        position = self.drone.get_message('GLOBAL_POSITION_INT')
+        attitude = self.drone.get_attitude()
+        age = self.drone.telemetry.age('GLOBAL_POSITION_INT')
+        if position is None or attitude is None or age is None or age > 1.0:
+            self.pad_tracker.set_ego_motion(None, None, None, None)
+            return
+        self.pad_tracker.set_ego_motion(position.vx / 100.0, position.vy / 100.0,
+                                        attitude['yaw'], position.relative_alt / 1000.0)
+
+    def control_tick(self):
+        """
+        Control stage when the estimator is enabled: waits for the next
+        control period, then steers towards the predicted pad position, or
+        holds position while there is no track.
+        """
+        dt = self.control_scheduler.wait()
+        if dt is None or self.landed_event.is_set():
+            return
+        now = time.monotonic()
+        self.update_ego_motion()
+        estimate = self.pad_tracker.estimate(now)
+        if estimate is None:
+            self.hold_position(dt)
+            return
+        if self.holding:
+            self.holding = False
+            self.logger.info("Landing pad acquired")
+        offset_x, offset_y, radius = estimate
+        landing_condition_met = self.landing_condition(offset_x, offset_y, radius)
+        if self.handle_detection((landing_condition_met, offset_x, offset_y), dt):
+            self.landed_event.set()
+            self.finished_event.set()
+
+    def hold_position(self, dt):
+        # No pad estimate: stop rather than chase a stale or made-up offset
+        if not self.holding:
+            self.holding = True
+            self.logger.info("No landing pad track, holding position")
+            self.pid.reset()
+        self.drone_commands.send_velocity_command(0, 0, 0)
+        self.event_bus.publish(LANDING_DECISION, LandingDecision('hold', 0.0, 0.0, dt=dt))
+
+    async def run_precision_landing_async(self):
+        """
+        Coroutine version of run_precision_landing. The landing pipeline
+        runs unchanged on an executor thread, so detection stays off the
+        event loop and both modes share the same estimator and control clock.
+        """
+        self.running = True
+        self.logger.info("Starting precision landing using computer vision")
+        self.request_streams()
+        loop = asyncio.get_running_loop()
 
-        # Linking
-        cam_rgb.preview.link(xout_video.input)
+        desired_mode = self.config.get('precision_landing', {}).get('mode', 'GUIDED')
+        self.drone_commands.set_mode(desired_mode)
+        mode_id = self.drone_commands.MODE_MAPPING.get(desired_mode)
+        if not await self.drone.wait_for_async('HEARTBEAT', lambda msg: msg.custom_mode == mode_id, timeout=2):
+            self.logger.warning(f"Mode {desired_mode} not confirmed by heartbeat, continuing.")
+
+        source = self.frame_source
+        await loop.run_in_executor(None, source.open)
+        try:
+            self.logger.info(f"Frame source {source.name} opened.")
+            pipeline = loop.run_in_executor(None, self.run_pipeline, source.read)
+            try:
+                await asyncio.shield(pipeline)
+            except asyncio.CancelledError:
+                # run_pipeline notices within its 0.5 s poll and stops its stages
+                self.running = False
+                await pipeline
+                raise
+        finally:
+            source.close()
 
-        self.camera_initialized = True
+        self.running = False
+        self.release_streams()
+        self.logger.info("Precision landing completed")
 
-    def process_frame(self, frame):
-        # Convert to HSV color space
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        # Define color range for white detection
-        lower_white = np.array([0, 0, 200])
-        upper_white = np.array([180, 30, 255])
-
-        # Create mask to isolate white colors
-        mask = cv2.inRange(hsv, lower_white, upper_white)
-
-        # Remove noise
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.erode(mask, kernel, iterations=1)
-        mask = cv2.dilate(mask, kernel, iterations=2)
-
-        # Apply the mask to the original image
-        masked_frame = cv2.bitwise_and(frame, frame, mask=mask)
-
-        # Convert to grayscale
-        gray = cv2.cvtColor(masked_frame, cv2.COLOR_BGR2GRAY)
-
-        # Apply Gaussian blur
-        blurred = cv2.GaussianBlur(gray, (9, 9), 2)
-
-        # Use Hough Circle Transform to detect circles
-        circles = cv2.HoughCircles(
-            blurred,
-            cv2.HOUGH_GRADIENT,
-            dp=1.2,
-            minDist=50,
-            param1=50,
-            param2=20,  # Adjust param2 as needed
-            minRadius=10,
-            maxRadius=0
+    def handle_frame(self, frame, dt):
+        """
+        Detects the landing pad in a frame and either lands or corrects position.
+
+        :return: True once the landing command has been sent.
+        """
+        # Process the frame to detect the landing pad
+        return self.handle_detection(self.process_frame(frame), dt)
+
+    def handle_detection(self, detection, dt):
+        """
+        Lands or corrects position for one process_frame() result.
+
+        :return: True once the landing command has been sent.
+        """
+        landing_condition_met, offset_x, offset_y = detection
+
+        if landing_condition_met:
+            self.logger.info("Landing condition met, initiating landing")
+            self.drone_commands.land()
+            self.event_bus.publish(LANDING_DECISION, LandingDecision('land', offset_x, offset_y, dt=dt))
+            return True
+
+        # Adjust drone position based on offset
+        vx, vy, vz = self.adjust_drone_position(offset_x, offset_y, dt)
+        self.event_bus.publish(LANDING_DECISION, LandingDecision('track', offset_x, offset_y, vx, vy, vz, dt))
+        return False
+
+    def find_landing_pad(self, image, min_radius=None, max_radius=None):
+        """
+        Runs the configured detector backend on a BGR image.
+
+        :return: (x, y, radius) of the pad in image pixels, or None.
+        """
+        return self.detector.detect(image, min_radius, max_radius)
+
+    def track_landing_pad(self, frame):
+        """
+        Searches a window around the predicted pad position, downscaled so the
+        pad appears with a radius of about track_radius pixels.
+
+        :return: (x, y, radius) in frame pixels, or None if the pad was not found.
+        """
+        x, y, radius = self.track
+        # Predict the next position from the last two detections
+        vx, vy = self.track_velocity
+        cx, cy = x + vx, y + vy
+
+        half = max(radius * self.roi_factor, self.min_roi / 2)
+        height, width = frame.shape[:2]
+        x0 = int(max(cx - half, 0))
+        y0 = int(max(cy - half, 0))
+        x1 = int(min(cx + half, width))
+        y1 = int(min(cy + half, height))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+
+        roi = frame[y0:y1, x0:x1]
+        scale = min(1.0, self.track_radius / radius)
+        if scale < 1.0:
+            roi = cv2.resize(roi, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        scaled_radius = radius * scale
+        found = self.find_landing_pad(
+            roi,
+            min_radius=max(3, int(scaled_radius * 0.5)),
+            max_radius=int(scaled_radius * 2) + 1
         )
+        if found is None:
+            return None
+        fx, fy, fr = found
+        return x0 + fx / scale, y0 + fy / scale, fr / scale
 
-        if circles is not None:
-            # Convert circles to integer values
-            circles = np.round(circles[0, :]).astype("int")
-
-            # Find the largest circle assuming it's the landing pad
-            largest_circle = max(circles, key=lambda c: c[2])  # c[2] is the radius
-            x, y, radius = largest_circle
-
-            # Calculate offsets from the center of the image
-            offset_x = x - self.frame_width / 2
-            offset_y = y - self.frame_height / 2
-
-            # Normalize offsets
-            offset_x /= self.frame_width / 2  # Now ranges from -1 to 1
-            offset_y /= self.frame_height / 2
-
-            self.logger.debug(f"Detected landing pad at offset ({offset_x:.2f}, {offset_y:.2f}), radius: {radius}")
-
-            # Check if the pad is centered enough to land
-            threshold = self.config.get('precision_landing', {}).get('center_threshold', 0.05)
-            if abs(offset_x) < threshold and abs(offset_y) < threshold:
-                # Optionally, check if the drone is close enough based on radius
-                min_radius = self.config.get('precision_landing', {}).get('min_landing_radius', 50)
-                if radius >= min_radius:
-                    return True, offset_x, offset_y
-            return False, offset_x, offset_y
+    def process_frame(self, frame):
+        found = None
+        if self.track is not None:
+            found = self.track_landing_pad(frame)
+            if found is None:
+                self.track_misses += 1
+                if self.track_misses > self.max_track_misses:
+                    self.logger.debug("Landing pad track lost, searching full frame")
+                    self.track = None
+            else:
+                self.frames_tracked += 1
+        if found is None and self.track is None:
+            found = self.find_landing_pad(frame)
+            self.frames_full += 1
+            if found is not None and self.tracking_enabled and found[2] >= self.min_track_radius:
+                self.track_velocity = (0.0, 0.0)
+                self.track = found
+        if found is not None and self.track is not None:
+            if self.track is not found:
+                self.track_velocity = (found[0] - self.track[0], found[1] - self.track[1])
+            self.track = found
+            self.track_misses = 0
+
+        self.last_found = found
+        return self.evaluate_detection(found)
+
+    def evaluate_detection(self, found):
+        """
+        Turns a pad position into (landing_condition_met, offset_x, offset_y)
+        with offsets normalised to -1..1 from the image centre.
+        """
+        if found is not None:
+            offset_x, offset_y = self.pad_offset(found)
+            radius = found[2]
+            self.logger.debug("Detected landing pad at offset (%.2f, %.2f), radius: %.0f", offset_x, offset_y, radius)
+            return self.landing_condition(offset_x, offset_y, radius), offset_x, offset_y
 
         # If no circle is found
         return False, 0, 0
 
+    def pad_offset(self, found):
+        """
+        Offset of a detected pad from the image centre, normalised to -1..1.
+        """
+        x, y, _ = found
+        offset_x = (x - self.frame_width / 2) / (self.frame_width / 2)
+        offset_y = (y - self.frame_height / 2) / (self.frame_height / 2)
+        return offset_x, offset_y
+
+    def landing_condition(self, offset_x, offset_y, radius):
+        # Land once the pad is centred and close enough, judged by its radius
+        if radius is None or radius < self.min_landing_radius:
+            return False
+        threshold = self.center_threshold
+        return abs(offset_x) < threshold and abs(offset_y) < threshold
+
     def adjust_drone_position(self, offset_x, offset_y, dt):
         # Use the offsets to adjust the drone's position using PID controllers
 
-        # Update PID controllers for x and y axes
-        vx = self.pid_x.update(-offset_y, dt)
-        vy = self.pid_y.update(-offset_x, dt)
+        # Drive both offsets to zero in one update
+        vx, vy = self.pid.update((offset_y, offset_x), dt).tolist()
         vz = 0  # Maintain current altitude
 
-        self.logger.debug(f"Adjusting position with PID: vx={vx:.2f}, vy={vy:.2f}, vz={vz:.2f}")
+        self.logger.debug("Adjusting position with PID: vx=%.2f, vy=%.2f, vz=%.2f", vx, vy, vz)
         self.drone_commands.send_velocity_command(vx, vy, vz)
+        return vx, vy, vz
 
     def is_running(self):
         return self.running
@@ -0,0 +1,249 @@
+# replay.py
+import argparse
+import logging
+import os
+import threading
+import time
+from pymavlink import mavutil
+from lib.event_bus import EventBus
+from lib.mavlink_frames import MAX_FRAME_LEN, TLOG_TIMESTAMP, frame_msgid, frame_size
+
+READ_SIZE = 1 << 16  # Bytes read from the log at a time
+
+
+class TlogSource:
+    def __init__(self, path, msg_types=None):
+        """
+        Reads a MAVLink telemetry log (.tlog, as written by ground stations and
+        DataRecorder's tlog mode): each frame is preceded by an 8-byte
+        big-endian timestamp in microseconds.
+
+        Iterating yields (timestamp, msg) with the recorded timestamp in
+        seconds, also stored on the message as msg._timestamp. Frames whose
+        type is not in msg_types are skipped without being decoded. The log
+        is read in READ_SIZE chunks, so memory use does not grow with its size.
+
+        :param path: Path to the log file.
+        :param msg_types: Optional iterable of message types to yield; all when empty.
+        """
+        self.path = path
+        self.msg_ids = None
+        if msg_types:
+            self.msg_ids = {
+                msgid for msgid, msg_class in mavutil.mavlink.mavlink_map.items()
+                if msg_class.msgname in set(msg_types)
+            }
+        self.frames = 0
+        self.skipped = 0
+        self.bad = 0
+
+    def __iter__(self):
+        mav = mavutil.mavlink.MAVLink(None)
+        mav.robust_parsing = True
+        msg_ids = self.msg_ids
+        record_max = TLOG_TIMESTAMP.size + MAX_FRAME_LEN
+        with open(self.path, 'rb') as f:
+            data = bytearray()
+            pos = 0
+            eof = False
+            while True:
+                if not eof and len(data) - pos < record_max:
+                    # Top up so the buffer always holds at least one whole record
+                    del data[:pos]
+                    pos = 0
+                    chunk = f.read(READ_SIZE)
+                    eof = not chunk
+                    data += chunk
+                    continue
+                if len(data) - pos <= TLOG_TIMESTAMP.size:
+                    break
+                record = self._record(data, pos)
+                if record is None:
+                    # Lost sync or truncated log; scan for the next plausible record
+                    self.bad += 1
+                    pos += 1
+                    continue
+                timestamp_us, frame = record
+                pos += TLOG_TIMESTAMP.size + len(frame)
+                self.frames += 1
+                if msg_ids is not None and frame_msgid(frame) not in msg_ids:
+                    self.skipped += 1
+                    continue
+                try:
+                    msg = mav.decode(frame)
+                except Exception:
+                    self.bad += 1
+                    continue
+                timestamp = timestamp_us * 1.0e-6
+                msg._timestamp = timestamp
+                yield timestamp, msg
+
+    @staticmethod
+    def _record(data, pos):
+        """
+        Returns (timestamp_us, frame) for the record at pos, or None if no
+        complete frame follows the timestamp there.
+        """
+        (timestamp_us,) = TLOG_TIMESTAMP.unpack_from(data, pos)
+        start = pos + TLOG_TIMESTAMP.size
+        size = frame_size(data[start:start + 3]) if len(data) - start >= 3 else None
+        if size is None or start + size > len(data):
+            return None
+        return timestamp_us, data[start:start + size]
+
+
+class TelemetryReplay:
+    def __init__(self, event_bus, source, logger, speed=1.0):
+        """
+        Publishes recorded messages into an EventBus in place of MavlinkRouter.
+
+        :param event_bus: The event bus to publish to.
+        :param source: Iterable of (timestamp, msg), e.g. a TlogSource.
+        :param logger: The logger instance for logging messages.
+        :param speed: 1.0 for real time, another positive factor to scale the
+                      recorded timing, or 0 to publish as fast as possible.
+        """
+        self.event_bus = event_bus
+        self.source = source
+        self.logger = logger
+        self.speed = speed
+        self.running = False
+        self.thread = None
+
+        self.messages = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.elapsed = 0.0
+        self.max_lag = 0.0  # Worst delay behind the scaled recording schedule
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="telemetry-replay", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Replays the whole source on the calling thread, or until stop().
+        """
+        self.running = True
+        self.logger.info(f"Replaying telemetry at {'maximum' if not self.speed else f'{self.speed}x'} speed.")
+        publish = self.event_bus.publish
+        speed = self.speed
+        started = time.monotonic()
+        for timestamp, msg in self.source:
+            if not self.running:
+                break
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            if speed:
+                due = started + (timestamp - self.first_timestamp) / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > self.max_lag:
+                    self.max_lag = -delay
+            publish(msg.get_type(), msg)
+            self.messages += 1
+            self.last_timestamp = timestamp
+        self.elapsed = time.monotonic() - started
+        self.running = False
+        self.logger.info(f"Telemetry replay finished: {self.stats()}")
+
+    def stats(self):
+        duration = (self.last_timestamp - self.first_timestamp) if self.messages else 0.0
+        elapsed = self.elapsed or 1e-9
+        return {
+            'messages': self.messages,
+            'recorded_duration': duration,
+            'elapsed': self.elapsed,
+            'rate': self.messages / elapsed,
+            'speedup': duration / elapsed,
+            'max_lag': self.max_lag,
+        }
+
+    def is_running(self):
+        return self.running
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+
+class NullConnection:
+    """
+    Stands in for the flight controller link during replay. Commands are
+    encoded as usual and counted, but not sent anywhere.
+    """
+    def __init__(self, target_system=1, target_component=1):
+        self.target_system = target_system
+        self.target_component = target_component
+        self.mav = mavutil.mavlink.MAVLink(self)
+        self.messages = 0
+        self.bytes = 0
+
+    def write(self, buf):
+        self.messages += 1
+        self.bytes += len(buf)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a MAVLink telemetry log through the event bus.")
+    parser.add_argument('log', help="Path to a .tlog file")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Playback speed factor; 0 replays as fast as possible")
+    parser.add_argument('--types', nargs='*', help="Only replay these message types")
+    parser.add_argument('--components', default='callback,safety',
+                        help="Comma-separated subscribers to attach: callback, safety, recorder")
+    parser.add_argument('--output', help="tlog written by the recorder component; LOG.replay.tlog next to the input by default")
+    parser.add_argument('--battery-threshold', type=float, default=20)
+    parser.add_argument('--metrics', action='store_true', help="Log event bus metrics at the end")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('DroneLogger')
+
+    # Imported here so the replay classes stay usable without the flight components
+    from callback import MavlinkCallBack
+    from commands import MavlinkCommands
+    from data_recorder import DataRecorder
+    from safety import SafetyMonitor
+
+    event_bus = EventBus(logger=logger)
+    if args.metrics:
+        event_bus.metrics.enable()
+    connection = NullConnection()
+    drone_commands = MavlinkCommands(connection, logger)
+
+    components = set(args.components.split(',')) if args.components else set()
+    safety_monitor = None
+    data_recorder = None
+    if 'callback' in components:
+        MavlinkCallBack(event_bus, drone_commands)
+    if 'safety' in components:
+        safety_monitor = SafetyMonitor(event_bus, drone_commands, logger, battery_threshold=args.battery_threshold)
+    if 'recorder' in components:
+        output = args.output or os.path.splitext(args.log)[0] + '.replay.tlog'
+        data_recorder = DataRecorder(event_bus, logger, filename=output, file_format='tlog')
+
+    source = TlogSource(args.log, args.types)
+    replay = TelemetryReplay(event_bus, source, logger, speed=args.speed)
+    try:
+        replay.run()
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user.")
+    finally:
+        if safety_monitor:
+            safety_monitor.stop()
+        if data_recorder:
+            data_recorder.close()
+        event_bus.close()
+
+    logger.info(f"Source: frames={source.frames} skipped={source.skipped} bad={source.bad}")
+    logger.info(f"Commands sent to the null link: {connection.messages} ({connection.bytes} bytes)")
+    if args.metrics:
+        logger.info(event_bus.metrics.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,48 @@
 # router.py
+import logging
 from pymavlink import mavutil
 import threading
+from lib.event_bus import WILDCARD_TOPICS, topic_matches
+from lib.mavlink_frames import FrameSplitter, frame_msgid, frame_payload
+from outbound_queue import OutboundQueue, PRIORITY_CRITICAL, PRIORITY_COMMAND, PRIORITY_FORWARD
+
+INGEST_STANDARD = 'standard'  # recv_match() decodes every frame
+INGEST_BULK = 'bulk'          # Chunked reads, only subscribed types are decoded
+
+# Always decoded in bulk mode: the connection needs heartbeats to track the target system
+ALWAYS_DECODE = ('HEARTBEAT',)
+
+# Operator commands from endpoints, classed like the app's own (commands.py)
+# so they never wait behind setpoints or bulk forwarded traffic
+COMMAND_MSG_IDS = (mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_LONG, mavutil.mavlink.MAVLINK_MSG_ID_COMMAND_INT)
+COMMAND_OFFSET = 28  # uint16 command field in both COMMAND_LONG and COMMAND_INT payloads
+CRITICAL_COMMANDS = frozenset((
+    mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH,
+    mavutil.mavlink.MAV_CMD_NAV_LAND,
+    mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
+    mavutil.mavlink.MAV_CMD_DO_SET_MODE,
+    mavutil.mavlink.MAV_CMD_DO_FLIGHTTERMINATION,
+))
+
+
+def forward_priority(frame):
+    """
+    Returns the outbound priority for a raw frame from an endpoint: mode
+    changes and RTL/LAND/arming commands are critical, other commands go
+    at command priority and everything else at forwarding priority.
+    """
+    msgid = frame_msgid(frame)
+    if msgid == mavutil.mavlink.MAVLINK_MSG_ID_SET_MODE:
+        return PRIORITY_CRITICAL
+    if msgid in COMMAND_MSG_IDS:
+        field = bytes(frame_payload(frame)[COMMAND_OFFSET:COMMAND_OFFSET + 2])
+        command = int.from_bytes(field.ljust(2, b'\0'), 'little')
+        return PRIORITY_CRITICAL if command in CRITICAL_COMMANDS else PRIORITY_COMMAND
+    return PRIORITY_FORWARD
 
 class MavlinkRouter:
-    def __init__(self, event_bus, logger, port='/dev/ttyUSB0', baudrate=57600):
+    def __init__(self, event_bus, logger, port='/dev/ttyUSB0', baudrate=57600,
+                 ingest=INGEST_STANDARD, read_size=4096, endpoints=None, outbound_rates=None):
         """
         Initializes the MavlinkRouter.
 
@@ -11,17 +50,47 @@ class MavlinkRouter:
         :param logger: The logger instance for logging messages.
         :param port: Serial port for MAVLink connection.
         :param baudrate: Baud rate for MAVLink connection.
+        :param ingest: INGEST_STANDARD, or INGEST_BULK to read read_size
+                       chunks and skip decoding message types nobody subscribes to.
+        :param read_size: Maximum bytes per read in bulk mode.
+        :param endpoints: Optional list of MavlinkEndpoint objects that receive
+                          raw copies of incoming frames and whose own frames are
+                          written to the flight controller.
+        :param outbound_rates: Optional {priority: max messages per second} for
+                               the outbound writer.
         """
         self.event_bus = event_bus
         self.logger = logger
         self.port = port
         self.baudrate = baudrate
+        self.ingest = ingest
+        self.read_size = read_size
         self.mavlink_connection = None
         self.running = False
+        self.loop = None
+        self._reader_fd = None
+        self.endpoints = list(endpoints or [])
+        # Called with (msg_type, frame) for every raw frame; replaced wholesale, never mutated
+        self.frame_sinks = tuple(endpoint.offer for endpoint in self.endpoints)
+        self.outbound_rates = outbound_rates
+        self.outbound = None
+        self._msg_names = {msgid: msg_class.msgname for msgid, msg_class in mavutil.mavlink.mavlink_map.items()}
+
+        # Bulk ingest state
+        self.splitter = FrameSplitter(known_ids=set(mavutil.mavlink.mavlink_map))
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.frames_bad = 0
+        self._wanted_ids = None
+        self._filter_version = None
 
-    def start(self):
+    def start(self, loop=None):
         """
         Starts the MAVLink connection and begins listening for messages.
+
+        :param loop: Optional asyncio event loop. When given, the connection is
+                     read from the loop as data arrives instead of from a
+                     dedicated listener thread.
         """
         try:
             self.mavlink_connection = mavutil.mavlink_connection(
@@ -30,8 +99,20 @@ class MavlinkRouter:
                 autoreconnect=True
             )
             self.running = True
-            threading.Thread(target=self.listen_to_mavlink, daemon=True).start()
-            self.logger.info(f"MAVLink connection started on {self.port} at {self.baudrate} baud.")
+            # Every write to the flight controller goes through this one writer
+            self.outbound = OutboundQueue(self.mavlink_connection, self.logger, rate_limits=self.outbound_rates)
+            self.outbound.start()
+            for endpoint in self.endpoints:
+                endpoint.start(on_receive=self.write_raw)
+            if loop is not None and self.mavlink_connection.fd is not None:
+                self.loop = loop
+                self._add_reader()
+                self.logger.info("MAVLink connection attached to asyncio event loop.")
+            elif self.ingest == INGEST_BULK:
+                threading.Thread(target=self.listen_bulk, daemon=True).start()
+            else:
+                threading.Thread(target=self.listen_to_mavlink, daemon=True).start()
+            self.logger.info(f"MAVLink connection started on {self.port} at {self.baudrate} baud ({self.ingest} ingest).")
         except Exception as e:
             self.logger.error(f"Failed to start MAVLink connection: {e}")
 
@@ -43,20 +124,164 @@ class MavlinkRouter:
             try:
                 msg = self.mavlink_connection.recv_match(blocking=True)
                 if msg:
+                    if self.frame_sinks:
+                        self.forward(msg.get_type(), msg.get_msgbuf())
                     # Publish the MAVLink message type and message to the event bus
                     self.event_bus.publish(msg.get_type(), msg)
             except Exception as e:
-                self.logger.error(f"Error receiving MAVLink message: {e}")
+                if self.running:
+                    self.logger.error(f"Error receiving MAVLink message: {e}")
 
-    def send_message(self, message):
+    def listen_bulk(self):
+        """
+        Reads the connection in chunks and publishes the frames that have
+        subscribers. Frames are split on their headers, and payloads are only
+        decoded for subscribed message IDs.
         """
-        Sends a MAVLink message.
+        connection = self.mavlink_connection
+        while self.running:
+            try:
+                if not connection.select(0.5):
+                    continue
+                self.ingest_bytes(connection.recv(self.read_size))
+            except Exception as e:
+                if self.running:
+                    self.logger.error(f"Error receiving MAVLink message: {e}")
+
+    def ingest_bytes(self, data):
+        """
+        Splits raw bytes into frames, decodes the wanted ones and publishes them.
+        """
+        if not data:
+            return
+        connection = self.mavlink_connection
+        if connection.first_byte:
+            connection.auto_mavlink_version(data)
+        wanted = self.wanted_ids()
+        decode = connection.mav.decode
+        frame_sinks = self.frame_sinks
+        for msgid, frame in self.splitter.split(data):
+            if frame_sinks:
+                self.forward(self._msg_names.get(msgid), frame)
+            if wanted is not None and msgid not in wanted:
+                self.frames_skipped += 1
+                continue
+            try:
+                msg = decode(frame)
+            except Exception:
+                self.frames_bad += 1
+                continue
+            self.frames_decoded += 1
+            connection.post_message(msg)
+            self.event_bus.publish(msg.get_type(), msg)
+
+    def wanted_ids(self):
+        """
+        Returns the set of message IDs that have subscribers, or None when a
+        wildcard subscription needs every message. Cached until the event bus
+        subscriptions change.
+        """
+        if self._filter_version != self.event_bus.version:
+            self._filter_version = self.event_bus.version
+            patterns = self.event_bus.patterns()
+            if any(pattern in WILDCARD_TOPICS for pattern in patterns):
+                self._wanted_ids = None
+            else:
+                patterns += ALWAYS_DECODE
+                self._wanted_ids = {
+                    msgid for msgid, msg_class in mavutil.mavlink.mavlink_map.items()
+                    if any(topic_matches(pattern, msg_class.msgname) for pattern in patterns)
+                }
+        return self._wanted_ids
+
+    def read_available(self, max_messages=256):
+        """
+        Publishes every message that can be parsed from the connection without
+        blocking. Registered as the event-loop reader callback in asyncio mode.
+
+        :param max_messages: Upper bound per call so other tasks keep running
+                             under a flood; the loop calls back while data remains.
+        """
+        try:
+            if self.ingest == INGEST_BULK:
+                self.ingest_bytes(self.mavlink_connection.recv(self.read_size))
+            else:
+                for _ in range(max_messages):
+                    msg = self.mavlink_connection.recv_msg()
+                    if msg is None:
+                        break
+                    if self.frame_sinks:
+                        self.forward(msg.get_type(), msg.get_msgbuf())
+                    self.event_bus.publish(msg.get_type(), msg)
+        except Exception as e:
+            self.logger.error(f"Error receiving MAVLink message: {e}")
+        # A serial autoreconnect replaces the underlying file descriptor
+        if self.running and self.mavlink_connection.fd != self._reader_fd:
+            self._remove_reader()
+            self._add_reader()
+
+    def _add_reader(self):
+        self._reader_fd = self.mavlink_connection.fd
+        if self._reader_fd is not None:
+            self.loop.add_reader(self._reader_fd, self.read_available)
+
+    def _remove_reader(self):
+        if self._reader_fd is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self._reader_fd)
+        self._reader_fd = None
+
+    def detach_loop(self):
+        """
+        Stops reading from the asyncio event loop, leaving the connection open
+        so commands can still be sent after the loop has finished.
+        """
+        if self.loop:
+            self._remove_reader()
+            self.loop = None
+
+    def add_frame_sink(self, sink):
+        """
+        Registers a callable that receives (msg_type, frame) for every raw
+        frame from the flight controller, whether or not it is decoded.
+        Recorders that keep all traffic use this instead of an 'ALL' bus
+        subscription, which would force bulk ingest to decode every frame.
+        """
+        self.frame_sinks += (sink,)
+
+    def remove_frame_sink(self, sink):
+        self.frame_sinks = tuple(existing for existing in self.frame_sinks if existing != sink)
+
+    def forward(self, msg_type, frame):
+        """
+        Offers a raw frame from the flight controller to every endpoint and
+        frame sink.
+        """
+        for sink in self.frame_sinks:
+            try:
+                sink(msg_type, frame)
+            except Exception as e:
+                self.logger.error(f"Frame sink {getattr(sink, '__qualname__', sink)} failed: {e}")
+
+    def write_raw(self, frame):
+        """
+        Queues a complete raw frame, e.g. from a ground station endpoint, for
+        the flight controller. Operator commands and mode changes are queued
+        at command or critical priority, bulk traffic at forwarding priority.
+        """
+        self.outbound.submit(frame, forward_priority(frame))
+
+    def send_message(self, message, priority=PRIORITY_COMMAND, key=None):
+        """
+        Queues a MAVLink message for the outbound writer.
 
         :param message: The MAVLink message to send.
+        :param priority: Priority class from outbound_queue.
+        :param key: Optional key for coalescing with a queued message.
         """
         try:
-            self.mavlink_connection.mav.send(message)
-            self.logger.info(f"Sent message: {message}")
+            self.outbound.submit(message, priority, key)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Queued message: %s", message.get_type())
         except Exception as e:
             self.logger.error(f"Failed to send message: {e}")
 
@@ -65,6 +290,17 @@ class MavlinkRouter:
         Stops the MAVLink connection and cleans up resources.
         """
         self.running = False
+        self.detach_loop()
+        for endpoint in self.endpoints:
+            endpoint.stop()
+        if self.outbound:
+            self.outbound.stop()
+            self.logger.info(f"Outbound writer: {self.outbound.stats()}")
+        if self.ingest == INGEST_BULK:
+            self.logger.info(
+                f"Bulk ingest: {self.frames_decoded} frames decoded, {self.frames_skipped} skipped, "
+                f"{self.frames_bad} bad, {self.splitter.discarded} bytes discarded."
+            )
         if self.mavlink_connection:
             self.mavlink_connection.close()
             self.logger.info("MAVLink connection closed.")
@@ -1,9 +1,11 @@
 # safety.py
 import threading
-import time  # Added import for time module
+from lib.event_bus import POLICY_LATEST
+from lib.scheduler import FixedRateScheduler
 
 class SafetyMonitor:
-    def __init__(self, event_bus, drone_commands, logger, battery_threshold=20):
+    def __init__(self, event_bus, drone_commands, logger, battery_threshold=20, autostart=True,
+                 stream_rates=None, sys_status_rate=1, check_rate=1):
         """
         Initializes the SafetyMonitor.
 
@@ -11,6 +13,12 @@ class SafetyMonitor:
         :param drone_commands: The drone commands interface for controlling the drone.
         :param logger: The logger instance for logging messages.
         :param battery_threshold: Battery percentage threshold to trigger safety actions.
+        :param autostart: Subscribe and start the monitoring thread immediately.
+                          Pass False and await monitor_safety_async() instead in
+                          asyncio mode.
+        :param stream_rates: Optional StreamRateManager to request SYS_STATUS from.
+        :param sys_status_rate: SYS_STATUS rate in Hz requested from the autopilot.
+        :param check_rate: Battery checks per second in the monitoring thread.
         """
         self.event_bus = event_bus
         self.drone_commands = drone_commands
@@ -19,10 +27,17 @@ class SafetyMonitor:
         self.battery_status = None
         self.battery_threshold = battery_threshold  # Configurable threshold
         self.running = True  # Flag to control the monitoring loop
+        self.subscribed = autostart
+        self.stream_rates = stream_rates
+        self.scheduler = FixedRateScheduler(check_rate, name='safety')
 
-        # Subscribe to battery status messages
-        self.event_bus.subscribe('SYS_STATUS', self.handle_sys_status)
-        threading.Thread(target=self.monitor_safety, daemon=True).start()
+        if self.stream_rates:
+            self.stream_rates.request('SafetyMonitor', 'SYS_STATUS', sys_status_rate)
+
+        if autostart:
+            # Subscribe to battery status messages; only the newest one matters
+            self.event_bus.subscribe('SYS_STATUS', self.handle_sys_status, policy=POLICY_LATEST, maxsize=1)
+            threading.Thread(target=self.monitor_safety, daemon=True).start()
 
     def handle_sys_status(self, msg):
         """
@@ -36,32 +51,64 @@ class SafetyMonitor:
                 'current_battery': msg.current_battery,
                 'battery_remaining': msg.battery_remaining
             }
-            self.logger.debug(f"Updated battery status: {self.battery_status}")
+            self.logger.debug("Updated battery status: %s", self.battery_status)
 
     def monitor_safety(self):
         """
-        Continuously monitors the battery status and initiates safety actions if necessary.
+        Checks the battery status at a fixed rate and initiates safety actions if necessary.
         """
         self.logger.info("SafetyMonitor thread started.")
-        while self.running:
-            try:
-                with self.lock:
-                    if self.battery_status:
-                        battery_remaining = self.battery_status['battery_remaining']
-                        self.logger.debug(f"Current battery remaining: {battery_remaining}%")
-                        if battery_remaining < self.battery_threshold:
-                            self.logger.warning(f"Low battery ({battery_remaining}%)! Initiating RTL.")
-                            self.drone_commands.return_to_launch()
-                            self.running = False  # Stop monitoring after initiating RTL
-                time.sleep(1)  # Sleep to reduce CPU usage
-            except Exception as e:
-                self.logger.error(f"Exception in SafetyMonitor.monitor_safety: {e}")
-                time.sleep(1)  # Sleep before retrying
+        self.scheduler.run(self.safety_step)
+
+    def safety_step(self):
+        try:
+            self.check_battery()
+        except Exception as e:
+            self.logger.error(f"Exception in SafetyMonitor.monitor_safety: {e}")
+        if not self.running:
+            self.scheduler.stop()
+
+    async def monitor_safety_async(self):
+        """
+        Coroutine version of monitor_safety that wakes on each SYS_STATUS
+        message instead of polling.
+        """
+        self.logger.info("SafetyMonitor task started.")
+        sys_status = self.event_bus.subscribe_async('SYS_STATUS', maxsize=1)
+        try:
+            async for msg in sys_status:
+                try:
+                    self.handle_sys_status(msg)
+                    self.check_battery()
+                except Exception as e:
+                    self.logger.error(f"Exception in SafetyMonitor.monitor_safety_async: {e}")
+                if not self.running:
+                    break
+        finally:
+            sys_status.close()
+
+    def check_battery(self):
+        """
+        Initiates RTL once the latest battery reading drops below the threshold.
+        """
+        with self.lock:
+            if self.battery_status:
+                battery_remaining = self.battery_status['battery_remaining']
+                self.logger.debug("Current battery remaining: %s%%", battery_remaining)
+                if battery_remaining < self.battery_threshold:
+                    self.logger.warning(f"Low battery ({battery_remaining}%)! Initiating RTL.")
+                    self.drone_commands.return_to_launch()
+                    self.running = False  # Stop monitoring after initiating RTL
 
     def stop(self):
         """
         Stops the SafetyMonitor monitoring loop and unsubscribes from event bus.
         """
         self.running = False
-        self.event_bus.unsubscribe('SYS_STATUS', self.handle_sys_status)
-        self.logger.info("SafetyMonitor stopped.")
+        self.scheduler.stop()
+        if self.subscribed:
+            self.event_bus.unsubscribe('SYS_STATUS', self.handle_sys_status)
+            self.subscribed = False
+        if self.stream_rates:
+            self.stream_rates.release('SafetyMonitor')
+        self.logger.info(f"SafetyMonitor stopped: {self.scheduler.stats()}")
@@ -0,0 +1,766 @@
+# simulator.py
+"""
+In-process MAVLink autopilot for running the application without a
+flight controller.
+
+    python simulator.py --link udp:127.0.0.1:14550           # point mavlink_router.port at udpin:127.0.0.1:14550
+    python simulator.py --link pty                           # prints the device path to use as mavlink_router.port
+    python simulator.py --app                                # runs DroneApplication against the simulator end to end
+    python simulator.py --app --rates ATTITUDE=500 GLOBAL_POSITION_INT=200 --fixed-rates
+
+The simulated vehicle answers heartbeats, arming, mode changes, the mission
+upload protocol and COMMAND_LONG with COMMAND_ACK, flies missions, LAND and
+RTL, and follows velocity setpoints as a point mass with a first-order
+velocity lag. Telemetry streams run at configurable rates, which
+SET_MESSAGE_INTERVAL changes unless the rates are fixed for a load test.
+With --app the camera sees a landing pad rendered from the simulated pose.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import select
+import socket
+import tempfile
+import threading
+import time
+import tty
+import yaml
+from collections import Counter
+from pymavlink import mavutil
+from commands import MavlinkCommands
+from frame_sources import FRAME_SOURCES, SyntheticPadSource
+
+mavlink = mavutil.mavlink
+
+EARTH_RADIUS = 6378137.0
+GRAVITY = 9.80665
+FORCE_DISARM = 21196  # ARM_DISARM param2 that disarms in flight
+
+# Stream rates (Hz) before any SET_MESSAGE_INTERVAL; 0 disables a stream
+DEFAULT_RATES = {
+    'HEARTBEAT': 1,
+    'SYS_STATUS': 1,
+    'GLOBAL_POSITION_INT': 4,
+    'ATTITUDE': 4,
+    'MISSION_CURRENT': 1,
+}
+
+MODES = {mode_id: name for name, mode_id in MavlinkCommands.MODE_MAPPING.items()}
+
+
+def parse_rates(specs):
+    """
+    ['ATTITUDE=200', ...] as {'ATTITUDE': 200.0, ...}.
+    """
+    rates = {}
+    for spec in specs or []:
+        msg_type, hz = spec.split('=')
+        if msg_type not in DEFAULT_RATES:
+            raise ValueError(f"Unknown stream {msg_type}; choose from {', '.join(DEFAULT_RATES)}")
+        rates[msg_type] = float(hz)
+    return rates
+
+
+class SimulatedAutopilot:
+    def __init__(self, logger, link='udp:127.0.0.1:14550', rates=None, fixed_rates=False,
+                 home=(47.397742, 8.545594, 488.0), yaw=0.0, pad=(2.0, 1.0), pad_radius=1.2,
+                 physics_rate=50, velocity_lag=0.3, cruise_speed=5.0, climb_speed=2.5, land_speed=1.5,
+                 rtl_altitude=15.0, setpoint_timeout=3.0, wind=(0.0, 0.0), battery_drain=1.0):
+        """
+        A single thread reads the link, steps the vehicle and sends the
+        telemetry streams, so the simulator adds one thread to the process
+        it runs in.
+
+        :param logger: The logger instance for logging messages.
+        :param link: 'udp:HOST:PORT' to send to an application listening on
+                     udpin:HOST:PORT, or 'pty' for a pseudo-terminal that the
+                     application opens like a serial port (see app_port).
+        :param rates: {msg_type: Hz} overriding DEFAULT_RATES; these are also
+                      the rates SET_MESSAGE_INTERVAL 0 restores.
+        :param fixed_rates: Acknowledge SET_MESSAGE_INTERVAL but keep the
+                            configured rates, to hold a load test's stress level.
+        :param home: (lat, lon, AMSL altitude) of the take-off point.
+        :param yaw: Heading in degrees, held throughout the flight.
+        :param pad: Landing pad (north, east) offset from home in metres.
+        :param pad_radius: Landing pad radius in metres.
+        :param physics_rate: Vehicle model steps per second.
+        :param velocity_lag: Time constant in seconds with which the velocity follows its target.
+        :param cruise_speed: Horizontal speed in m/s in AUTO and RTL.
+        :param climb_speed: Climb rate in m/s.
+        :param land_speed: Descent rate in m/s in LAND.
+        :param rtl_altitude: Minimum altitude in metres for the RTL return leg.
+        :param setpoint_timeout: Seconds after the last velocity setpoint before GUIDED stops the vehicle.
+        :param wind: (north, east) drift in m/s that the position control does not correct.
+        :param battery_drain: Battery percent used per minute while armed.
+        """
+        self.logger = logger
+        self.link = link
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.fixed_rates = fixed_rates
+        self.home = home
+        self.yaw = math.radians(yaw)
+        self.pad = pad
+        self.pad_radius = pad_radius
+        self.step_period = 1.0 / physics_rate
+        self.velocity_lag = velocity_lag
+        self.cruise_speed = cruise_speed
+        self.climb_speed = climb_speed
+        self.land_speed = land_speed
+        self.rtl_altitude = rtl_altitude
+        self.setpoint_timeout = setpoint_timeout
+        self.wind = wind
+        self.battery_drain = battery_drain
+
+        self.mav = mavlink.MAVLink(self, srcSystem=1, srcComponent=1)
+        self.mav.robust_parsing = True
+        self.lock = threading.RLock()  # Guards the vehicle state read by the camera
+        self.running = False
+        self.started = time.monotonic()
+        self.thread = None
+        self.sock = None
+        self.address = None
+        self.fd = None
+        self.slave_fd = None
+        self.app_port = None
+
+        self.sent = Counter()
+        self.received = Counter()
+        self.dropped_writes = 0
+        self.reset()
+
+    def reset(self):
+        # Vehicle on the ground at home, disarmed, with no mission
+        self.position = [0.0, 0.0, 0.0]   # North, east, altitude above home in metres
+        self.velocity = [0.0, 0.0, 0.0]   # North, east, down in m/s
+        self.acceleration = [0.0, 0.0, 0.0]
+        self.roll = 0.0
+        self.pitch = 0.0
+        self.armed = False
+        self.armed_time = 0.0
+        self.mode = 'STABILIZE'
+        self.setpoint = None              # GUIDED (north, east, down) velocity target
+        self.setpoint_time = 0.0
+        self.takeoff_altitude = None      # GUIDED NAV_TAKEOFF target
+        self.rtl_phase = None
+        self.mission = []
+        self.upload = None                # Items being received during an upload
+        self.seq = 0
+        self.item_target = None
+        self.item_reached_at = None
+        self.touchdown = None             # (north, east) of the last landing
+        self.streams = {msg_type: self._interval(hz) for msg_type, hz in self.rates.items()}
+        self.due = {}
+
+    @staticmethod
+    def _interval(hz):
+        return 1.0 / hz if hz and hz > 0 else None
+
+    # Transport
+
+    def open(self):
+        if self.link == 'pty':
+            self.fd, self.slave_fd = os.openpty()
+            tty.setraw(self.slave_fd)
+            os.set_blocking(self.fd, False)
+            # The slave end stays open here so the link survives the application reconnecting
+            self.app_port = os.ttyname(self.slave_fd)
+        elif self.link.startswith('udp:'):
+            _, host, port = self.link.split(':')
+            self.address = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+            self.fd = self.sock.fileno()
+            self.app_port = f'udpin:{host}:{port}'
+        else:
+            raise ValueError(f"Unknown link: {self.link}")
+        self.logger.info(f"Simulator link open; connect the application to {self.app_port}")
+
+    def write(self, buf):
+        # Called by MAVLink.send(); a full link drops the frame, like a saturated radio
+        try:
+            if self.sock:
+                self.sock.sendto(buf, self.address)
+            else:
+                os.write(self.fd, buf)
+        except (BlockingIOError, ConnectionRefusedError):
+            self.dropped_writes += 1
+
+    def send(self, message):
+        self.mav.send(message)
+        self.sent[message.get_type()] += 1
+
+    def _receive(self):
+        try:
+            data = self.sock.recv(65535) if self.sock else os.read(self.fd, 4096)
+        except (BlockingIOError, ConnectionRefusedError):
+            return
+        for msg in self.mav.parse_buffer(data) or []:
+            msg_type = msg.get_type()
+            self.received[msg_type] += 1
+            handler = self.handlers.get(msg_type)
+            if handler:
+                handler(self, msg)
+
+    # Lifecycle
+
+    def start(self):
+        if self.fd is None:
+            self.open()
+        self.running = True
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name='simulator', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        if self.sock:
+            self.sock.close()
+        elif self.fd is not None:
+            os.close(self.fd)
+            os.close(self.slave_fd)
+        self.sock = self.fd = self.slave_fd = None
+
+    def run(self):
+        now = time.monotonic()
+        next_step = now
+        self.due = {msg_type: now for msg_type in self.streams}
+        while self.running:
+            deadlines = [self.due[t] for t, interval in self.streams.items() if interval]
+            timeout = max(0.0, min(deadlines + [next_step]) - time.monotonic())
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if ready:
+                self._receive()
+
+            now = time.monotonic()
+            if now - next_step > 1.0:
+                next_step = now  # Stalled, e.g. a debugger; do not replay the gap
+            while now >= next_step:
+                with self.lock:
+                    self.step(self.step_period, next_step)
+                next_step += self.step_period
+            self._send_streams(now)
+
+    def _send_streams(self, now):
+        for msg_type, interval in self.streams.items():
+            if not interval or now < self.due[msg_type]:
+                continue
+            # At stress rates the loop wakes less often than the stream period,
+            # so send every message that fell due to keep the average rate
+            count = int((now - self.due[msg_type]) / interval) + 1
+            if count > max(1, 0.1 / interval):
+                count = 1
+                self.due[msg_type] = now
+            message = self.stream_message(msg_type, now)
+            for _ in range(count):
+                self.send(message)
+            self.due[msg_type] += count * interval
+
+    # Vehicle model
+
+    def step(self, dt, now):
+        target = self.target_velocity(now)
+        alpha = min(1.0, dt / self.velocity_lag) if self.velocity_lag > 0 else 1.0
+        previous = list(self.velocity)
+        for axis in range(3):
+            self.velocity[axis] += (target[axis] - self.velocity[axis]) * alpha
+            self.acceleration[axis] = (self.velocity[axis] - previous[axis]) / dt
+
+        airborne = self.position[2] > 0.0
+        self.position[0] += (self.velocity[0] + (self.wind[0] if airborne else 0.0)) * dt
+        self.position[1] += (self.velocity[1] + (self.wind[1] if airborne else 0.0)) * dt
+        self.position[2] -= self.velocity[2] * dt
+        if self.position[2] <= 0.0:
+            self.position[2] = 0.0
+            self.velocity = [0.0, 0.0, min(self.velocity[2], 0.0)]
+            if airborne:
+                self.on_touchdown()
+
+        # Tilt into the horizontal acceleration, as a multirotor must
+        forward = self.acceleration[0] * math.cos(self.yaw) + self.acceleration[1] * math.sin(self.yaw)
+        right = -self.acceleration[0] * math.sin(self.yaw) + self.acceleration[1] * math.cos(self.yaw)
+        self.pitch = -math.atan2(forward, GRAVITY)
+        self.roll = math.atan2(right, GRAVITY)
+
+    def target_velocity(self, now):
+        if not self.armed:
+            return 0.0, 0.0, 0.0
+        if self.mode == 'LAND':
+            return 0.0, 0.0, self.land_speed
+        if self.mode == 'RTL':
+            return self._rtl_velocity()
+        if self.mode == 'AUTO':
+            return self._mission_velocity(now)
+        if self.mode == 'GUIDED':
+            if self.takeoff_altitude is not None:
+                if self.position[2] >= self.takeoff_altitude - 0.2:
+                    self.takeoff_altitude = None
+                else:
+                    return self._toward((self.position[0], self.position[1], self.takeoff_altitude))
+            if self.setpoint and now - self.setpoint_time < self.setpoint_timeout:
+                return self.setpoint
+        return 0.0, 0.0, 0.0
+
+    def _toward(self, target, speed=None):
+        # Velocity toward a (north, east, altitude) point, slowing on arrival
+        dn = target[0] - self.position[0]
+        de = target[1] - self.position[1]
+        du = target[2] - self.position[2]
+        distance = math.hypot(dn, de)
+        horizontal = min(speed or self.cruise_speed, distance)
+        climb = max(-self.land_speed, min(self.climb_speed, du))
+        if distance > 1e-6:
+            return dn / distance * horizontal, de / distance * horizontal, -climb
+        return 0.0, 0.0, -climb
+
+    def _rtl_velocity(self):
+        altitude = max(self.rtl_altitude, self.position[2])
+        if self.rtl_phase == 'climb':
+            if self.position[2] >= self.rtl_altitude - 0.2:
+                self.rtl_phase = 'return'
+            return self._toward((self.position[0], self.position[1], self.rtl_altitude))
+        if self.rtl_phase == 'return':
+            if math.hypot(self.position[0], self.position[1]) < 0.5:
+                self.rtl_phase = 'land'
+            return self._toward((0.0, 0.0, altitude))
+        return 0.0, 0.0, self.land_speed
+
+    def on_touchdown(self):
+        self.touchdown = (self.position[0], self.position[1])
+        pad_error = math.hypot(self.position[0] - self.pad[0], self.position[1] - self.pad[1])
+        self.logger.info(f"Touchdown at N {self.position[0]:.2f} m, E {self.position[1]:.2f} m, "
+                         f"{pad_error:.2f} m from the pad")
+        landing_item = (self.mode == 'AUTO' and self.seq < len(self.mission)
+                        and self.mission[self.seq].command == mavlink.MAV_CMD_NAV_LAND)
+        if landing_item:
+            self._advance()
+        # Disarm after landing, as the autopilot would; a descent in GUIDED only stops
+        if self.mode in ('LAND', 'RTL') or landing_item:
+            self._set_armed(False)
+
+    # Missions
+
+    def _mission_velocity(self, now):
+        if self.seq >= len(self.mission):
+            return 0.0, 0.0, 0.0  # Mission complete; hold
+        item = self.mission[self.seq]
+        if self.item_target is None:
+            self._start_item(item)
+            if self.item_target is None:
+                return 0.0, 0.0, 0.0  # Skipped, or handed over to RTL
+        if item.command == mavlink.MAV_CMD_NAV_LAND:
+            if math.hypot(self.item_target[0] - self.position[0], self.item_target[1] - self.position[1]) > 0.5:
+                return self._toward((self.item_target[0], self.item_target[1], self.position[2]))
+            return 0.0, 0.0, self.land_speed
+
+        acceptance = max(item.param2, 0.5) if item.command == mavlink.MAV_CMD_NAV_WAYPOINT else 0.5
+        horizontal = math.hypot(self.item_target[0] - self.position[0], self.item_target[1] - self.position[1])
+        if horizontal <= acceptance and abs(self.item_target[2] - self.position[2]) <= 0.3:
+            if self.item_reached_at is None:
+                self.item_reached_at = now
+            hold = item.param1 if item.command == mavlink.MAV_CMD_NAV_WAYPOINT else 0.0
+            if now - self.item_reached_at >= hold:
+                self._advance()
+            return 0.0, 0.0, 0.0
+        return self._toward(self.item_target)
+
+    def _start_item(self, item):
+        self.item_reached_at = None
+        if item.command == mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+            self._advance()
+            self.set_mode('RTL')
+            return
+        if item.command not in (mavlink.MAV_CMD_NAV_TAKEOFF, mavlink.MAV_CMD_NAV_WAYPOINT,
+                                mavlink.MAV_CMD_NAV_LAND):
+            self.logger.info(f"Skipping unsupported mission command {item.command} at seq {item.seq}")
+            self._advance()
+            return
+        north, east, altitude = self.item_position(item)
+        if item.command == mavlink.MAV_CMD_NAV_TAKEOFF:
+            north, east = self.position[0], self.position[1]
+        self.item_target = (north, east, altitude)
+
+    def item_position(self, item):
+        """
+        (north, east, altitude above home) of a mission item. A zero
+        latitude and longitude means the current position.
+        """
+        x, y, z = item.x, item.y, item.z
+        if item.get_type() == 'MISSION_ITEM_INT' and item.frame != mavlink.MAV_FRAME_LOCAL_NED:
+            x, y = x / 1e7, y / 1e7
+        if item.frame == mavlink.MAV_FRAME_LOCAL_NED:
+            return x, y, -z
+        if item.frame in (mavlink.MAV_FRAME_GLOBAL, mavlink.MAV_FRAME_GLOBAL_INT):
+            z -= self.home[2]
+        if x == 0 and y == 0:
+            return self.position[0], self.position[1], z
+        north = math.radians(x - self.home[0]) * EARTH_RADIUS
+        east = math.radians(y - self.home[1]) * EARTH_RADIUS * math.cos(math.radians(self.home[0]))
+        return north, east, z
+
+    def _advance(self):
+        self.send(self.mav.mission_item_reached_encode(self.seq))
+        self.seq += 1
+        self.item_target = None
+        self.item_reached_at = None
+        if self.seq < len(self.mission):
+            self.send(self.mav.mission_current_encode(self.seq))
+        else:
+            self.logger.info("Mission complete")
+
+    # Commands
+
+    def set_mode(self, mode):
+        if mode == self.mode:
+            return
+        self.logger.info(f"Mode {self.mode} -> {mode}")
+        self.mode = mode
+        self.setpoint = None
+        self.takeoff_altitude = None
+        self.item_target = None
+        self.rtl_phase = 'climb' if mode == 'RTL' else None
+        # Report the change at once rather than on the next 1 Hz heartbeat
+        self.send(self.stream_message('HEARTBEAT', time.monotonic()))
+
+    def _set_armed(self, armed):
+        if armed == self.armed:
+            return
+        self.armed = armed
+        self.logger.info("Armed" if armed else "Disarmed")
+        if armed:
+            self.armed_time = time.monotonic()
+            self.touchdown = None
+            self.seq = 0
+            self.item_target = None
+        self.send(self.stream_message('HEARTBEAT', time.monotonic()))
+
+    def handle_command_long(self, msg):
+        result = mavlink.MAV_RESULT_ACCEPTED
+        with self.lock:
+            if msg.command == mavlink.MAV_CMD_COMPONENT_ARM_DISARM:
+                if msg.param1 == 1:
+                    self._set_armed(True)
+                elif self.position[2] > 0.0 and msg.param2 != FORCE_DISARM:
+                    result = mavlink.MAV_RESULT_TEMPORARILY_REJECTED  # Airborne
+                else:
+                    self._set_armed(False)
+            elif msg.command == mavlink.MAV_CMD_NAV_TAKEOFF:
+                if self.armed and self.mode == 'GUIDED':
+                    self.takeoff_altitude = msg.param7
+                else:
+                    result = mavlink.MAV_RESULT_TEMPORARILY_REJECTED
+            elif msg.command == mavlink.MAV_CMD_NAV_LAND:
+                self.set_mode('LAND')
+            elif msg.command == mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH:
+                self.set_mode('RTL')
+            elif msg.command == mavlink.MAV_CMD_SET_MESSAGE_INTERVAL:
+                result = self.set_message_interval(int(msg.param1), msg.param2)
+            else:
+                result = mavlink.MAV_RESULT_UNSUPPORTED
+        self.send(self.mav.command_ack_encode(msg.command, result))
+
+    def set_message_interval(self, msg_id, interval_us):
+        msg_class = mavlink.mavlink_map.get(msg_id)
+        msg_type = msg_class.msgname if msg_class else None
+        if msg_type not in self.rates:
+            return mavlink.MAV_RESULT_DENIED
+        if self.fixed_rates:
+            return mavlink.MAV_RESULT_ACCEPTED
+        if interval_us == 0:
+            self.streams[msg_type] = self._interval(self.rates[msg_type])
+        elif interval_us < 0:
+            self.streams[msg_type] = None
+        else:
+            self.streams[msg_type] = interval_us / 1e6
+        self.due[msg_type] = time.monotonic()
+        self.logger.debug("Stream %s interval %s us", msg_type, interval_us)
+        return mavlink.MAV_RESULT_ACCEPTED
+
+    def handle_set_mode(self, msg):
+        mode = MODES.get(msg.custom_mode)
+        if mode is None:
+            self.logger.warning(f"Unknown mode id {msg.custom_mode}")
+            return
+        with self.lock:
+            self.set_mode(mode)
+
+    def handle_set_position_target(self, msg):
+        if msg.type_mask & 0b111000 == 0b111000:
+            return  # Velocity ignored; position targets are not simulated
+        vx, vy = msg.vx, msg.vy
+        if msg.coordinate_frame in (mavlink.MAV_FRAME_BODY_NED, mavlink.MAV_FRAME_BODY_OFFSET_NED):
+            vx, vy = (vx * math.cos(self.yaw) - vy * math.sin(self.yaw),
+                      vx * math.sin(self.yaw) + vy * math.cos(self.yaw))
+        with self.lock:
+            self.setpoint = (vx, vy, msg.vz)
+            self.setpoint_time = time.monotonic()
+
+    def handle_mission_clear_all(self, msg):
+        with self.lock:
+            self.mission = []
+            self.seq = 0
+            self.item_target = None
+        self.logger.info("Mission cleared")
+        self.send(self.mav.mission_ack_encode(msg.get_srcSystem(), msg.get_srcComponent(),
+                                              mavlink.MAV_MISSION_ACCEPTED))
+
+    def handle_mission_count(self, msg):
+        self.upload = [None] * msg.count
+        if not self.upload:
+            self.handle_mission_clear_all(msg)
+            return
+        self.send(self.mav.mission_request_encode(msg.get_srcSystem(), msg.get_srcComponent(), 0))
+
+    def handle_mission_item(self, msg):
+        if self.upload is None:
+            return
+        missing = [seq for seq, item in enumerate(self.upload) if item is None]
+        if msg.seq != missing[0]:
+            # Out of order or repeated; ask again for the one expected
+            self.send(self.mav.mission_request_encode(msg.get_srcSystem(), msg.get_srcComponent(), missing[0]))
+            return
+        self.upload[msg.seq] = msg
+        if len(missing) > 1:
+            self.send(self.mav.mission_request_encode(msg.get_srcSystem(), msg.get_srcComponent(), missing[1]))
+            return
+        with self.lock:
+            self.mission = self.upload
+            self.seq = 0
+            self.item_target = None
+        self.upload = None
+        self.logger.info(f"Mission of {len(self.mission)} items received")
+        self.send(self.mav.mission_ack_encode(msg.get_srcSystem(), msg.get_srcComponent(),
+                                              mavlink.MAV_MISSION_ACCEPTED))
+
+    def handle_mission_request_list(self, msg):
+        self.send(self.mav.mission_count_encode(msg.get_srcSystem(), msg.get_srcComponent(), len(self.mission)))
+
+    def handle_mission_request(self, msg):
+        if msg.seq >= len(self.mission):
+            return
+        item = self.mission[msg.seq]
+        self.send(self.mav.mission_item_encode(
+            msg.get_srcSystem(), msg.get_srcComponent(), item.seq, item.frame, item.command,
+            int(item.seq == self.seq), item.autocontinue, item.param1, item.param2, item.param3, item.param4,
+            item.x / 1e7 if item.get_type() == 'MISSION_ITEM_INT' else item.x,
+            item.y / 1e7 if item.get_type() == 'MISSION_ITEM_INT' else item.y, item.z))
+
+    handlers = {
+        'COMMAND_LONG': handle_command_long,
+        'SET_MODE': handle_set_mode,
+        'SET_POSITION_TARGET_LOCAL_NED': handle_set_position_target,
+        'MISSION_CLEAR_ALL': handle_mission_clear_all,
+        'MISSION_COUNT': handle_mission_count,
+        'MISSION_ITEM': handle_mission_item,
+        'MISSION_ITEM_INT': handle_mission_item,
+        'MISSION_REQUEST_LIST': handle_mission_request_list,
+        'MISSION_REQUEST': handle_mission_request,
+        'MISSION_REQUEST_INT': handle_mission_request,
+    }
+
+    # Telemetry
+
+    def battery_remaining(self, now):
+        used = self.battery_drain * (now - self.armed_time) / 60 if self.armed else 0.0
+        return max(0, int(100 - used))
+
+    def stream_message(self, msg_type, now):
+        time_boot_ms = int((now - self.started) * 1000) & 0xFFFFFFFF
+        with self.lock:
+            if msg_type == 'HEARTBEAT':
+                base_mode = mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED | mavlink.MAV_MODE_FLAG_STABILIZE_ENABLED
+                if self.armed:
+                    base_mode |= mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+                if self.mode in ('GUIDED', 'AUTO'):
+                    base_mode |= mavlink.MAV_MODE_FLAG_GUIDED_ENABLED
+                return self.mav.heartbeat_encode(
+                    mavlink.MAV_TYPE_QUADROTOR, mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, base_mode,
+                    MavlinkCommands.MODE_MAPPING.get(self.mode, 0),
+                    mavlink.MAV_STATE_ACTIVE if self.armed else mavlink.MAV_STATE_STANDBY)
+            if msg_type == 'SYS_STATUS':
+                remaining = self.battery_remaining(now)
+                sensors = (mavlink.MAV_SYS_STATUS_SENSOR_3D_GYRO | mavlink.MAV_SYS_STATUS_SENSOR_3D_ACCEL
+                           | mavlink.MAV_SYS_STATUS_SENSOR_GPS)
+                return self.mav.sys_status_encode(
+                    sensors, sensors, sensors, 200,
+                    int(4 * (3500 + 7 * remaining)),    # 4S pack, 3.5-4.2 V per cell
+                    1500 if self.armed else 50,         # cA
+                    remaining, 0, 0, 0, 0, 0, 0)
+            if msg_type == 'GLOBAL_POSITION_INT':
+                north, east, altitude = self.position
+                lat = self.home[0] + math.degrees(north / EARTH_RADIUS)
+                lon = self.home[1] + math.degrees(east / (EARTH_RADIUS * math.cos(math.radians(self.home[0]))))
+                return self.mav.global_position_int_encode(
+                    time_boot_ms, int(lat * 1e7), int(lon * 1e7), int((self.home[2] + altitude) * 1000),
+                    int(altitude * 1000), int(self.velocity[0] * 100), int(self.velocity[1] * 100),
+                    int(self.velocity[2] * 100), int(math.degrees(self.yaw) % 360 * 100))
+            if msg_type == 'ATTITUDE':
+                return self.mav.attitude_encode(time_boot_ms, self.roll, self.pitch, self.yaw, 0.0, 0.0, 0.0)
+            if msg_type == 'MISSION_CURRENT':
+                return self.mav.mission_current_encode(min(self.seq, max(len(self.mission) - 1, 0)))
+        raise ValueError(f"Unknown stream {msg_type}")
+
+    def pose(self):
+        """
+        (north, east, altitude, roll, pitch, yaw) in metres and radians.
+        """
+        with self.lock:
+            return (*self.position, self.roll, self.pitch, self.yaw)
+
+    def stats(self):
+        with self.lock:
+            pad_error = (math.hypot(self.touchdown[0] - self.pad[0], self.touchdown[1] - self.pad[1])
+                         if self.touchdown else None)
+            return {
+                'uptime_s': time.monotonic() - self.started,
+                'mode': self.mode,
+                'armed': self.armed,
+                'position': [round(value, 3) for value in self.position],
+                'touchdown': self.touchdown,
+                'pad_error_m': pad_error,
+                'sent': dict(self.sent),
+                'received': dict(self.received),
+                'dropped_writes': self.dropped_writes,
+            }
+
+
+class SimulatedCameraSource(SyntheticPadSource):
+    name = 'simulator'
+
+    def __init__(self, simulator, width=640, height=480, fps=30, hfov=69.0, vfov=55.0, min_altitude=0.3,
+                 **options):
+        """
+        Downward camera on the simulated vehicle. Each frame shows the
+        simulator's landing pad where it would appear from the current pose,
+        with the same image conventions as PrecisionLanding: image up is
+        forward and image right is the body's left. Roll and pitch shift the
+        pad the way PadTracker.level_offset undoes.
+
+        :param simulator: The SimulatedAutopilot whose pose and pad to render.
+        :param hfov: Horizontal field of view in degrees.
+        :param vfov: Vertical field of view in degrees.
+        :param min_altitude: Below this height no pad is drawn.
+        :param options: SyntheticPadSource rendering options, e.g. noise or marker.
+        """
+        super().__init__(width, height, fps, **options)
+        self.simulator = simulator
+        self.tan_x = math.tan(math.radians(hfov) / 2)
+        self.tan_y = math.tan(math.radians(vfov) / 2)
+        self.min_altitude = min_altitude
+
+    def read(self):
+        north, east, altitude, roll, pitch, yaw = self.simulator.pose()
+        if altitude < self.min_altitude:
+            frame = self.render(0.0, 0.0, 0)
+        else:
+            dn = self.simulator.pad[0] - north
+            de = self.simulator.pad[1] - east
+            forward = dn * math.cos(yaw) + de * math.sin(yaw)
+            right = -dn * math.sin(yaw) + de * math.cos(yaw)
+            offset_x = math.tan(math.atan(-right / altitude) - roll) / self.tan_x
+            offset_y = math.tan(math.atan(-forward / altitude) + pitch) / self.tan_y
+            radius = self.simulator.pad_radius / (altitude * self.tan_x) * self.width / 2
+            frame = self.render(offset_x, offset_y, radius)
+        self._pace()
+        self.frames_read += 1
+        return frame
+
+
+def register_camera(simulator):
+    """
+    Makes 'simulator' a precision_landing.camera source that renders from
+    this simulator. Only works in the simulator's own process.
+    """
+    FRAME_SOURCES[SimulatedCameraSource.name] = (
+        lambda width=640, height=480, **options: SimulatedCameraSource(simulator, width, height, **options))
+
+
+def app_config(config_path, workdir, port, camera=True):
+    """
+    Writes a copy of the application config that connects to the simulator
+    and keeps every log and recording in workdir.
+
+    :return: Path of the new config file.
+    """
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    config.setdefault('mavlink_router', {})['port'] = port
+    logging_config = config.setdefault('logging', {})
+    logging_config['log_file'] = os.path.join(workdir, 'drone.log')
+    if 'file' in logging_config.get('handlers', {}):
+        logging_config['handlers']['file']['filename'] = os.path.join(workdir, 'drone.log')
+    recorder_config = config.setdefault('data_recorder', {})
+    recorder_config['root'] = os.path.join(workdir, 'flights')
+    recorder_config['directory'] = os.path.join(workdir, 'flight_data')
+    recorder_config['filename'] = os.path.join(workdir, 'flight_data.tlog')
+    config.setdefault('blackbox', {})['path'] = os.path.join(workdir, 'blackbox.bin')
+    if camera:
+        config.setdefault('precision_landing', {}).setdefault('camera', {})['source'] = SimulatedCameraSource.name
+    path = os.path.join(workdir, 'config.yaml')
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated MAVLink autopilot.")
+    parser.add_argument('--link', default='udp:127.0.0.1:14550', help="udp:HOST:PORT or pty")
+    parser.add_argument('--rates', nargs='*', default=[], help="Stream rates as TYPE=HZ, e.g. ATTITUDE=500")
+    parser.add_argument('--fixed-rates', action='store_true', help="Ignore SET_MESSAGE_INTERVAL and keep --rates")
+    parser.add_argument('--pad', type=float, nargs=2, default=(2.0, 1.0), help="Pad north and east of home in metres")
+    parser.add_argument('--wind', type=float, nargs=2, default=(0.0, 0.0), help="North and east drift in m/s")
+    parser.add_argument('--duration', type=float, help="Seconds to run without --app; until Ctrl-C when omitted")
+    parser.add_argument('--app', action='store_true', help="Run DroneApplication against the simulator")
+    parser.add_argument('--config', default='start/config.yaml', help="Application config to adapt for --app")
+    parser.add_argument('--workdir', help="Directory for the --app config, logs and recordings")
+    parser.add_argument('--camera', choices=['simulator', 'config'], default='simulator',
+                        help="Render the pad from the simulator or keep the configured camera")
+    parser.add_argument('--json', help="Write the simulator stats to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - simulator - %(levelname)s - %(message)s')
+    logger = logging.getLogger('simulator')
+    try:
+        rates = parse_rates(args.rates)
+    except ValueError as e:
+        parser.error(str(e))
+
+    simulator = SimulatedAutopilot(logger, link=args.link, rates=rates, fixed_rates=args.fixed_rates,
+                                   pad=args.pad, wind=args.wind)
+    simulator.start()
+    try:
+        if args.app:
+            from main import DroneApplication
+            workdir = args.workdir or tempfile.mkdtemp(prefix='simulator-')
+            os.makedirs(workdir, exist_ok=True)
+            if args.camera == 'simulator':
+                register_camera(simulator)
+            config_path = app_config(args.config, workdir, simulator.app_port, args.camera == 'simulator')
+            logger.info(f"Running the application with {config_path}")
+            DroneApplication(config_path).run()
+            # Let a landing the application started finish, for the touchdown position
+            deadline = time.monotonic() + 60
+            while simulator.armed and simulator.mode in ('LAND', 'RTL') and time.monotonic() < deadline:
+                time.sleep(0.2)
+        else:
+            print(f"Connect the application to {simulator.app_port}", flush=True)
+            deadline = time.monotonic() + args.duration if args.duration else None
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+    stats = simulator.stats()
+    print(json.dumps(stats, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
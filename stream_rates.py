@@ -0,0 +1,197 @@
+# stream_rates.py
+import threading
+import time
+from pymavlink import mavutil
+from lib.event_bus import topic_matches
+
+# Never turned off: the link, command and mission protocols depend on them
+PROTECTED_TYPES = ('HEARTBEAT', 'COMMAND_ACK', 'MISSION_*', 'STATUSTEXT', 'PARAM_VALUE', 'TIMESYNC')
+
+INTERVAL_DISABLED = -1
+INTERVAL_DEFAULT = 0
+
+
+class StreamRateManager:
+    def __init__(self, event_bus, drone_commands, logger, disable_unused=False,
+                 discovery_period=5.0, heartbeat_timeout=3.0):
+        """
+        Requests MAVLink stream rates from the autopilot based on what the
+        components actually use.
+
+        Components register demands with request(owner, msg_type, hz). Each
+        message type is requested with MAV_CMD_SET_MESSAGE_INTERVAL at the
+        highest rate any owner asked for. Everything is requested again on
+        the first heartbeat and whenever heartbeats resume after a gap, since
+        the autopilot forgets the intervals when it reboots.
+
+        With disable_unused, all traffic is watched for discovery_period
+        seconds after each (re)apply and any streamed type nobody requested
+        is turned off. The wildcard subscription is dropped afterwards so
+        bulk ingest can go back to decoding only subscribed types. Forwarding
+        endpoints and recorders do not register demands, so leave it off
+        when they need the full telemetry.
+
+        Released streams and, on stop(), every stream changed here are
+        returned to the autopilot's default rate rather than turned off.
+
+        :param event_bus: The event bus for HEARTBEAT and discovery subscriptions.
+        :param drone_commands: MavlinkCommands used to send the interval requests.
+        :param logger: The logger instance for logging messages.
+        :param disable_unused: Turn off streams that no owner requested.
+        :param discovery_period: Seconds to watch for unrequested streams.
+        :param heartbeat_timeout: Heartbeat gap in seconds treated as a reconnect.
+        """
+        self.event_bus = event_bus
+        self.drone_commands = drone_commands
+        self.logger = logger
+        self.disable_unused = disable_unused
+        self.discovery_period = discovery_period
+        self.heartbeat_timeout = heartbeat_timeout
+        self.lock = threading.Lock()
+
+        self.demands = {}      # msg_type -> {owner: hz}
+        self.applied = {}      # msg_type -> interval_us last sent
+        self.seen = set()      # Types observed during discovery
+        self.last_heartbeat = None
+        self.discovery_until = None
+        self.running = False
+        self.applies = 0
+
+    def start(self):
+        self.running = True
+        self.event_bus.subscribe('HEARTBEAT', self.handle_heartbeat)
+        self.logger.info("StreamRateManager started.")
+
+    def request(self, owner, msg_type, hz):
+        """
+        Registers that owner needs msg_type at hz messages per second and
+        updates the stream if the highest requested rate changed.
+        """
+        if self._msg_id(msg_type) is None:
+            self.logger.warning(f"StreamRateManager: unknown message type {msg_type}")
+            return
+        with self.lock:
+            self.demands.setdefault(msg_type, {})[owner] = hz
+        self.logger.debug(f"Stream rate request: {owner} needs {msg_type} at {hz} Hz")
+        if self.last_heartbeat is not None:
+            self._apply_type(msg_type)
+
+    def release(self, owner, msg_type=None):
+        """
+        Drops owner's demand for msg_type, or for every type when omitted.
+        A stream left without owners is returned to its default rate.
+        """
+        with self.lock:
+            types = [msg_type] if msg_type else list(self.demands)
+            released = []
+            for name in types:
+                owners = self.demands.get(name)
+                if owners and owners.pop(owner, None) is not None:
+                    released.append(name)
+                    if not owners:
+                        del self.demands[name]
+        if self.last_heartbeat is not None:
+            for name in released:
+                self._apply_type(name)
+
+    def required_rates(self):
+        """
+        Returns {msg_type: hz} with the highest rate requested for each type.
+        """
+        with self.lock:
+            return {msg_type: max(owners.values()) for msg_type, owners in self.demands.items()}
+
+    def apply(self):
+        """
+        Sends the interval for every requested type and starts a discovery
+        window for unrequested streams.
+        """
+        self.applies += 1
+        with self.lock:
+            self.applied.clear()
+        rates = self.required_rates()
+        self.logger.info(f"Applying stream rates: {rates}")
+        for msg_type in rates:
+            self._apply_type(msg_type)
+        if self.disable_unused:
+            self._start_discovery()
+
+    def _apply_type(self, msg_type, unused=INTERVAL_DEFAULT):
+        # unused: interval sent when no owner requests msg_type
+        with self.lock:
+            owners = self.demands.get(msg_type)
+            if owners:
+                hz = max(owners.values())
+                interval = int(1e6 / hz) if hz > 0 else INTERVAL_DISABLED
+            elif self._protected(msg_type):
+                interval = INTERVAL_DEFAULT
+            else:
+                interval = unused
+            if self.applied.get(msg_type) == interval:
+                return
+            self.applied[msg_type] = interval
+        self.drone_commands.set_message_interval(self._msg_id(msg_type), interval)
+
+    def _start_discovery(self):
+        with self.lock:
+            if self.discovery_until is None:
+                self.event_bus.subscribe('ALL', self.handle_discovery)
+            self.seen.clear()
+            self.discovery_until = time.monotonic() + self.discovery_period
+
+    def _finish_discovery(self):
+        with self.lock:
+            if self.discovery_until is None:
+                return
+            self.discovery_until = None
+            unused = sorted(
+                msg_type for msg_type in self.seen
+                if msg_type not in self.demands and not self._protected(msg_type)
+            )
+        self.event_bus.unsubscribe('ALL', self.handle_discovery)
+        if unused:
+            self.logger.info(f"Disabling unrequested streams: {unused}")
+        for msg_type in unused:
+            self._apply_type(msg_type, unused=INTERVAL_DISABLED)
+
+    def handle_discovery(self, msg):
+        msg_type = msg.get_type()
+        if self._msg_id(msg_type) is not None:  # Skip non-MAVLink events
+            self.seen.add(msg_type)
+
+    def handle_heartbeat(self, msg):
+        if not self.running:
+            return
+        now = time.monotonic()
+        last = self.last_heartbeat
+        self.last_heartbeat = now
+        if last is None or now - last > self.heartbeat_timeout:
+            if last is not None:
+                self.logger.warning(f"Heartbeat resumed after {now - last:.1f}s, re-applying stream rates.")
+            self.apply()
+        elif self.discovery_until is not None and now >= self.discovery_until:
+            self._finish_discovery()
+
+    @staticmethod
+    def _msg_id(msg_type):
+        return getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{msg_type}", None)
+
+    @staticmethod
+    def _protected(msg_type):
+        return any(topic_matches(pattern, msg_type) for pattern in PROTECTED_TYPES)
+
+    def stop(self):
+        self.running = False
+        self.event_bus.unsubscribe('HEARTBEAT', self.handle_heartbeat)
+        with self.lock:
+            discovering = self.discovery_until is not None
+            self.discovery_until = None
+        if discovering:
+            self.event_bus.unsubscribe('ALL', self.handle_discovery)
+        # Hand every stream changed here back to the autopilot's own rate
+        with self.lock:
+            changed = [msg_type for msg_type, interval in self.applied.items() if interval != INTERVAL_DEFAULT]
+            self.demands.clear()
+        for msg_type in changed:
+            self._apply_type(msg_type)
+        self.logger.info(f"StreamRateManager stopped after {self.applies} apply rounds.")
@@ -0,0 +1,36 @@
+# tests/test_data_recorder.py
+import logging
+import os
+import sys
+import numpy as np
+from pymavlink import mavutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_recorder import ColumnarRecorder, load_columns  # noqa: E402
+from lib.event_bus import EventBus  # noqa: E402
+
+
+def test_columnar_round_trip_char_and_array_fields(tmp_path):
+    # Both types define their fields in a different order from the wire
+    mav = mavutil.mavlink.MAVLink(None)
+    messages = [
+        mav.param_value_encode(b'RATE_RLL_P', 0.135, 9, 1200, 42),
+        mav.battery_status_encode(0, 0, 1, 2500, list(range(3700, 3710)), 1500, 820, 3100, 76),
+    ]
+    event_bus = EventBus()
+    recorder = ColumnarRecorder(event_bus, logging.getLogger('test'), directory=str(tmp_path), chunk_rows=4)
+    for msg in messages:
+        event_bus.publish(msg.get_type(), msg)
+    recorder.close()
+    assert recorder.errors == 0
+
+    param = load_columns(str(tmp_path), 'PARAM_VALUE')[0]
+    assert param['param_id'] == b'RATE_RLL_P'
+    assert param['param_count'] == 1200
+    assert param['param_index'] == 42
+    assert np.isclose(param['param_value'], 0.135)
+
+    battery = load_columns(str(tmp_path), 'BATTERY_STATUS')[0]
+    assert battery['voltages'].tolist() == list(range(3700, 3710))
+    assert battery['temperature'] == 2500
+    assert battery['battery_remaining'] == 76
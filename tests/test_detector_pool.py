@@ -0,0 +1,53 @@
+# tests/test_detector_pool.py
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from precision_landing import DetectorPool  # noqa: E402
+
+
+class Results:
+    def __init__(self):
+        self.items = []
+        self.cond = threading.Condition()
+
+    def __call__(self, captured_at, found):
+        with self.cond:
+            self.items.append((captured_at, found))
+            self.cond.notify_all()
+
+    def wait(self, count, timeout=2.0):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.items) >= count, timeout)
+            return list(self.items)
+
+
+def test_results_released_in_order_and_past_a_lost_frame():
+    # No worker processes: results are put on the queue as workers would
+    results = Results()
+    pool = DetectorPool(0, (4, 4, 3), logging.getLogger('test'), results, slots=4, reorder_timeout=0.2)
+    try:
+        pool.results.put((1, 1, 1.0, (1, 1, 1)))
+        pool.results.put((0, 0, 0.0, (0, 0, 0)))
+        assert results.wait(2) == [(0.0, (0, 0, 0)), (1.0, (1, 1, 1))]
+
+        # seq 2 never comes back; 3 and 4 are held, then released once it is given up on
+        started = time.monotonic()
+        pool.results.put((3, 3, 3.0, None))
+        pool.results.put((4, 0, 4.0, (4, 4, 4)))
+        assert results.wait(4)[2:] == [(3.0, None), (4.0, (4, 4, 4))]
+        assert time.monotonic() - started >= 0.2
+
+        # A result arriving after it was given up on is discarded
+        pool.results.put((2, 2, 2.0, (2, 2, 2)))
+        pool.results.put((5, 1, 5.0, None))
+        assert results.wait(5)[4:] == [(5.0, None)]
+    finally:
+        pool.close()
+    stats = pool.stats()
+    assert stats['completed'] == 5
+    assert stats['lost'] == 1
+    assert stats['late'] == 1
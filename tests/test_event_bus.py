@@ -0,0 +1,189 @@
+# tests/test_event_bus.py
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.event_bus import (  # noqa: E402
+    EventBus, QueuedSubscriber, POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_LATEST
+)
+
+
+class Event:
+    def __init__(self, msg_type, value):
+        self.msg_type = msg_type
+        self.value = value
+
+    def get_type(self):
+        return self.msg_type
+
+
+class GatedCallback:
+    """
+    Records events; the first call blocks until release(), so later events
+    pile up in the subscriber's queue.
+    """
+    def __init__(self):
+        self.received = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, data):
+        self.started.set()
+        self.gate.wait(5)
+        self.received.append(data)
+
+    def hold_worker(self, subscriber, first):
+        subscriber.deliver(first)
+        assert self.started.wait(5)
+
+    def release(self):
+        self.gate.set()
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    callback = GatedCallback()
+    subscriber = QueuedSubscriber(callback, policy=POLICY_DROP_OLDEST, maxsize=3)
+    callback.hold_worker(subscriber, 0)
+    for value in range(1, 6):
+        subscriber.deliver(value)
+    assert subscriber.stats()['depth'] == 3
+    callback.release()
+    subscriber.close()
+    assert callback.received == [0, 3, 4, 5]
+    stats = subscriber.stats()
+    assert stats['dropped'] == 2
+    assert stats['delivered'] == 4
+    assert stats['max_depth'] == 3
+
+
+def test_latest_keeps_one_event_per_type():
+    callback = GatedCallback()
+    subscriber = QueuedSubscriber(callback, policy=POLICY_LATEST, maxsize=2)
+    first = Event('ATTITUDE', 0)
+    callback.hold_worker(subscriber, first)
+    attitude_1, position, attitude_2 = Event('ATTITUDE', 1), Event('GLOBAL_POSITION_INT', 1), Event('ATTITUDE', 2)
+    for event in (attitude_1, position, attitude_2):
+        subscriber.deliver(event)
+    # A replaced type keeps its place in the queue
+    assert subscriber.stats()['dropped'] == 1
+    # A new type on a full queue evicts the oldest type
+    status = Event('SYS_STATUS', 1)
+    subscriber.deliver(status)
+    callback.release()
+    subscriber.close()
+    assert callback.received == [first, position, status]
+    assert subscriber.stats()['dropped'] == 2
+
+
+def test_block_makes_the_publisher_wait_and_drops_nothing():
+    callback = GatedCallback()
+    subscriber = QueuedSubscriber(callback, policy=POLICY_BLOCK, maxsize=1)
+    callback.hold_worker(subscriber, 0)
+    subscriber.deliver(1)
+    publisher = threading.Thread(target=subscriber.deliver, args=(2,))
+    publisher.start()
+    publisher.join(0.2)
+    assert publisher.is_alive()
+    callback.release()
+    publisher.join(5)
+    assert not publisher.is_alive()
+    subscriber.close()
+    assert callback.received == [0, 1, 2]
+    assert subscriber.stats()['dropped'] == 0
+
+
+def test_close_delivers_queued_events_before_stopping():
+    callback = GatedCallback()
+    subscriber = QueuedSubscriber(callback, policy=POLICY_DROP_OLDEST, maxsize=10)
+    callback.hold_worker(subscriber, 0)
+    for value in range(1, 5):
+        subscriber.deliver(value)
+    callback.release()
+    subscriber.close()
+    assert not subscriber.thread.is_alive()
+    assert callback.received == [0, 1, 2, 3, 4]
+
+
+def test_callback_exception_does_not_stop_the_worker():
+    received = []
+
+    def callback(data):
+        if data == 'bad':
+            raise RuntimeError(data)
+        received.append(data)
+
+    bus = EventBus()
+    bus.subscribe('TOPIC', callback, policy=POLICY_DROP_OLDEST)
+    for data in ('a', 'bad', 'b'):
+        bus.publish('TOPIC', data)
+    bus.close()
+    assert received == ['a', 'b']
+    assert bus.metrics.callbacks[callback].exceptions == 1
+
+
+def test_duplicate_queued_subscription_is_rejected():
+    bus = EventBus()
+    received = []
+    bus.subscribe('TOPIC', received.append, policy=POLICY_DROP_OLDEST)
+    workers = threading.active_count()
+    with pytest.raises(ValueError):
+        bus.subscribe('TOPIC', received.append, policy=POLICY_LATEST)
+    assert threading.active_count() == workers
+    assert len(bus.queue_stats()) == 1
+
+    # The same callback may still be queued on another topic, or again once unsubscribed
+    bus.subscribe('OTHER', received.append, policy=POLICY_DROP_OLDEST)
+    bus.unsubscribe('TOPIC', received.append)
+    bus.subscribe('TOPIC', received.append, policy=POLICY_DROP_OLDEST)
+    bus.publish('TOPIC', 1)
+    bus.close()
+    assert received == [1]
+
+
+def test_dispatch_follows_exact_prefix_and_wildcard_subscriptions():
+    bus = EventBus()
+    calls = []
+
+    def recorder(name):
+        return lambda data: calls.append((name, data))
+
+    exact, prefix, everything = recorder('exact'), recorder('prefix'), recorder('all')
+    bus.subscribe('GPS_RAW_INT', exact)
+    bus.subscribe('GPS_*', prefix)
+    bus.subscribe('ALL', everything)
+    bus.publish('GPS_RAW_INT', 1)
+    bus.publish('GPS2_RAW', 2)
+    assert calls == [('exact', 1), ('prefix', 1), ('all', 1), ('all', 2)]
+
+    # Topics already in the table are re-resolved when subscriptions change
+    calls.clear()
+    attitude = recorder('attitude')
+    bus.subscribe('ATT*', attitude)
+    bus.unsubscribe('ALL', everything)
+    bus.unsubscribe('GPS_*', prefix)
+    bus.publish('ATTITUDE', 3)
+    bus.publish('GPS_RAW_INT', 4)
+    bus.publish('GPS2_RAW', 5)
+    assert calls == [('attitude', 3), ('exact', 4)]
+
+    bus.unsubscribe('GPS_RAW_INT', exact)
+    bus.publish('GPS_RAW_INT', 6)
+    assert calls == [('attitude', 3), ('exact', 4)]
+    assert bus.patterns() == ('ATT*',)
+
+
+def test_version_changes_only_with_subscriptions():
+    bus = EventBus()
+    callback = [].append
+    version = bus.version
+    bus.publish('NEW_TOPIC', 1)
+    assert bus.version == version
+    bus.subscribe('HEARTBEAT', callback)
+    assert bus.version > version
+    version = bus.version
+    bus.publish('HEARTBEAT', 2)
+    assert bus.version == version
+    bus.unsubscribe('HEARTBEAT', callback)
+    assert bus.version > version
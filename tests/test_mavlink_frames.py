@@ -0,0 +1,93 @@
+# tests/test_mavlink_frames.py
+import os
+import random
+import sys
+from pymavlink.dialects.v10 import all as mavlink1
+from pymavlink.dialects.v20 import all as mavlink2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.mavlink_frames import FrameSplitter, frame_msgid, frame_size  # noqa: E402
+
+KNOWN_IDS = set(mavlink2.mavlink_map)
+
+
+def v2_frames():
+    mav = mavlink2.MAVLink(None, srcSystem=1, srcComponent=1)
+    return [
+        mav.heartbeat_encode(2, 3, 0, 0, 4).pack(mav),
+        mav.attitude_encode(1000, 0.1, -0.2, 1.5, 0.0, 0.0, 0.0).pack(mav),
+        mav.param_value_encode(b'RATE_RLL_P', 0.135, 9, 1200, 42).pack(mav),
+        mav.button_change_encode(1000, 900, 1).pack(mav),  # msgid 257 spans two header bytes
+    ]
+
+
+def split_all(splitter, stream, sizes):
+    frames = []
+    pos = 0
+    for size in sizes:
+        frames += [frame for _, frame in splitter.split(stream[pos:pos + size])]
+        pos += size
+    frames += [frame for _, frame in splitter.split(stream[pos:])]
+    return frames
+
+
+def test_frames_split_across_chunk_boundaries():
+    frames = v2_frames() * 3
+    stream = b''.join(frames)
+    rng = random.Random(1)
+    for sizes in ([1] * len(stream), [rng.randint(1, 40) for _ in range(len(stream))]):
+        splitter = FrameSplitter(known_ids=KNOWN_IDS)
+        assert split_all(splitter, stream, sizes) == frames
+        assert splitter.discarded == 0
+        assert not splitter.buffer
+
+
+def test_msgid_and_size_from_headers():
+    mav = mavlink2.MAVLink(None)
+    for frame in v2_frames():
+        assert frame_size(frame[:10]) == len(frame)
+        assert frame_msgid(frame) == mav.decode(bytearray(frame)).get_msgId()
+    assert frame_msgid(v2_frames()[3]) == 257
+    mav1 = mavlink1.MAVLink(None)
+    frame = mav1.heartbeat_encode(2, 3, 0, 0, 4).pack(mav1)
+    assert frame_size(frame[:6]) == len(frame)
+    assert frame_msgid(frame) == 0
+    assert frame_size(b'\x00\x09\x00') is None
+
+
+def test_resync_after_noise():
+    frames = v2_frames()
+    # Leading garbage, then noise starting with magic bytes: an unknown flag,
+    # an unknown msgid, and plausible headers not followed by a frame start
+    noise = [
+        b'\x00\x11\x22',
+        b'\xfd\x05\x80\x00\x00\x01\x01\x00\x00\x00',
+        b'\xfd\x01\x00\x00\x00\x01\x01\xff\xff\xff\x33',
+        b'\xfe\x00\x00\x01\x01\x00\x77\x77\x42',
+    ]
+    stream = noise[0] + frames[0] + frames[1] + noise[1] + frames[2] + noise[2] + noise[3] + frames[3] + frames[0]
+    splitter = FrameSplitter(known_ids=KNOWN_IDS)
+    assert [frame for _, frame in splitter.split(stream)] == frames + [frames[0]]
+    assert splitter.discarded == sum(len(chunk) for chunk in noise)
+
+
+def test_signed_frames_include_the_signature():
+    mav = mavlink2.MAVLink(None, srcSystem=1, srcComponent=1)
+    mav.signing.secret_key = bytes(range(32))
+    mav.signing.link_id = 1
+    mav.signing.sign_outgoing = True
+    mav.signing.timestamp = 1
+    signed = [
+        mav.heartbeat_encode(2, 3, 0, 0, 4).pack(mav),
+        mav.attitude_encode(1000, 0.1, -0.2, 1.5, 0.0, 0.0, 0.0).pack(mav),
+    ]
+    assert all(frame[2] & 0x01 for frame in signed)
+    assert frame_size(signed[0][:10]) == len(signed[0])
+
+    stream = b''.join(signed + v2_frames()[:1] + signed)
+    splitter = FrameSplitter(known_ids=KNOWN_IDS)
+    assert split_all(splitter, stream, [7] * (len(stream) // 7)) == signed + v2_frames()[:1] + signed
+
+    receiver = mavlink2.MAVLink(None)
+    receiver.signing.secret_key = mav.signing.secret_key
+    assert receiver.decode(bytearray(signed[1])).get_type() == 'ATTITUDE'
@@ -0,0 +1,100 @@
+# tests/test_outbound_queue.py
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from outbound_queue import (  # noqa: E402
+    OutboundQueue, PRIORITY_COMMAND, PRIORITY_CRITICAL, PRIORITY_FORWARD, PRIORITY_SETPOINT
+)
+
+
+class Connection:
+    """
+    Stands in for a pymavlink connection; raw frames go through write().
+    """
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append((time.monotonic(), bytes(data)))
+
+    def frames(self):
+        return [frame for _, frame in self.written]
+
+
+def drain(outbound):
+    # Entries are queued before start(), so the writer sees them all at once
+    outbound.start()
+    outbound.stop()
+
+
+def test_highest_priority_class_goes_first():
+    connection = Connection()
+    outbound = OutboundQueue(connection, logging.getLogger('test'))
+    outbound.submit(b'forward-1', PRIORITY_FORWARD)
+    outbound.submit(b'setpoint', PRIORITY_SETPOINT, key='velocity')
+    outbound.submit(b'command', PRIORITY_COMMAND)
+    outbound.submit(b'forward-2', PRIORITY_FORWARD)
+    drain(outbound)
+    assert connection.frames() == [b'command', b'setpoint', b'forward-1', b'forward-2']
+
+
+def test_critical_message_flushes_queued_setpoints():
+    connection = Connection()
+    outbound = OutboundQueue(connection, logging.getLogger('test'))
+    outbound.submit(b'setpoint-1', PRIORITY_SETPOINT, key='velocity')
+    outbound.submit(b'command', PRIORITY_COMMAND)
+    outbound.submit(b'land', PRIORITY_CRITICAL)
+    # The flushed setpoint's key is forgotten, so a new one is queued, not merged into it
+    outbound.submit(b'setpoint-2', PRIORITY_SETPOINT, key='velocity')
+    drain(outbound)
+    assert connection.frames() == [b'land', b'command', b'setpoint-2']
+    stats = outbound.stats()
+    assert stats['flushed'] == 1
+    assert stats['coalesced'] == 0
+
+
+def test_keyed_messages_coalesce_to_the_newest():
+    connection = Connection()
+    outbound = OutboundQueue(connection, logging.getLogger('test'))
+    outbound.submit(b'velocity-1', PRIORITY_SETPOINT, key='velocity')
+    outbound.submit(b'yaw', PRIORITY_SETPOINT, key='yaw')
+    outbound.submit(b'velocity-2', PRIORITY_SETPOINT, key='velocity')
+    outbound.submit(b'velocity-3', PRIORITY_SETPOINT, key='velocity')
+    drain(outbound)
+    # The replacement keeps the first message's place in the queue
+    assert connection.frames() == [b'velocity-3', b'yaw']
+    stats = outbound.stats()
+    assert stats['coalesced'] == 2
+    assert stats['sent'][PRIORITY_SETPOINT] == 2
+
+
+def test_full_class_drops_its_oldest_entry():
+    connection = Connection()
+    outbound = OutboundQueue(connection, logging.getLogger('test'), queue_size=2)
+    for index in range(3):
+        outbound.submit(b'forward-%d' % index, PRIORITY_FORWARD)
+    outbound.submit(b'command', PRIORITY_COMMAND)
+    drain(outbound)
+    assert connection.frames() == [b'command', b'forward-1', b'forward-2']
+    assert outbound.stats()['dropped'] == 1
+
+
+def test_rate_capped_class_does_not_hold_back_others():
+    connection = Connection()
+    outbound = OutboundQueue(connection, logging.getLogger('test'), rate_limits={PRIORITY_FORWARD: 10})
+    for index in range(3):
+        outbound.submit(b'forward-%d' % index, PRIORITY_FORWARD)
+    outbound.start()
+    deadline = time.monotonic() + 5
+    while not connection.written and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # forward-1 must wait 0.1 s; the command goes out in the meantime
+    outbound.submit(b'command', PRIORITY_COMMAND)
+    outbound.stop()
+    frames = connection.frames()
+    assert frames == [b'forward-0', b'command', b'forward-1', b'forward-2']
+    forward_times = [stamp for stamp, frame in connection.written if frame.startswith(b'forward')]
+    assert forward_times[2] - forward_times[0] >= 0.19
@@ -0,0 +1,34 @@
+# tests/test_replay.py
+import os
+import sys
+from pymavlink import mavutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import replay  # noqa: E402
+from lib.mavlink_frames import TLOG_TIMESTAMP  # noqa: E402
+
+
+def test_tlog_source_streams_records_across_reads(tmp_path, monkeypatch):
+    # Small reads put record boundaries, noise and the truncated tail at every offset
+    monkeypatch.setattr(replay, 'READ_SIZE', 97)
+    mav = mavutil.mavlink.MAVLink(None)
+    path = str(tmp_path / 'flight.tlog')
+    with open(path, 'wb') as f:
+        for index in range(500):
+            f.write(TLOG_TIMESTAMP.pack(index * 20000))
+            if index % 2:
+                f.write(mav.attitude_encode(index, 0.1, 0.2, 0.3, 0, 0, 0).pack(mav))
+            else:
+                f.write(mav.heartbeat_encode(2, 3, 0, index, 4).pack(mav))
+            if index == 250:
+                f.write(b'\x01\x02\x03')
+        f.write(TLOG_TIMESTAMP.pack(1) + b'\xfe\x10')
+
+    source = replay.TlogSource(path, ['ATTITUDE'])
+    messages = list(source)
+    assert [msg.time_boot_ms for _, msg in messages] == list(range(1, 500, 2))
+    assert messages[0][0] == 0.02
+    assert messages[0][1]._timestamp == 0.02
+    assert source.frames == 500
+    assert source.skipped == 250
+    assert source.bad == 5  # Three noise bytes and the two scanned of the truncated tail
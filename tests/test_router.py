@@ -0,0 +1,63 @@
+# tests/test_router.py
+import logging
+import os
+import sys
+from pymavlink import mavutil
+from pymavlink.dialects.v10 import all as mavlink1
+from pymavlink.dialects.v20 import all as mavlink2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.event_bus import EventBus  # noqa: E402
+from outbound_queue import PRIORITY_COMMAND, PRIORITY_CRITICAL, PRIORITY_FORWARD  # noqa: E402
+from router import MavlinkRouter, forward_priority  # noqa: E402
+
+
+def pack(build, dialect=mavlink2):
+    mav = dialect.MAVLink(None)
+    return build(mav).pack(mav)
+
+
+def command_long(command):
+    return lambda mav: mav.command_long_encode(1, 1, command, 0, 0, 0, 0, 0, 0, 0, 0)
+
+
+def test_operator_commands_are_not_queued_as_bulk_traffic():
+    cmd = mavutil.mavlink
+    assert forward_priority(pack(command_long(cmd.MAV_CMD_NAV_RETURN_TO_LAUNCH))) == PRIORITY_CRITICAL
+    assert forward_priority(pack(command_long(cmd.MAV_CMD_NAV_LAND))) == PRIORITY_CRITICAL
+    assert forward_priority(pack(command_long(cmd.MAV_CMD_SET_MESSAGE_INTERVAL))) == PRIORITY_COMMAND
+    assert forward_priority(pack(lambda mav: mav.command_int_encode(
+        1, 1, 0, cmd.MAV_CMD_NAV_RETURN_TO_LAUNCH, 0, 0, 0, 0, 0, 0, 0, 0, 0))) == PRIORITY_CRITICAL
+    assert forward_priority(pack(lambda mav: mav.set_mode_encode(1, 1, 9))) == PRIORITY_CRITICAL
+
+
+def test_command_field_read_from_truncated_and_v1_frames():
+    # MAVLink 2 drops the zero bytes after the command's low byte
+    frame = pack(lambda mav: mav.command_long_encode(0, 0, mavutil.mavlink.MAV_CMD_NAV_LAND, 0, 0, 0, 0, 0, 0, 0, 0))
+    assert frame[1] == 29
+    assert forward_priority(frame) == PRIORITY_CRITICAL
+    frame = pack(command_long(mavutil.mavlink.MAV_CMD_NAV_LAND), dialect=mavlink1)
+    assert frame[0] == 0xFE
+    assert forward_priority(frame) == PRIORITY_CRITICAL
+
+
+def test_bulk_traffic_keeps_forward_priority():
+    heartbeat = pack(lambda mav: mav.heartbeat_encode(6, 8, 0, 0, 0))
+    assert forward_priority(heartbeat) == PRIORITY_FORWARD
+
+
+def test_wanted_ids_follow_the_bus_subscriptions():
+    bus = EventBus()
+    router = MavlinkRouter(bus, logging.getLogger('test'))
+    heartbeat = mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT
+    attitude = mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE
+    assert router.wanted_ids() == {heartbeat}
+
+    callback = [].append
+    bus.subscribe('ATTITUDE', callback)
+    assert router.wanted_ids() == {heartbeat, attitude}
+    bus.subscribe('ALL', callback)
+    assert router.wanted_ids() is None
+    bus.unsubscribe('ALL', callback)
+    bus.unsubscribe('ATTITUDE', callback)
+    assert router.wanted_ids() == {heartbeat}